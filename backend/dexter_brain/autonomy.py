@@ -227,7 +227,8 @@ Generate the complete skill code:
         # Use collaboration system to generate code
         session_id = await self.collaboration_mgr.broadcast_user_input(
             context_prompt, 
-            context_id=f"skill_gen_{int(time.time())}"
+            f"skill_gen_{int(time.time())}",
+            priority='skill_generation'
         )
         
         # Wait for collaboration to complete
@@ -0,0 +1,76 @@
+"""
+Cheap-first collaboration cascade.
+
+Slots are tiered by cost: an explicit ``models.<name>.tier`` wins. Otherwise
+local slots (``local_model`` or the ollama provider) are tier 1, free remote
+slots tier 2 and priced remote slots (``cost_per_1k_tokens`` > 0) tier 3. A
+cascade session runs its lowest tier alone. A higher tier only joins when the
+tier's result misses a threshold:
+
+* agreement: the winner's share of the votes (or of the agreeing proposals)
+* confidence: the "Confidence: <0-1 | high | medium | low>" line of the winning solution
+* sandbox: the winning solution's python code fails its test run
+
+Settings come from ``collaboration.cascade``. Each request class
+(interactive, campaign, skill_generation, healing) can override them under
+``classes``.
+"""
+
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CASCADE_SETTINGS: Dict[str, Any] = {
+    'enabled': False,
+    'min_agreement': 0.6,
+    'min_confidence': 0.5,
+    'sandbox': False,
+}
+
+_CONFIDENCE_RE = re.compile(r"confidence\s*[:=]\s*\**\s*(high|medium|low|\d+(?:\.\d+)?)\s*(%?)", re.IGNORECASE)
+_CONFIDENCE_WORDS = {'high': 0.9, 'medium': 0.6, 'low': 0.3}
+_PYTHON_RE = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL)
+
+
+def settings_for(cascade: Dict[str, Any] | None, request_class: str) -> Dict[str, Any]:
+    """Cascade settings for ``request_class`` (a scheduler priority name)."""
+    cascade = cascade or {}
+    overrides = (cascade.get('classes') or {}).get(request_class) or {}
+    return {**DEFAULT_CASCADE_SETTINGS, **{k: v for k, v in cascade.items() if k != 'classes'}, **overrides}
+
+
+def slot_tier(model_config: Dict[str, Any]) -> int:
+    """Cost tier of a slot; 1 is the cheapest."""
+    if model_config.get('tier') is not None:
+        return int(model_config['tier'])
+    if model_config.get('local_model') or (model_config.get('provider') or '').lower() == 'ollama':
+        return 1
+    return 3 if float(model_config.get('cost_per_1k_tokens', 0) or 0) > 0 else 2
+
+
+def tiers_for(models: Dict[str, Dict[str, Any]], llms: List[str]) -> List[List[str]]:
+    """``llms`` grouped by tier, cheapest first; slot order is kept within a tier."""
+    tiers: Dict[int, List[str]] = {}
+    for name in llms:
+        tiers.setdefault(slot_tier(models.get(name, {})), []).append(name)
+    return [tiers[t] for t in sorted(tiers)]
+
+
+def parse_confidence(text: str) -> Optional[float]:
+    """Self-reported confidence in ``text`` as 0..1 (None if not stated)."""
+    match = _CONFIDENCE_RE.search(text or "")
+    if not match:
+        return None
+    value, percent = match.group(1).lower(), match.group(2)
+    if value in _CONFIDENCE_WORDS:
+        return _CONFIDENCE_WORDS[value]
+    number = float(value)
+    if percent or number > 1:
+        number /= 100
+    return max(0.0, min(1.0, number))
+
+
+def extract_code(text: str) -> Optional[str]:
+    """First fenced python block in ``text``."""
+    match = _PYTHON_RE.search(text or "")
+    return match.group(1) if match else None
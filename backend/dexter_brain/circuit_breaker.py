@@ -0,0 +1,159 @@
+"""
+Per-slot circuit breakers.
+
+Every LLM call reports its outcome and latency to the slot's breaker. After
+``failure_threshold`` consecutive failures (calls slower than
+``slow_call_sec`` count as failures too) the breaker opens and collaboration
+stops recruiting the slot. Once ``open_sec`` has passed it goes half-open and
+lets a probe call through: success closes it again, failure re-opens it.
+
+Settings come from ``runtime.circuit_breaker`` and can be overridden per slot
+with ``models.<name>.circuit_breaker``.
+"""
+
+from __future__ import annotations
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_BREAKER_SETTINGS: Dict[str, Any] = {
+    'enabled': True,
+    'failure_threshold': 3,
+    'open_sec': 60.0,
+    'slow_call_sec': 90.0,   # 0 disables the latency check
+    'half_open_max_calls': 1,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state machine for one slot."""
+
+    def __init__(self, name: str, settings: Dict[str, Any] | None = None):
+        self.name = name
+        self.settings = {**DEFAULT_BREAKER_SETTINGS, **(settings or {})}
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_ts: Optional[float] = None
+        self.probes = 0
+        self.probe_started_ts: Optional[float] = None
+        self.latency_ewma: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_change_ts = time.time()
+        self.counters: Dict[str, int] = {
+            'successes': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'opened': 0,
+            'rejected': 0,
+        }
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            self.last_change_ts = time.time()
+
+    def _open(self):
+        self._set_state(OPEN)
+        self.opened_ts = time.monotonic()
+        self.probes = 0
+        self.counters['opened'] += 1
+
+    def current_state(self) -> str:
+        """State after applying the open timeout (open becomes half-open)."""
+        if self.state == OPEN and time.monotonic() - (self.opened_ts or 0) >= float(self.settings['open_sec']):
+            self._set_state(HALF_OPEN)
+            self.probes = 0
+        return self.state
+
+    def allow(self) -> bool:
+        """Whether the slot may take new work; in half-open this claims a probe."""
+        state = self.current_state()
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            stale = (self.probe_started_ts is not None
+                     and time.monotonic() - self.probe_started_ts >= float(self.settings['open_sec']))
+            if self.probes < int(self.settings['half_open_max_calls']) or stale:
+                self.probes = 1 if stale else self.probes + 1
+                self.probe_started_ts = time.monotonic()
+                return True
+        self.counters['rejected'] += 1
+        return False
+
+    def is_open(self) -> bool:
+        return self.current_state() == OPEN
+
+    def _observe_latency(self, latency_sec: float):
+        self.latency_ewma = latency_sec if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency_sec
+
+    def record_success(self, latency_sec: float):
+        self._observe_latency(latency_sec)
+        slow_after = float(self.settings['slow_call_sec'])
+        if slow_after > 0 and latency_sec > slow_after:
+            self.counters['slow_calls'] += 1
+            self._failed(f"slow call ({latency_sec:.1f}s)")
+            return
+        self.counters['successes'] += 1
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.probe_started_ts = None
+        self._set_state(CLOSED)
+
+    def record_failure(self, latency_sec: float, error: BaseException | str):
+        self._observe_latency(latency_sec)
+        self._failed(str(error))
+
+    def _failed(self, reason: str):
+        self.counters['failures'] += 1
+        self.consecutive_failures += 1
+        self.last_error = reason[:300]
+        if self.state == HALF_OPEN or self.consecutive_failures >= int(self.settings['failure_threshold']):
+            self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.current_state()
+        retry_in = None
+        if state == OPEN:
+            retry_in = round(float(self.settings['open_sec']) - (time.monotonic() - (self.opened_ts or 0)), 1)
+        return {
+            'state': state,
+            'consecutive_failures': self.consecutive_failures,
+            'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            'last_error': self.last_error,
+            'last_change_ts': self.last_change_ts,
+            'retry_in_sec': retry_in,
+            **self.counters,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_settings(config, llm_name: str) -> Dict[str, Any]:
+    rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+    rt = rt if isinstance(rt, dict) else {}
+    model_config = getattr(config, 'models', {}).get(llm_name, {}) or {}
+    return {**DEFAULT_BREAKER_SETTINGS, **rt.get('circuit_breaker', {}),
+            **(model_config.get('circuit_breaker') or {})}
+
+
+def get_breaker(config, llm_name: str) -> Optional[CircuitBreaker]:
+    """The slot's breaker, or None if breakers are disabled for it."""
+    settings = breaker_settings(config, llm_name)
+    if not settings.get('enabled', True):
+        return None
+    breaker = _breakers.get(llm_name)
+    if breaker is None:
+        breaker = _breakers[llm_name] = CircuitBreaker(llm_name, settings)
+    return breaker
+
+
+def get_breaker_states() -> Dict[str, Any]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+def reset_breakers():
+    _breakers.clear()
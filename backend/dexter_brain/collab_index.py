@@ -0,0 +1,206 @@
+"""
+Cached index of collaboration artifacts per slot.
+
+``/collaboration/files`` used to list, stat, classify and sort every file in
+every slot's collaboration directory on each request. ``CollaborationIndex``
+keeps that listing in memory instead: the writer records each artifact as it
+is produced, and a watcher rescans a slot's directory (in a worker thread)
+only when the directory's mtime changes, every ``file_sync_interval`` seconds.
+Records in the collaboration log are indexed under their virtual file names
+and resynced after the log compacts.
+
+Listings are sorted once per change and served in pages, optionally filtered
+by artifact type.
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+PRIORITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+ARTIFACT_TYPES = ('error', 'proposal', 'refinement', 'vote', 'unknown')
+
+
+def classify(name: str) -> Tuple[str, str]:
+    """Artifact ``(type, priority)`` of a collaboration file name (JSON or legacy TXT)."""
+    fname = name.lower()
+    if fname.endswith('.json') or fname.endswith('.txt'):
+        if '_error.' in fname:
+            return 'error', 'high'
+        if '_proposal.' in fname:
+            return 'proposal', 'medium'
+        if '_refinement.' in fname:
+            return 'refinement', 'medium'
+        if '_vote.' in fname:
+            return 'vote', 'low'
+    return 'unknown', 'low'
+
+
+def _sort_key(order: str):
+    if order == 'priority':
+        return lambda x: (PRIORITY_ORDER.get(x['priority'], 3), -x['modified'])
+    return lambda x: -x['modified']
+
+
+class _SlotIndex:
+    __slots__ = ('files', 'log_entries', 'dir_mtime', 'sorted')
+
+    def __init__(self):
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.log_entries: Dict[str, Dict[str, Any]] = {}
+        self.dir_mtime: Optional[float] = None
+        self.sorted: Dict[str, List[Dict[str, Any]]] = {}
+
+
+class CollaborationIndex:
+    """Name, size, mtime, type and priority of every artifact, per slot."""
+
+    def __init__(self, dir_for: Callable[[str], str], log=None):
+        self.dir_for = dir_for
+        self.log = log
+        self._slots: Dict[str, _SlotIndex] = {}
+        self._log_compactions = log.counters['compactions'] if log is not None else 0
+        self._lock = threading.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        self.counters: Dict[str, int] = {'scans': 0, 'scans_skipped': 0, 'recorded': 0, 'log_resyncs': 0}
+
+    @staticmethod
+    def _info(name: str, size: int, modified: float) -> Dict[str, Any]:
+        ftype, priority = classify(name)
+        return {'name': name, 'size': size, 'modified': modified, 'type': ftype, 'priority': priority}
+
+    # -- updates ------------------------------------------------------------
+
+    def record(self, slot: str, name: str, size: int, modified: float, *, logged: bool = False):
+        """Writer hook: an artifact was written to disk (or to the log if ``logged``)."""
+        with self._lock:
+            state = self._slots.get(slot)
+            if state is None:
+                return  # indexed in full on first listing
+            target = state.log_entries if logged else state.files
+            target[name] = self._info(name, size, modified)
+            state.sorted.clear()
+            self.counters['recorded'] += 1
+
+    def scan(self, slot: str, force: bool = False) -> bool:
+        """Re-list ``slot``'s directory if it changed since the last scan (blocking)."""
+        directory = self.dir_for(slot)
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except OSError:
+            dir_mtime = None
+        with self._lock:
+            state = self._slots.get(slot)
+            first = state is None
+            if not force and not first and state.dir_mtime == dir_mtime:
+                self.counters['scans_skipped'] += 1
+                return False
+        files: Dict[str, Dict[str, Any]] = {}
+        if dir_mtime is not None:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = self._info(entry.name, stat.st_size, stat.st_mtime)
+                    except OSError:
+                        continue  # removed while scanning
+        log_entries = self._log_listing(slot) if first else None
+        with self._lock:
+            state = self._slots.setdefault(slot, _SlotIndex())
+            state.files = files
+            state.dir_mtime = dir_mtime
+            if log_entries is not None:
+                state.log_entries = log_entries
+            state.sorted.clear()
+            self.counters['scans'] += 1
+        return True
+
+    def _log_listing(self, slot: str) -> Dict[str, Dict[str, Any]]:
+        if self.log is None:
+            return {}
+        return {e['name']: self._info(e['name'], e['size'], e['modified']) for e in self.log.list_entries(slot)}
+
+    def _resync_log(self):
+        """After a compaction some log records are gone; re-read the log's own index."""
+        if self.log is None or self.log.counters['compactions'] == self._log_compactions:
+            return
+        self._log_compactions = self.log.counters['compactions']
+        for slot in list(self._slots):
+            entries = self._log_listing(slot)
+            with self._lock:
+                state = self._slots.get(slot)
+                if state is not None:
+                    state.log_entries = entries
+                    state.sorted.clear()
+        self.counters['log_resyncs'] += 1
+
+    async def ensure(self, slots: Iterable[str]):
+        """Index every slot in ``slots`` not listed yet, in a worker thread."""
+        with self._lock:
+            missing = [slot for slot in slots if slot not in self._slots]
+        if missing:
+            await asyncio.to_thread(self.refresh, missing)
+
+    def refresh(self, slots: Iterable[str]):
+        """One watcher pass over ``slots`` (blocking; run off the event loop)."""
+        for slot in slots:
+            try:
+                self.scan(slot)
+            except OSError:
+                pass
+        self._resync_log()
+
+    # -- queries ------------------------------------------------------------
+
+    def files(self, slot: str, *, types: Optional[Iterable[str]] = None, offset: int = 0,
+              limit: Optional[int] = None, order: str = 'recent') -> Tuple[int, List[Dict[str, Any]]]:
+        """``(total, page)`` of ``slot``'s artifacts; ``order`` is 'recent' or 'priority'.
+
+        A slot not indexed yet is scanned first, which blocks: on the event loop,
+        ``await ensure()`` the slots before listing them.
+        """
+        if slot not in self._slots:
+            self.scan(slot)
+        with self._lock:
+            state = self._slots[slot]
+            listing = state.sorted.get(order)
+            if listing is None:
+                merged = {**state.log_entries, **state.files}  # a file on disk wins over a log record
+                listing = state.sorted[order] = sorted(merged.values(), key=_sort_key(order))
+        if types:
+            wanted = set(types)
+            listing = [f for f in listing if f['type'] in wanted]
+        offset = max(0, int(offset))
+        page = listing[offset:offset + limit] if limit is not None else listing[offset:]
+        return len(listing), [dict(f) for f in page]
+
+    # -- watcher ------------------------------------------------------------
+
+    async def _watch_loop(self, slots: Callable[[], Iterable[str]], interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh, list(slots()))
+            except Exception:
+                pass
+
+    def start_watcher(self, slots: Callable[[], Iterable[str]], interval: float):
+        """Rescan changed slot directories every ``interval`` seconds."""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch_loop(slots, max(0.1, interval)))
+
+    async def aclose(self):
+        if self._watcher is not None and not self._watcher.done():
+            self._watcher.cancel()
+        self._watcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                'slots': {slot: len(s.files) + len(s.log_entries) for slot, s in self._slots.items()},
+                'watching': self._watcher is not None and not self._watcher.done(),
+            }
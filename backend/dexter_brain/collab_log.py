@@ -0,0 +1,493 @@
+"""
+Append-only, segmented collaboration log.
+
+Replaces the one-JSON-file-per-(session, slot, phase) layout. Each slot gets
+a ``log/`` directory under its collaboration directory holding numbered
+segments. A segment is a run of length-prefixed blocks::
+
+    [4-byte big-endian payload length][1-byte codec][payload]
+
+where the payload is a batch of NDJSON records, optionally gzip or zstd
+compressed. Each segment has a sidecar ``.idx`` file with one JSON line per
+block (offset, sessions and entry names), so the index by session id and the
+legacy-style file listing can be rebuilt at startup without decompressing
+anything. Segments rotate at ``segment_max_bytes``.
+
+Appends are buffered and written in batches by a background task that runs
+the blocking I/O in a worker thread. A periodic compactor rewrites sealed
+segments with one block per session and drops records past retention.
+
+Three locks keep the event loop from waiting on disk: ``_pending_lock``
+guards the append queue, ``_lock`` guards the in-memory index and is only
+held to read or swap it, and ``_io_lock`` serializes writers (batches and
+compaction) in their worker threads. A slot's segment indexes are read on
+first use under ``_load_lock`` alone; ``open_slots`` does that for every slot
+at startup, off the event loop.
+
+Every record also has a virtual file name, ``{session}_{llm}_{phase}.json``.
+The collaboration file endpoints list and read these names as if they were
+the old per-phase files.
+"""
+
+from __future__ import annotations
+import asyncio
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:  # optional, falls back to gzip
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+DEFAULT_LOG_SETTINGS: Dict[str, Any] = {
+    'enabled': True,
+    'compression': 'gzip',  # none | gzip | zstd
+    'segment_max_bytes': 4 * 1024 * 1024,
+    'flush_interval_sec': 0.05,
+    'max_batch': 256,
+    'compact_interval_sec': 3600,
+    'retention_days': 30,   # 0 keeps everything
+}
+
+_HEADER = struct.Struct('>IB')
+CODECS = {'none': 0, 'gzip': 1, 'zstd': 2}
+
+
+def _encode(data: bytes, codec: int) -> bytes:
+    if codec == 1:
+        return gzip.compress(data, compresslevel=6)
+    if codec == 2:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decode(payload: bytes, codec: int) -> bytes:
+    if codec == 1:
+        return gzip.decompress(payload)
+    if codec == 2:
+        if zstandard is None:
+            raise ValueError("zstd-compressed segment but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def entry_name(record: Dict[str, Any]) -> str:
+    """Virtual file name of a record, matching the legacy per-phase file names."""
+    return f"{record.get('session')}_{record.get('llm')}_{record.get('phase')}.json"
+
+
+class _Location:
+    __slots__ = ('segment', 'offset', 'session', 'phase', 'size', 'ts')
+
+    def __init__(self, segment: int, offset: int, session: str, phase: str, size: int, ts: float):
+        self.segment = segment
+        self.offset = offset
+        self.session = session
+        self.phase = phase
+        self.size = size
+        self.ts = ts
+
+
+class _SlotLog:
+    """In-memory index of one slot's segments."""
+
+    def __init__(self, directory: Path):
+        self.dir = directory
+        self.sizes: Dict[int, int] = {}
+        self.active = 1
+        self.entries: Dict[str, _Location] = {}
+
+    def seg_path(self, number: int) -> Path:
+        return self.dir / f"seg-{number:06d}.log"
+
+    def idx_path(self, number: int) -> Path:
+        return self.dir / f"seg-{number:06d}.idx"
+
+
+class CollaborationLog:
+    """Per-slot append-only segments with a session index and batched, off-loop writes."""
+
+    def __init__(self, dir_for: Callable[[str], str], settings: Dict[str, Any] | None = None):
+        self.dir_for = dir_for
+        self.settings = {**DEFAULT_LOG_SETTINGS, **(settings or {})}
+        compression = self.settings.get('compression') or 'none'
+        if compression == 'zstd' and zstandard is None:
+            compression = 'gzip'
+        self.codec = CODECS.get(compression, 0)
+        self.segment_max_bytes = int(self.settings['segment_max_bytes'])
+        self._slots: Dict[str, _SlotLog] = {}
+        self._sessions: Dict[str, set] = {}
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._pending_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._compactor: Optional[asyncio.Task] = None
+        self.counters: Dict[str, int] = {
+            'records': 0,
+            'batches': 0,
+            'bytes_written': 0,
+            'rotations': 0,
+            'compactions': 0,
+            'records_expired': 0,
+            'recovered_blocks': 0,
+        }
+
+    # -- index --------------------------------------------------------------
+
+    def _slot(self, slot: str) -> _SlotLog:
+        state = self._slots.get(slot)
+        if state is not None:
+            return state
+        with self._load_lock:
+            state = self._slots.get(slot)
+            if state is not None:
+                return state
+            # Read the segment indexes without the index lock; only publishing the slot takes it
+            state = _SlotLog(Path(self.dir_for(slot)) / 'log')
+            sessions: Dict[str, set] = {}
+            self._load(slot, state, sessions)
+            with self._lock:
+                for session, refs in sessions.items():
+                    self._sessions.setdefault(session, set()).update(refs)
+                self._slots[slot] = state
+            return state
+
+    def open_slots(self, slots: Iterable[str]):
+        """Load the indexes of ``slots`` (blocking; run off the event loop at startup)."""
+        for slot in slots:
+            self._slot(slot)
+
+    def _index_block(self, slot: str, state: _SlotLog, segment: int, offset: int,
+                     entries: Iterable[Tuple[str, str, str, int, float]],
+                     sessions: Optional[Dict[str, set]] = None):
+        sessions = self._sessions if sessions is None else sessions
+        for name, session, phase, size, ts in entries:
+            current = state.entries.get(name)
+            # Compaction can put older records in a higher-numbered segment
+            if current is None or ts >= current.ts:
+                state.entries[name] = _Location(segment, offset, session, phase, size, ts)
+            sessions.setdefault(session, set()).add((slot, segment, offset))
+
+    def _load(self, slot: str, state: _SlotLog, sessions: Dict[str, set]):
+        if not state.dir.exists():
+            return
+        numbers = sorted(int(p.stem.split('-')[1]) for p in state.dir.glob('seg-*.log'))
+        for number in numbers:
+            seg = state.seg_path(number)
+            size = seg.stat().st_size
+            state.sizes[number] = size
+            indexed_to = 0
+            idx = state.idx_path(number)
+            if idx.exists():
+                with open(idx, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            block = json.loads(line)
+                        except ValueError:
+                            break  # torn last line; the tail is recovered below
+                        self._index_block(slot, state, number, block['o'], block['e'], sessions)
+                        indexed_to = max(indexed_to, block['o'] + _HEADER.size + block['n'])
+            if indexed_to < size:
+                self._recover_tail(slot, state, number, indexed_to, size, sessions)
+        if numbers:
+            state.active = numbers[-1]
+
+    def _recover_tail(self, slot: str, state: _SlotLog, number: int, start: int, size: int,
+                      sessions: Dict[str, set]):
+        """Index blocks written after the sidecar was last updated (e.g. after a crash)."""
+        with open(state.seg_path(number), 'rb') as f:
+            offset = start
+            while offset + _HEADER.size <= size:
+                f.seek(offset)
+                length, codec = _HEADER.unpack(f.read(_HEADER.size))
+                payload = f.read(length)
+                if len(payload) < length:
+                    break
+                try:
+                    records = self._records(_decode(payload, codec))
+                except Exception:
+                    break
+                entries = [self._entry_tuple(r) for r in records]
+                self._index_block(slot, state, number, offset, entries, sessions)
+                self._append_idx(state, number, offset, length, entries)
+                self.counters['recovered_blocks'] += 1
+                offset += _HEADER.size + length
+        if offset < size:
+            # Drop a torn trailing block so later appends stay aligned
+            os.truncate(state.seg_path(number), offset)
+        state.sizes[number] = offset
+
+    @staticmethod
+    def _records(data: bytes) -> List[Dict[str, Any]]:
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+
+    @staticmethod
+    def _entry_tuple(record: Dict[str, Any]) -> Tuple[str, str, str, int, float]:
+        return (entry_name(record), record.get('session', ''), record.get('phase', ''),
+                len(str(record.get('content', '')).encode('utf-8')), record.get('timestamp', 0.0))
+
+    def _append_idx(self, state: _SlotLog, number: int, offset: int, length: int, entries: list):
+        with open(state.idx_path(number), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'o': offset, 'n': length, 'e': [list(e) for e in entries]}) + "\n")
+
+    # -- writing ------------------------------------------------------------
+
+    def _encode_block(self, records: List[Dict[str, Any]]) -> Tuple[bytes, list]:
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode('utf-8')
+        return _encode(data, self.codec), [self._entry_tuple(r) for r in records]
+
+    def _append_block(self, state: _SlotLog, number: int, offset: int, payload: bytes, entries: list) -> int:
+        """Write a block and its sidecar line at ``offset`` (file I/O only; caller holds ``_io_lock``)."""
+        state.dir.mkdir(parents=True, exist_ok=True)
+        with open(state.seg_path(number), 'ab') as f:
+            f.write(_HEADER.pack(len(payload), self.codec) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self._append_idx(state, number, offset, len(payload), entries)
+        self.counters['bytes_written'] += _HEADER.size + len(payload)
+        return offset + _HEADER.size + len(payload)
+
+    def _write_block(self, slot: str, records: List[Dict[str, Any]]) -> int:
+        """Append one block of records for ``slot`` (blocking; run off the event loop)."""
+        state = self._slot(slot)
+        payload, entries = self._encode_block(records)
+        with self._io_lock:
+            with self._lock:
+                number = state.active
+                if state.sizes.get(number, 0) >= self.segment_max_bytes:
+                    number = state.active = max(state.sizes, default=number) + 1
+                    self.counters['rotations'] += 1
+                offset = state.sizes.setdefault(number, 0)
+            end = self._append_block(state, number, offset, payload, entries)
+            with self._lock:
+                state.sizes[number] = end
+                self._index_block(slot, state, number, offset, entries)
+        return number
+
+    def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        by_slot: Dict[str, List[Dict[str, Any]]] = {}
+        for slot, record in batch:
+            by_slot.setdefault(slot, []).append(record)
+        for slot, records in by_slot.items():
+            self._write_block(slot, records)
+        self.counters['batches'] += 1
+
+    def append(self, slot: str, record: Dict[str, Any]):
+        """Queue ``record``; it is written in the next batch, off the event loop."""
+        self.counters['records'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_batch([(slot, record)])
+            return
+        with self._pending_lock:
+            self._pending.append((slot, record))
+        self._ensure_flusher(loop)
+        self._wake.set()
+
+    def _ensure_flusher(self, loop: asyncio.AbstractEventLoop):
+        if self._loop is not loop or self._flusher is None or self._flusher.done():
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._write_lock = asyncio.Lock()
+            self._flusher = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        interval = float(self.settings['flush_interval_sec'])
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if len(self._pending) < int(self.settings['max_batch']):
+                await asyncio.sleep(interval)  # let more records join the batch
+            await self.flush()
+
+    async def flush(self):
+        """Write everything queued so far."""
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                await asyncio.to_thread(self._write_batch, batch)
+
+    def flush_sync(self):
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write_batch(batch)
+
+    # -- reading ------------------------------------------------------------
+
+    def _read_block(self, slot: str, segment: int, offset: int) -> List[Dict[str, Any]]:
+        state = self._slot(slot)
+        # Indexed blocks are immutable, so reads need no lock
+        with open(state.seg_path(segment), 'rb') as f:
+            f.seek(offset)
+            length, codec = _HEADER.unpack(f.read(_HEADER.size))
+            payload = f.read(length)
+        return self._records(_decode(payload, codec))
+
+    def _pending_for(self, match: Callable[[str, Dict[str, Any]], bool]) -> List[Dict[str, Any]]:
+        with self._pending_lock:
+            return [record for slot, record in self._pending if match(slot, record)]
+
+    def read_session(self, session_id: str, slots: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """All records of a session across ``slots`` (and any slot already loaded), oldest first."""
+        for slot in slots:
+            self._slot(slot)
+        records: List[Dict[str, Any]] = []
+        with self._lock:
+            refs = sorted(self._sessions.get(session_id, ()))
+        for slot, segment, offset in refs:
+            try:
+                block = self._read_block(slot, segment, offset)
+            except (OSError, ValueError):
+                continue
+            records.extend(r for r in block if r.get('session') == session_id)
+        records.extend(self._pending_for(lambda _s, r: r.get('session') == session_id))
+        return sorted(records, key=lambda r: r.get('timestamp', 0))
+
+    def list_entries(self, slot: str) -> List[Dict[str, Any]]:
+        """Virtual per-phase "files" for ``slot``, newest first."""
+        state = self._slot(slot)
+        with self._lock:
+            items = [{'name': name, 'size': loc.size, 'modified': loc.ts, 'session': loc.session,
+                      'phase': loc.phase, 'path': f"{state.seg_path(loc.segment)}@{loc.offset}"}
+                     for name, loc in state.entries.items()]
+        return sorted(items, key=lambda x: x['modified'], reverse=True)
+
+    def read_entry(self, slot: str, name: str) -> Optional[Dict[str, Any]]:
+        pending = self._pending_for(lambda s, r: s == slot and entry_name(r) == name)
+        if pending:
+            return pending[-1]
+        state = self._slot(slot)
+        for _ in range(2):
+            with self._lock:
+                loc = state.entries.get(name)
+            if loc is None:
+                return None
+            try:
+                block = self._read_block(slot, loc.segment, loc.offset)
+            except FileNotFoundError:
+                continue  # compacted away since the lookup; the index now points at the merged segment
+            matches = [r for r in block if entry_name(r) == name]
+            return matches[-1] if matches else None
+        return None
+
+    def recent(self, slot: str, n: int = 1) -> List[Dict[str, Any]]:
+        """The ``n`` most recent records for ``slot``, newest first."""
+        records = []
+        for item in self.list_entries(slot)[:n]:
+            record = self.read_entry(slot, item['name'])
+            if record is not None:
+                records.append(record)
+        pending = self._pending_for(lambda s, _r: s == slot)
+        return (list(reversed(pending)) + records)[:n]
+
+    # -- compaction ---------------------------------------------------------
+
+    def compact(self, slot: str) -> int:
+        """Merge the slot's sealed segments into one, a block per session; returns records kept.
+
+        Blocking; the merge runs outside the index lock, which is only taken to
+        snapshot the sealed segments and to swap in the merged one.
+        """
+        state = self._slot(slot)
+        retention = float(self.settings.get('retention_days') or 0) * 86400
+        cutoff = time.time() - retention if retention else None
+        with self._io_lock:
+            with self._lock:
+                sealed = sorted(n for n in state.sizes if n != state.active)
+                if not sealed:
+                    return 0
+                live = {name: (loc.segment, loc.offset) for name, loc in state.entries.items()
+                        if loc.segment in sealed}
+                target = max(state.sizes) + 1
+            by_session: Dict[str, List[Dict[str, Any]]] = {}
+            expired = 0
+            for number in sealed:
+                for offset in sorted({off for seg, off in live.values() if seg == number}):
+                    for record in self._read_block(slot, number, offset):
+                        if live.get(entry_name(record)) != (number, offset):
+                            continue  # superseded by a later write
+                        if cutoff is not None and record.get('timestamp', 0) < cutoff:
+                            expired += 1
+                            continue
+                        by_session.setdefault(record.get('session', ''), []).append(record)
+            blocks = []
+            size = kept = 0
+            for records in by_session.values():
+                payload, entries = self._encode_block(records)
+                blocks.append((size, entries))
+                size = self._append_block(state, target, size, payload, entries)
+                kept += len(records)
+            with self._lock:
+                # Drop the old segments from the index, then index the merged one
+                for name in [name for name, loc in state.entries.items() if loc.segment in sealed]:
+                    del state.entries[name]
+                for refs in self._sessions.values():
+                    refs.difference_update({ref for ref in refs if ref[0] == slot and ref[1] in sealed})
+                for offset, entries in blocks:
+                    self._index_block(slot, state, target, offset, entries)
+                for number in sealed:
+                    state.sizes.pop(number, None)
+                if kept:
+                    state.sizes[target] = size
+                    state.active = target  # the newest segment takes further appends
+                self._sessions = {sid: refs for sid, refs in self._sessions.items() if refs}
+                self.counters['compactions'] += 1
+                self.counters['records_expired'] += expired
+            for number in sealed:
+                for path in (state.seg_path(number), state.idx_path(number)):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+        return kept
+
+    async def _compact_loop(self, slots: Callable[[], Iterable[str]]):
+        interval = float(self.settings['compact_interval_sec'])
+        while True:
+            await asyncio.sleep(interval)
+            for slot in list(slots()):
+                try:
+                    await asyncio.to_thread(self.compact, slot)
+                except Exception:
+                    pass
+
+    def start_compactor(self, slots: Callable[[], Iterable[str]]):
+        """Run :meth:`compact` for every slot every ``compact_interval_sec``."""
+        if self._compactor is None or self._compactor.done():
+            self._compactor = asyncio.get_running_loop().create_task(self._compact_loop(slots))
+
+    async def aclose(self):
+        for task in (self._compactor, self._flusher):
+            if task is not None and not task.done():
+                task.cancel()
+        self._compactor = self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            pending = len(self._pending)
+        with self._lock:
+            return {
+                **self.counters,
+                'pending': pending,
+                'slots': len(self._slots),
+                'segments': sum(len(s.sizes) for s in self._slots.values()),
+                'sessions_indexed': len(self._sessions),
+                'codec': {v: k for k, v in CODECS.items()}[self.codec],
+            }
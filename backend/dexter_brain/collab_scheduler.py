@@ -0,0 +1,209 @@
+"""
+Admission control for collaboration sessions.
+
+Chat, campaign planning, skill generation and error healing all start
+collaborations. ``CollaborationScheduler`` sits in front of
+``CollaborationManager.broadcast_user_input``: at most
+``max_concurrent_sessions`` sessions run at once, and no slot takes part in
+more than ``max_inflight_per_slot`` of them. Further requests queue in
+priority order (interactive > campaign > skill_generation > healing; FIFO
+within a class) and a waiter is only admitted when nothing ahead of it is
+still waiting, so a burst of healing work cannot starve chat.
+
+Under overload low-priority work is shed with :class:`CollaborationOverloaded`:
+when its class queue is full, when it has waited longer than the class's
+``max_wait_sec``, or when a higher-priority request needs its queue spot.
+"""
+
+from __future__ import annotations
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, Iterable, List
+
+PRIORITIES = {'interactive': 0, 'campaign': 1, 'skill_generation': 2, 'healing': 3}
+
+DEFAULT_SCHEDULER_SETTINGS: Dict[str, Any] = {
+    'enabled': True,
+    'max_concurrent_sessions': 4,
+    'max_inflight_per_slot': 4,
+    'max_queued': {'interactive': 50, 'campaign': 20, 'skill_generation': 10, 'healing': 5},
+    'max_queued_total': 50,
+    'max_wait_sec': {'interactive': 0, 'campaign': 300, 'skill_generation': 120, 'healing': 60},  # 0 = no limit
+}
+
+
+class CollaborationOverloaded(RuntimeError):
+    """A collaboration request was shed instead of queued or admitted."""
+
+    def __init__(self, priority: str, reason: str):
+        super().__init__(f"Collaboration overloaded: {priority} request shed ({reason})")
+        self.priority = priority
+        self.reason = reason
+
+
+class Ticket:
+    """One admitted session's hold on the scheduler; release it exactly once."""
+
+    __slots__ = ('scheduler', 'priority', 'slots', 'queue_sec', 'released')
+
+    def __init__(self, scheduler: 'CollaborationScheduler', priority: str, slots: List[str], queue_sec: float):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.slots = slots
+        self.queue_sec = queue_sec
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.scheduler._release(self)
+
+
+class _Waiter:
+    __slots__ = ('priority', 'rank', 'seq', 'slots', 'future', 'enqueued')
+
+    def __init__(self, priority: str, seq: int, slots: List[str], future: asyncio.Future):
+        self.priority = priority
+        self.rank = PRIORITIES[priority]
+        self.seq = seq
+        self.slots = slots
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class CollaborationScheduler:
+    """Priority queue with session and per-slot concurrency caps."""
+
+    def __init__(self, settings: Dict[str, Any] | None = None):
+        self.configure(settings)
+        self.running = 0
+        self.inflight: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.metrics: Dict[str, Dict[str, Any]] = {
+            name: {'admitted': 0, 'shed': 0, 'queued_now': 0, 'queue_sec_total': 0.0, 'queue_sec_max': 0.0}
+            for name in PRIORITIES
+        }
+
+    @classmethod
+    def from_config(cls, config) -> 'CollaborationScheduler':
+        collab = getattr(config, 'collaboration', {}) if hasattr(config, 'collaboration') else {}
+        return cls((collab or {}).get('scheduler', {}))
+
+    def configure(self, settings: Dict[str, Any] | None):
+        """Apply (re)loaded settings; running sessions and waiters are kept."""
+        settings = settings or {}
+        merged = {**DEFAULT_SCHEDULER_SETTINGS, **settings}
+        for key in ('max_queued', 'max_wait_sec'):
+            merged[key] = {**DEFAULT_SCHEDULER_SETTINGS[key], **settings.get(key, {})}
+        self.settings = merged
+        if getattr(self, '_waiters', None):
+            self._dispatch()
+
+    # -- admission ----------------------------------------------------------
+
+    def _fits(self, slots: Iterable[str]) -> bool:
+        if self.running >= int(self.settings['max_concurrent_sessions']):
+            return False
+        cap = int(self.settings['max_inflight_per_slot'])
+        return all(self.inflight.get(slot, 0) < cap for slot in slots)
+
+    def _grant(self, priority: str, slots: List[str], queue_sec: float) -> Ticket:
+        self.running += 1
+        for slot in slots:
+            self.inflight[slot] = self.inflight.get(slot, 0) + 1
+        m = self.metrics[priority]
+        m['admitted'] += 1
+        m['queue_sec_total'] += queue_sec
+        m['queue_sec_max'] = max(m['queue_sec_max'], queue_sec)
+        return Ticket(self, priority, slots, queue_sec)
+
+    def _shed(self, waiter: _Waiter, reason: str):
+        self._waiters.remove(waiter)
+        self.metrics[waiter.priority]['queued_now'] -= 1
+        self.metrics[waiter.priority]['shed'] += 1
+        if not waiter.future.done():
+            waiter.future.set_exception(CollaborationOverloaded(waiter.priority, reason))
+
+    async def admit(self, priority: str, slots: List[str]) -> Ticket:
+        """Wait for capacity to run a session on ``slots``; raises CollaborationOverloaded if shed."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown collaboration priority: {priority}")
+        slots = list(slots)
+        if not self.settings.get('enabled', True):
+            return self._grant(priority, slots, 0.0)
+        if not self._waiters and self._fits(slots):
+            return self._grant(priority, slots, 0.0)
+
+        rank = PRIORITIES[priority]
+        if sum(1 for w in self._waiters if w.priority == priority) >= int(self.settings['max_queued'][priority]):
+            self.metrics[priority]['shed'] += 1
+            raise CollaborationOverloaded(priority, "queue full")
+        if len(self._waiters) >= int(self.settings['max_queued_total']):
+            # Make room by shedding the newest waiter of the lowest class below this one
+            victims = [w for w in self._waiters if w.rank > rank]
+            if not victims:
+                self.metrics[priority]['shed'] += 1
+                raise CollaborationOverloaded(priority, "queue full")
+            self._shed(max(victims, key=lambda w: (w.rank, w.seq)), "displaced by higher-priority work")
+
+        waiter = _Waiter(priority, next(self._seq), slots, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: (w.rank, w.seq))
+        self.metrics[priority]['queued_now'] += 1
+        limit = float(self.settings['max_wait_sec'].get(priority) or 0) or None
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), limit)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._shed(waiter, f"waited over {limit:g}s")
+                self._dispatch()
+            return waiter.future.result()  # granted at the deadline, or raises the shed error
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.metrics[priority]['queued_now'] -= 1
+                waiter.future.cancel()
+                self._dispatch()
+            elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                waiter.future.result().release()  # granted just as we were cancelled
+            raise
+
+    def _dispatch(self):
+        """Admit waiters in priority order while the one at the head fits."""
+        while self._waiters:
+            head = self._waiters[0]
+            if not self._fits(head.slots):
+                break
+            self._waiters.pop(0)
+            self.metrics[head.priority]['queued_now'] -= 1
+            head.future.set_result(self._grant(head.priority, head.slots, time.monotonic() - head.enqueued))
+
+    def _release(self, ticket: Ticket):
+        self.running = max(0, self.running - 1)
+        for slot in ticket.slots:
+            left = self.inflight.get(slot, 0) - 1
+            if left > 0:
+                self.inflight[slot] = left
+            else:
+                self.inflight.pop(slot, None)
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        classes = {}
+        for name, m in self.metrics.items():
+            classes[name] = {
+                **m,
+                'queue_sec_total': round(m['queue_sec_total'], 3),
+                'queue_sec_max': round(m['queue_sec_max'], 3),
+                'queue_sec_avg': round(m['queue_sec_total'] / m['admitted'], 3) if m['admitted'] else 0.0,
+            }
+        return {
+            'running': self.running,
+            'queued': len(self._waiters),
+            'max_concurrent_sessions': int(self.settings['max_concurrent_sessions']),
+            'max_inflight_per_slot': int(self.settings['max_inflight_per_slot']),
+            'inflight': dict(self.inflight),
+            'classes': classes,
+        }
@@ -0,0 +1,54 @@
+"""
+Collaboration topologies.
+
+``all`` is the original design: every slot refines against every peer and
+votes over every solution, so each prompt carries n - 1 peer outputs and a
+session costs O(n^2) prompt tokens.
+
+``tournament`` splits the slots into panels of at most ``panel_size``. Slots
+refine against their own panel only, and each panel votes for a winner.
+Winners are regrouped into panels for the next round until one panel is left.
+That final round is an ordinary vote that every surviving slot takes part in.
+A slot judges the panel that holds the candidate representing it, so every
+prompt carries at most ``panel_size`` solutions. A session takes
+ceil(log_k n) voting rounds.
+"""
+
+from __future__ import annotations
+import math
+from typing import Dict, List, Optional
+
+TOPOLOGIES = ('all', 'tournament')
+
+
+def split_groups(names: List[str], size: int) -> List[List[str]]:
+    """``names`` in order, cut into the fewest groups of at most ``size`` with sizes within one of each other."""
+    if not names:
+        return []
+    count = math.ceil(len(names) / max(2, size))
+    base, extra = divmod(len(names), count)
+    groups, start = [], 0
+    for i in range(count):
+        end = start + base + (1 if i < extra else 0)
+        groups.append(names[start:end])
+        start = end
+    return groups
+
+
+def round_count(n: int, size: int) -> int:
+    """Voting rounds a tournament over ``n`` slots takes."""
+    rounds = 1
+    while n > max(2, size):
+        n = len(split_groups(list(range(n)), size))
+        rounds += 1
+    return rounds
+
+
+def group_winner(group: List[str], ballots: Dict[str, Optional[str]]) -> str:
+    """Most-voted member of ``group``; ties (and no votes) go to the earlier member."""
+    by_vote = {name.lower(): name for name in group}
+    counts = {name: 0 for name in group}
+    for choice in ballots.values():
+        if choice in by_vote:
+            counts[by_vote[choice]] += 1
+    return max(group, key=lambda name: (counts[name], -group.index(name)))
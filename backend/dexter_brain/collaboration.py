@@ -1,33 +1,213 @@
 from __future__ import annotations
 import asyncio
 import json
+import math
 import os
+import re
 import time
 import uuid
-from typing import Any, Dict, List, Optional, Callable
-from .llm import call_slot
-from .events import emit
+from typing import Any, Dict, List, Optional, Callable, Tuple
+from .llm import call_slot, stream_slot
+from .events import emit, emit_soon
+from .circuit_breaker import get_breaker
+from .session_store import SessionStore
+from .collab_log import CollaborationLog
+from .slot_heads import SlotHeads
+from .collab_index import CollaborationIndex
+from .rate_limit import estimate_tokens
+from .collab_scheduler import CollaborationScheduler, Ticket
+from .prompt_budget import DigestCache, prompt_tokens_for
+from .collab_topology import TOPOLOGIES, group_winner, split_groups
+from .consensus import ACTIONS, DEFAULT_CONSENSUS_SETTINGS, find_clusters
+from .cascade import extract_code, parse_confidence, settings_for, tiers_for
+from .conversation import Conversation, system_prompt
+
+# Session keys that collect each phase's per-LLM output
+PHASE_KEYS = {"proposal": "proposals", "refinement": "refinements", "vote": "votes", "error": "errors"}
+
+VOTE_RE = re.compile(r"VOTE:\s*(\w+)", re.IGNORECASE)
+
+
+def parse_vote(content: str) -> Optional[str]:
+    """The candidate named in a "VOTE: <name>" reply, lowercased"""
+    match = VOTE_RE.search(content or "")
+    return match.group(1).lower() if match else None
+
+
+class PhaseBarrier:
+    """Releases waiting workers once every expected LLM has finished a phase.
+
+    If some are slow, the barrier also releases when a quorum has arrived and
+    ``deadline_sec`` has passed since the first arrival, or unconditionally
+    after ``max_wait_sec``. Once released it stays open, so stragglers carry
+    straight on.
+    """
+
+    def __init__(self, phase: str, expected: List[str], quorum: float, deadline_sec: float, max_wait_sec: float):
+        self.phase = phase
+        self.expected = set(expected)
+        self.arrived: Dict[str, float] = {}
+        self.quorum = quorum
+        self.deadline_sec = deadline_sec
+        self.max_wait_sec = max_wait_sec
+        self.opened_ts = time.time()
+        self.first_arrival: Optional[float] = None
+        self.released_ts: Optional[float] = None
+        self.released_by: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def arrive(self, llm_name: str):
+        self.arrived[llm_name] = time.time()
+        if self.first_arrival is None:
+            self.first_arrival = time.monotonic()
+        self._notify()
+
+    def drop(self, llm_name: str):
+        """Stop expecting ``llm_name`` (its worker failed or was cancelled)."""
+        self.expected.discard(llm_name)
+        self._notify()
+
+    def _check(self) -> Optional[float]:
+        """Release (returning None) or return how long to wait before re-checking."""
+        if self.released_by:
+            return None
+        pending = self.expected - set(self.arrived)
+        if not pending:
+            self._release("all")
+            return None
+        waited = time.monotonic() - (self.first_arrival or time.monotonic())
+        needed = max(1, math.ceil(self.quorum * len(self.expected)))
+        if len(self.arrived) >= needed and waited >= self.deadline_sec:
+            self._release("quorum_deadline")
+            return None
+        if waited >= self.max_wait_sec:
+            self._release("max_wait")
+            return None
+        if len(self.arrived) >= needed:
+            return self.deadline_sec - waited
+        return self.max_wait_sec - waited
+
+    def _release(self, reason: str):
+        self.released_ts = time.time()
+        self.released_by = reason
+
+    async def wait(self) -> float:
+        """Block until the barrier releases; returns seconds spent waiting."""
+        start = time.monotonic()
+        while True:
+            remaining = self._check()
+            if remaining is None:
+                return time.monotonic() - start
+            try:
+                await asyncio.wait_for(self._changed.wait(), max(remaining, 0.001))
+            except asyncio.TimeoutError:
+                pass
+
+    def timing(self) -> Dict[str, Any]:
+        return {
+            "opened_ts": self.opened_ts,
+            "released_ts": self.released_ts,
+            "released_by": self.released_by,
+            "arrived": sorted(self.arrived),
+            "expected": sorted(self.expected),
+            "wall_sec": round(self.released_ts - self.opened_ts, 3) if self.released_ts else None,
+        }
+
 
 class CollaborationManager:
-    def __init__(self, config, collaboration_folder: str | None = None):
+    def __init__(self, config, collaboration_folder: str | None = None, *,
+                 log: CollaborationLog | None = None, heads: SlotHeads | None = None,
+                 files_index: CollaborationIndex | None = None,
+                 scheduler: CollaborationScheduler | None = None,
+                 sessions: SessionStore | None = None):
         self.config = config
         # Use config.collaboration.base_directory by default
         base_dir = getattr(self.config, 'collaboration', {}).get('base_directory', './collaboration')
         self.collaboration_folder = collaboration_folder or base_dir
-        self.active_sessions: Dict[str, Dict] = {}
+        # Hot sessions in memory; finished ones spill to the database and reload on demand.
+        # A manager rebuilt after a config reload takes over the previous store and its connection.
+        self.active_sessions: SessionStore = sessions if sessions is not None else SessionStore.from_config(config)
+        # Per-slot append-only log of every phase output (None = legacy one file per phase).
+        # A manager rebuilt after a config reload takes over the previous log so there is one writer.
+        log_settings = self.config.collaboration.get('log', {})
+        self.log: Optional[CollaborationLog] = None
+        if log is not None:
+            self.log = log
+            log.dir_for = self._model_dir
+        elif log_settings.get('enabled', True):
+            self.log = CollaborationLog(self._model_dir, log_settings)
+        # Latest outputs per slot for the head endpoint; carried over on reload like the log
+        self.heads: SlotHeads = heads or SlotHeads(self.config.collaboration.get('head_buffer_size', 20))
+        # Cached listing of every slot's artifacts for /collaboration/files
+        if files_index is not None:
+            files_index.dir_for, files_index.log = self._model_dir, self.log
+        self.files_index: CollaborationIndex = files_index or CollaborationIndex(self._model_dir, self.log)
+        # Admission control shared by every caller; a reloaded manager keeps its queue and counts
+        if scheduler is not None:
+            scheduler.configure(self.config.collaboration.get('scheduler', {}))
+        self.scheduler: CollaborationScheduler = scheduler or CollaborationScheduler.from_config(config)
+        # Per-session asyncio objects (phase barriers); kept out of the JSON-able session dicts
+        self._runtime: Dict[str, Dict[str, Any]] = {}
+        # Sessions checked for early consensus, and what skipping phases saved
+        self.consensus_stats: Dict[str, Any] = {"checked": 0, "skipped_refinement": 0, "finished": 0,
+                                                "est_sec_saved": 0.0}
+        # Cascade sessions and escalations per request class
+        self.cascade_stats: Dict[str, Dict[str, Any]] = {}
+        # Optional async (code, request) -> passed? hook used by cascades that test code
+        self.sandbox_check: Optional[Callable[[str, str], Any]] = None
         os.makedirs(self.collaboration_folder, exist_ok=True)
         
         # Ensure all model collaboration directories exist
         self.ensure_collaboration_directories()
         
-    async def broadcast_user_input(self, user_input: str, session_id: str = None) -> str:
-        """Immediately broadcast user input to all enabled LLMs"""
+    async def broadcast_user_input(self, user_input: str, session_id: str = None, *,
+                                   priority: str = 'interactive',
+                                   deadline_sec: Optional[float] = None, max_tokens: Optional[int] = None,
+                                   max_cost_usd: Optional[float] = None,
+                                   topology: Optional[str] = None) -> str:
+        """Broadcast user input to all enabled LLMs once the scheduler admits it.
+
+        ``priority`` is one of interactive, campaign, skill_generation or
+        healing; raises ``CollaborationOverloaded`` if the request is shed.
+        ``topology`` is "all" or "tournament" (see collab_topology.py) and
+        defaults to ``collaboration.topology``. If ``collaboration.cascade``
+        is enabled for the priority's class, only the cheapest tier of slots
+        starts and more expensive tiers join on a weak result (see cascade.py).
+
+        The session is cancelled once it runs past ``deadline_sec`` or its
+        calls use more than ``max_tokens`` / ``max_cost_usd`` (0 = no limit);
+        unset values come from ``collaboration.session_deadline_sec`` and
+        ``collaboration.budget``.
+        """
         if session_id is None:
             session_id = str(uuid.uuid4())
+        collab = self.config.collaboration
+        topology = topology or collab.get('topology', 'all')
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown collaboration topology: {topology}")
+        budget_cfg = collab.get('budget', {})
+        budget = {
+            "deadline_sec": float(collab.get('session_deadline_sec', 0) if deadline_sec is None else deadline_sec),
+            "max_tokens": int(budget_cfg.get('max_tokens', 0) if max_tokens is None else max_tokens),
+            "max_cost_usd": float(budget_cfg.get('max_cost_usd', 0) if max_cost_usd is None else max_cost_usd),
+        }
             
-        # Get all enabled LLMs except Dexter
-        enabled_llms = [name for name, model in self.config.models.items() 
-                       if model.get('enabled') and name != 'dexter']
+        # Get all enabled LLMs except Dexter, leaving out slots whose circuit is open
+        enabled_llms = []
+        skipped_llms = {}
+        for name, model in self.config.models.items():
+            if not model.get('enabled') or name == 'dexter':
+                continue
+            breaker = get_breaker(self.config, name)
+            if breaker is not None and not breaker.allow():
+                skipped_llms[name] = breaker.stats()
+            else:
+                enabled_llms.append(name)
+        ticket: Ticket = await self.scheduler.admit(priority, enabled_llms)
         
         # Create collaboration session
         session = {
@@ -35,25 +215,95 @@ class CollaborationManager:
             "user_input": user_input,
             "started_ts": time.time(),
             "llms": enabled_llms,
+            "skipped_llms": sorted(skipped_llms),
             "status": "active",
             "proposals": {},
             "votes": {},
-            "consensus": None
+            "vote_tally": {},
+            "ballots": {},
+            "consensus": None,
+            "phase_timings": {},
+            "barrier_waits": {},
+            "budget": budget,
+            "priority": priority,
+            "queue_sec": round(ticket.queue_sec, 3),
+            "prompt_tokens": {},
+            "prompt_eval": {},
+            "usage": {"calls": 0, "tokens": 0, "cost_usd": 0.0, "by_llm": {}},
+            "topology": topology
         }
+        participants = enabled_llms
+        cascade = settings_for(collab.get('cascade'), priority)
+        tiers = tiers_for(self.config.models, enabled_llms)
+        if cascade['enabled'] and len(tiers) > 1:
+            participants = tiers[0]
+            session["cascade"] = {"tiers": tiers, "tier": 1, "settled": False, "history": []}
+            self._count_cascade(priority, "sessions")
         self.active_sessions[session_id] = session
+        self._runtime[session_id] = {
+            "barriers": {},
+            "workers_left": 0,
+            "tasks": {},
+            "done": asyncio.Event(),
+            "deadline": None,
+            "ticket": ticket,
+            "digests": DigestCache(collab.get('prompt_budget', {})),
+            "lineage": {},
+            "conversations": {},
+        }
+        if budget["deadline_sec"] > 0 and participants:
+            self._runtime[session_id]["deadline"] = asyncio.get_running_loop().call_later(
+                budget["deadline_sec"], self._deadline_expired, session_id)
+        
+        for name, breaker_state in skipped_llms.items():
+            await emit({
+                "slot": name,
+                "event": "llm.skipped",
+                "text": f"Skipped: circuit {breaker_state['state']} ({breaker_state.get('last_error') or 'unhealthy'})",
+                "session_id": session_id
+            })
         
         # Emit collaboration start event
         await emit({
             "slot": "system", 
             "event": "collaboration.started", 
-            "text": f"Started collaboration with {len(enabled_llms)} LLMs: {', '.join(enabled_llms)}",
+            "text": f"Started collaboration with {len(participants)} LLMs: {', '.join(participants)}",
             "session_id": session_id,
-            "llms": enabled_llms
+            "llms": participants
         })
         
-        # Start all LLMs working in parallel
-        tasks = []
-        for llm_name in enabled_llms:
+        # Let them work in background
+        await self._start_workers(session_id, participants)
+        self._check_complete(session_id)
+        if not participants:
+            self._runtime.pop(session_id, None)
+            ticket.release()
+            self._finish_session(session_id)
+        return session_id
+
+    async def _start_workers(self, session_id: str, llms: List[str]):
+        """Start ``llms`` working on the session in parallel, with fresh phase barriers; the session owns their tasks"""
+        session = self.active_sessions[session_id]
+        runtime = self._runtime[session_id]
+        collab = self.config.collaboration
+        user_input = session["user_input"]
+        session["llms"] = list(llms)
+        if session["topology"] == "tournament":
+            panel_size = int(collab.get('panel_size', 4))
+            session["tournament"] = {"panel_size": panel_size, "panels": split_groups(list(llms), panel_size),
+                                     "rounds": []}
+        deadlines = collab.get('phase_deadline_sec', {})
+        runtime["barriers"] = {
+            phase: PhaseBarrier(phase, llms,
+                                quorum=float(collab.get('phase_quorum', 0.5)),
+                                deadline_sec=float(deadlines.get(phase, 15.0)),
+                                max_wait_sec=float(collab.get('phase_max_wait_sec', 120.0)))
+            for phase in ("proposal", "refinement")
+        }
+        runtime["lineage"] = {}
+        runtime.pop("consensus", None)
+        runtime["workers_left"] += len(llms)
+        for llm_name in llms:
             # Emit LLM start event
             await emit({
                 "slot": llm_name,
@@ -61,11 +311,8 @@ class CollaborationManager:
                 "text": f"Starting work on: {user_input[:50]}...",
                 "session_id": session_id
             })
-            task = asyncio.create_task(self._llm_collaboration_worker(session_id, llm_name, user_input))
-            tasks.append(task)
-        
-        # Let them work in background
-        return session_id
+            runtime["tasks"][llm_name] = asyncio.create_task(
+                self._llm_collaboration_worker(session_id, llm_name, user_input))
 
     async def _llm_collaboration_worker(self, session_id: str, llm_name: str, user_input: str):
         """Background worker for individual LLM collaboration"""
@@ -88,9 +335,13 @@ class CollaborationManager:
                 "session_id": session_id
             })
             
-            # Phase 2: Read peers and refine
-            await asyncio.sleep(2)  # Give others time to write proposals
-            peer_proposals = await self._read_peer_proposals(session_id, llm_name)
+            # Phase 2: Read peers and refine once the proposal barrier releases,
+            # unless the proposals already agree
+            await self._phase_barrier(session_id, llm_name, "proposal")
+            consensus = await self._detect_consensus(session_id)
+            if consensus and consensus["action"] == "finish":
+                return
+            peer_proposals = [] if consensus else await self._read_peer_proposals(session_id, llm_name)
             
             if peer_proposals:
                 await emit({
@@ -100,7 +351,7 @@ class CollaborationManager:
                     "session_id": session_id
                 })
                 
-                refinement = await self._get_llm_refinement(llm_name, user_input, proposal, peer_proposals)
+                refinement = await self._get_llm_refinement(llm_name, user_input, proposal, peer_proposals, session_id)
                 await self._write_collaboration_file(session_id, llm_name, "refinement", refinement)
                 
                 await emit({
@@ -110,8 +361,13 @@ class CollaborationManager:
                     "session_id": session_id
                 })
             
-            # Phase 3: Vote on best solution
-            await asyncio.sleep(1)  # Give time for refinements
+            # Phase 3: Vote on best solution once refinements are in
+            await self._phase_barrier(session_id, llm_name, "refinement")
+            finalists = None
+            if "tournament" in self.active_sessions.get(session_id, {}):
+                finalists = await self._play_tournament(session_id, llm_name, user_input)
+                if finalists is None:
+                    return  # no candidate left to speak for
             await emit({
                 "slot": llm_name,
                 "event": "phase.voting", 
@@ -120,8 +376,12 @@ class CollaborationManager:
             })
             
             all_solutions = await self._read_all_solutions(session_id)
-            vote = await self._get_llm_vote(llm_name, user_input, all_solutions)
+            if finalists is not None:
+                all_solutions = {llm: all_solutions[llm] for llm in finalists if llm in all_solutions}
+            vote = await self._get_llm_vote(llm_name, user_input, all_solutions, session_id)
             await self._write_collaboration_file(session_id, llm_name, "vote", vote)
+            if not self._check_complete(session_id):
+                await self._decide_early(session_id)
             
             await emit({
                 "slot": llm_name,
@@ -138,6 +398,346 @@ class CollaborationManager:
                 "session_id": session_id
             })
             await self._write_collaboration_file(session_id, llm_name, "error", str(e))
+        finally:
+            self._worker_finished(session_id, llm_name)
+
+    async def _phase_barrier(self, session_id: str, llm_name: str, phase: str, after: Optional[str] = None):
+        """Mark ``llm_name`` done with ``phase`` and wait for the session's barrier.
+
+        ``after`` names the phase whose release started this one (for timings).
+        """
+        runtime = self._runtime.get(session_id)
+        if runtime is None:
+            return
+        barrier = runtime["barriers"][phase]
+        already_released = barrier.released_by is not None
+        barrier.arrive(llm_name)
+        waited = await barrier.wait()
+        session = self.active_sessions.get(session_id)
+        if session is None:
+            return
+        session["barrier_waits"].setdefault(llm_name, {})[phase] = round(waited, 3)
+        if not already_released and phase not in session["phase_timings"]:
+            timing = barrier.timing()
+            # A phase starts when the previous phase's barrier released
+            phase_start = session["started_ts"]
+            after = after or ("proposal" if phase == "refinement" else None)
+            if after:
+                phase_start = session["phase_timings"].get(after, {}).get("released_ts") or phase_start
+            timing["phase_sec"] = round(timing["released_ts"] - phase_start, 3)
+            session["phase_timings"][phase] = timing
+            await emit({
+                "slot": "system",
+                "event": "phase.barrier_released",
+                "text": f"{phase} barrier released ({timing['released_by']}, "
+                        f"{len(timing['arrived'])}/{len(timing['expected'])} in) after {timing['phase_sec']}s",
+                "session_id": session_id,
+                "phase": phase,
+            })
+
+    async def _play_tournament(self, session_id: str, llm_name: str, user_input: str) -> Optional[List[str]]:
+        """Judge ``llm_name``'s panel in each intermediate round of a tournament session.
+
+        Returns the finalists for the ordinary vote, or None if ``llm_name``
+        has no part in it (it joined too late or the session is gone).
+        """
+        round_no = 1
+        while True:
+            rnd = self._tournament_round(session_id, round_no)
+            if rnd is None or llm_name not in rnd["judges"]:
+                return None
+            group = rnd["groups"][rnd["judges"][llm_name]]
+            if len(rnd["groups"]) == 1:
+                return group
+            phase = f"r{round_no}_vote"
+            if len(group) > 1:
+                await emit({
+                    "slot": llm_name,
+                    "event": "phase.voting",
+                    "text": f"Round {round_no}: judging {', '.join(group)}...",
+                    "session_id": session_id
+                })
+                solutions = await self._read_all_solutions(session_id)
+                ballot = await self._get_llm_vote(llm_name, user_input,
+                                                  {llm: solutions[llm] for llm in group if llm in solutions},
+                                                  session_id)
+                await self._write_collaboration_file(session_id, llm_name, phase, ballot)
+                rnd["ballots"][llm_name] = parse_vote(ballot)
+            await self._phase_barrier(session_id, llm_name, phase,
+                                      after="refinement" if round_no == 1 else f"r{round_no - 1}_vote")
+            await self._close_round(session_id, round_no)
+            round_no += 1
+
+    def _tournament_round(self, session_id: str, round_no: int) -> Optional[Dict[str, Any]]:
+        """Round ``round_no`` of a tournament, drawn up by the first worker to reach it"""
+        session = self.active_sessions.get(session_id)
+        runtime = self._runtime.get(session_id)
+        if session is None or runtime is None:
+            return None
+        tournament = session["tournament"]
+        rounds = tournament["rounds"]
+        if len(rounds) >= round_no:
+            return rounds[round_no - 1]
+        lineage = runtime["lineage"]
+        if round_no == 1:
+            # Everyone with a proposal stands for themselves in their own panel
+            proposed = session.get("proposals", {})
+            lineage.update({llm: [llm] for llm in session["llms"] if llm in proposed})
+            groups = [[llm for llm in panel if llm in lineage] for panel in tournament["panels"]]
+            groups = [group for group in groups if group]
+        else:
+            groups = split_groups(rounds[-1]["winners"], tournament["panel_size"])
+        judges = {judge: i for i, group in enumerate(groups) for llm in group for judge in lineage[llm]}
+        live = [judge for judge in judges if judge in runtime["tasks"]]
+        rnd = {"round": round_no, "groups": groups, "judges": judges, "ballots": {}, "winners": None}
+        rounds.append(rnd)
+        if len(groups) == 1:
+            session["voters"] = live
+        else:
+            collab = self.config.collaboration
+            phase = f"r{round_no}_vote"
+            runtime["barriers"][phase] = PhaseBarrier(
+                phase, live, quorum=float(collab.get('phase_quorum', 0.5)),
+                deadline_sec=float(collab.get('phase_deadline_sec', {}).get('vote', 15.0)),
+                max_wait_sec=float(collab.get('phase_max_wait_sec', 120.0)))
+        return rnd
+
+    async def _close_round(self, session_id: str, round_no: int):
+        """Pick each panel's winner once the round's barrier has released"""
+        session = self.active_sessions.get(session_id)
+        runtime = self._runtime.get(session_id)
+        if session is None or runtime is None:
+            return
+        rnd = session["tournament"]["rounds"][round_no - 1]
+        if rnd["winners"] is not None:
+            return
+        lineage = runtime["lineage"]
+        rnd["winners"] = [group_winner(group, rnd["ballots"]) for group in rnd["groups"]]
+        for winner, group in zip(rnd["winners"], rnd["groups"]):
+            lineage[winner] = [judge for llm in group for judge in lineage[llm]]
+        await emit({
+            "slot": "system",
+            "event": "tournament.round",
+            "text": f"Round {round_no}: {', '.join(rnd['winners'])} advance",
+            "session_id": session_id,
+            "round": round_no,
+            "winners": rnd["winners"],
+        })
+
+    async def _detect_consensus(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session's consensus once proposals are in (checked once, shared by its workers)"""
+        runtime = self._runtime.get(session_id)
+        if runtime is None:
+            return None
+        if "consensus" not in runtime:
+            runtime["consensus"] = asyncio.ensure_future(self._check_consensus(session_id))
+        return await asyncio.shield(runtime["consensus"])
+
+    async def _check_consensus(self, session_id: str) -> Optional[Dict[str, Any]]:
+        settings = {**DEFAULT_CONSENSUS_SETTINGS, **self.config.collaboration.get('consensus', {})}
+        session = self.active_sessions.get(session_id)
+        proposals = dict(session.get("proposals", {})) if session is not None else {}
+        if not settings['enabled'] or len(proposals) < 2:
+            return None
+        start = time.monotonic()
+        clusters = await asyncio.to_thread(find_clusters, proposals, settings)
+        check_sec = time.monotonic() - start
+        self.consensus_stats["checked"] += 1
+        largest = clusters[0]
+        share = len(largest["members"]) / len(proposals)
+        session = self.active_sessions.get(session_id)
+        if session is None or session.get("status") != "active" or share < float(settings['min_share']):
+            return None
+        action = settings["action"] if settings["action"] in ACTIONS else "vote"
+        # Refinement takes about as long as the proposal round did; finishing saves the vote too
+        proposal_sec = (session["phase_timings"].get("proposal", {}).get("phase_sec")
+                        or time.time() - session["started_ts"])
+        saved = proposal_sec * (2 if action == "finish" else 1) - check_sec
+        consensus = {
+            **largest,
+            "share": round(share, 3),
+            "action": action,
+            "check_sec": round(check_sec, 4),
+            "est_sec_saved": round(max(0.0, saved), 3),
+        }
+        session["consensus"] = consensus
+        stats = self.consensus_stats
+        stats["skipped_refinement"] += 1
+        stats["est_sec_saved"] = round(stats["est_sec_saved"] + consensus["est_sec_saved"], 3)
+        if action == "finish":
+            stats["finished"] += 1
+            self._check_complete(session_id)
+        await emit({
+            "slot": "system",
+            "event": "collaboration.consensus",
+            "text": f"{len(largest['members'])}/{len(proposals)} proposals agree "
+                    f"(similarity {largest['similarity']}); "
+                    + (f"taking {largest['representative']}'s" if action == "finish" else "skipping refinement"),
+            "session_id": session_id,
+            "representative": largest["representative"],
+        })
+        return consensus
+
+    def consensus_report(self) -> Dict[str, Any]:
+        """Early-consensus counters with the share of checked sessions that skipped refinement"""
+        stats = self.consensus_stats
+        return {**stats, "skip_rate": round(stats["skipped_refinement"] / stats["checked"], 3) if stats["checked"] else 0.0}
+
+    def _worker_finished(self, session_id: str, llm_name: str):
+        """Release barriers the worker will never reach and record voting time when all are done"""
+        runtime = self._runtime.get(session_id)
+        if runtime is None:
+            return
+        for barrier in runtime["barriers"].values():
+            if llm_name not in barrier.arrived:
+                barrier.drop(llm_name)
+        runtime["workers_left"] -= 1
+        runtime["tasks"].pop(llm_name, None)
+        session = self.active_sessions.get(session_id)
+        self._check_complete(session_id)
+        if runtime["workers_left"] <= 0 and self._cascade_pending(session):
+            # The tier is done: judge its result (and maybe escalate) as one more worker
+            runtime["workers_left"] += 1
+            runtime["tasks"]["_cascade"] = asyncio.get_running_loop().create_task(self._cascade_step(session_id))
+            return
+        if runtime["workers_left"] <= 0:
+            self._runtime.pop(session_id, None)
+            if runtime["deadline"] is not None:
+                runtime["deadline"].cancel()
+            runtime["ticket"].release()
+            runtime["done"].set()
+            if session is not None:
+                start = session["phase_timings"].get("refinement", {}).get("released_ts") or session["started_ts"]
+                now = time.time()
+                session["phase_timings"]["voting"] = {"released_ts": now, "phase_sec": round(now - start, 3)}
+                session["total_sec"] = round(now - session["started_ts"], 3)
+                session["digest_cache"] = {"hits": runtime["digests"].hits, "misses": runtime["digests"].misses}
+                self._finish_session(session_id)
+
+    @staticmethod
+    def _cascade_pending(session: Optional[Dict[str, Any]]) -> bool:
+        """A cascade session whose current tier's result has not been accepted yet"""
+        return (session is not None and "cascade" in session and not session["cascade"]["settled"]
+                and session.get("status") == "active")
+
+    def _count_cascade(self, request_class: str, key: str, amount: int = 1):
+        stats = self.cascade_stats.setdefault(request_class, {"sessions": 0, "escalations": 0, "settled_by_tier": {},
+                                                               "reasons": {}})
+        if key.startswith("reason:"):
+            stats["reasons"][key[7:]] = stats["reasons"].get(key[7:], 0) + amount
+        elif key.startswith("tier:"):
+            stats["settled_by_tier"][key[5:]] = stats["settled_by_tier"].get(key[5:], 0) + amount
+        else:
+            stats[key] += amount
+
+    def cascade_report(self) -> Dict[str, Any]:
+        """Cascade sessions, escalations and the tier each settled at, per request class"""
+        return {name: {**stats, "escalation_rate": round(stats["escalations"] / stats["sessions"], 3)
+                       if stats["sessions"] else 0.0}
+                for name, stats in self.cascade_stats.items()}
+
+    async def _cascade_checks(self, session_id: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Agreement, confidence and sandbox result of the current tier's winner"""
+        session = self.active_sessions.get(session_id, {})
+        winner = self.get_winning_solution(session_id)
+        if not winner or not winner.get("solution"):
+            return {"winner": None, "failed": ["no_result"]}
+        checks: Dict[str, Any] = {"winner": winner["winner"], "failed": []}
+        consensus = session.get("consensus")
+        if winner.get("consensus"):
+            checks["agreement"] = consensus["share"]
+        elif winner["total_votes"] >= 2:
+            checks["agreement"] = round(winner["vote_count"] / winner["total_votes"], 3)
+        if checks.get("agreement") is not None and checks["agreement"] < float(settings['min_agreement']):
+            checks["failed"].append("agreement")
+        checks["confidence"] = parse_confidence(winner["solution"])
+        if checks["confidence"] is not None and checks["confidence"] < float(settings['min_confidence']):
+            checks["failed"].append("confidence")
+        code = extract_code(winner["solution"]) if settings.get('sandbox') else None
+        if code is not None:
+            if self.sandbox_check is not None:
+                try:
+                    passed = bool(await self.sandbox_check(code, session.get("user_input", "")))
+                except Exception as e:
+                    # A broken hook counts against this tier once instead of failing the step
+                    checks["check_error"] = str(e)
+                    checks["failed"].append("check_error")
+                    return checks
+            else:
+                try:  # no sandbox wired up: at least make sure the code compiles
+                    compile(code, "<cascade>", "exec")
+                    passed = True
+                except Exception:
+                    passed = False
+            checks["sandbox"] = passed
+            if not passed:
+                checks["failed"].append("sandbox")
+        return checks
+
+    async def _cascade_step(self, session_id: str):
+        """Accept the finished tier's result, or start the next tier on the same session"""
+        try:
+            session = self.active_sessions.get(session_id)
+            if not self._cascade_pending(session):
+                return
+            cascade = session["cascade"]
+            settings = settings_for(self.config.collaboration.get('cascade'), session["priority"])
+            checks = await self._cascade_checks(session_id, settings)
+            if not self._cascade_pending(session):
+                return  # cancelled while checking
+            escalate = bool(checks["failed"]) and cascade["tier"] < len(cascade["tiers"])
+            cascade["history"].append({"tier": cascade["tier"], "llms": list(session["llms"]),
+                                       **checks, "escalated": escalate})
+            if not escalate:
+                cascade["settled"] = True
+                self._count_cascade(session["priority"], f"tier:{cascade['tier']}")
+                self._check_complete(session_id)
+                return
+            # Keep the weaker tier's work in the history and start over with the next tier
+            history = cascade["history"][-1]
+            for key in ("proposals", "refinements", "votes", "errors", "phase_timings"):
+                history[key] = session.pop(key, {})
+            session.update({"proposals": {}, "votes": {}, "vote_tally": {}, "ballots": {}, "consensus": None,
+                            "phase_timings": {}})
+            session.pop("voters", None)
+            cascade["tier"] += 1
+            next_tier = cascade["tiers"][cascade["tier"] - 1]
+            self._count_cascade(session["priority"], "escalations")
+            for reason in checks["failed"]:
+                self._count_cascade(session["priority"], f"reason:{reason}")
+            await emit({
+                "slot": "system",
+                "event": "collaboration.escalated",
+                "text": f"Tier {cascade['tier'] - 1} result was weak ({', '.join(checks['failed'])}); "
+                        f"escalating to {', '.join(next_tier)}",
+                "session_id": session_id,
+                "tier": cascade["tier"],
+            })
+            await self._start_workers(session_id, next_tier)
+        except Exception as e:
+            # Settle rather than leave the cascade pending: _worker_finished would start this step again
+            session = self.active_sessions.get(session_id)
+            if self._cascade_pending(session):
+                session["cascade"]["settled"] = True
+                session["cascade"]["error"] = str(e)
+                self._count_cascade(session["priority"], "reason:step_error")
+        finally:
+            self._worker_finished(session_id, "_cascade")
+
+    def _finish_session(self, session_id: str):
+        """No worker will touch the session again: hand it to the store for spilling"""
+        session = self.active_sessions.get(session_id)
+        if session is None:
+            return
+        if session.get("status") == "active":
+            session["status"] = "incomplete"
+            session["completed_ts"] = time.time()
+        winner = self.get_winning_solution(session_id) or {}
+        self.active_sessions.mark_done(
+            session_id,
+            winning_solution={k: v for k, v in winner.items() if k != "solution"},
+            vote_results=self.count_votes(session_id),
+        )
 
     async def _get_llm_proposal(self, llm_name: str, user_input: str, session_id: str) -> str:
         """Get initial proposal from LLM"""
@@ -153,14 +753,178 @@ You are working with a team of LLMs to solve this request. Create your initial p
 4. Be concise but thorough
 
 Format your response clearly with sections for Analysis, Approach, and Implementation."""
+        if "cascade" in self.active_sessions.get(session_id, {}):
+            # Weak answers are escalated to a stronger tier
+            prompt += "\nEnd with a line 'Confidence: <0.0-1.0>' saying how sure you are of this solution."
         
-        return await call_slot(self.config, llm_name, prompt)
+        if self.config.collaboration.get('stream_partials', False):
+            return await self._call(session_id, llm_name, prompt, "proposal", stream=True)
+        return await self._call(session_id, llm_name, prompt, "proposal")
+
+    def _fit_peers(self, session_id: Optional[str], reader: str, texts: Dict[str, str],
+                   fixed_prompt: str, phase: str) -> Dict[str, str]:
+        """Peer outputs condensed to fit ``reader``'s context window next to ``fixed_prompt``"""
+        settings = self.config.collaboration.get('prompt_budget', {})
+        if not texts or not settings.get('enabled', True):
+            return texts
+        runtime = self._runtime.get(session_id) if session_id else None
+        conversation = runtime["conversations"].get(reader) if runtime is not None else None
+        available = (prompt_tokens_for(self.config.models.get(reader, {}), settings)
+                     - estimate_tokens(fixed_prompt) - 8 * len(texts)  # "=== name ===" headers
+                     - (conversation.tokens() if conversation is not None else 0))
+        cache = runtime["digests"] if runtime is not None else DigestCache(settings)
+        fitted, truncated = cache.fit(texts, available)
+        session = self.active_sessions.get(session_id) if session_id else None
+        if truncated and session is not None and "prompt_tokens" in session:
+            stats = session["prompt_tokens"].setdefault(phase, {"calls": 0, "total": 0, "max": 0, "truncated_peers": 0})
+            stats["truncated_peers"] += truncated
+        return fitted
+
+    def _record_prompt(self, session_id: str, phase: str, prompt: str, history: int = 0):
+        session = self.active_sessions.get(session_id)
+        if session is None or "prompt_tokens" not in session:
+            return
+        tokens = estimate_tokens(prompt) + history
+        stats = session["prompt_tokens"].setdefault(phase, {"calls": 0, "total": 0, "max": 0, "truncated_peers": 0})
+        stats["calls"] += 1
+        stats["total"] += tokens
+        stats["max"] = max(stats["max"], tokens)
 
-    async def _get_llm_refinement(self, llm_name: str, user_input: str, original_proposal: str, peer_proposals: List[Dict]) -> str:
+    def _record_prompt_eval(self, session_id: str, phase: str, conversation: Optional[Conversation], call_sec: float):
+        """Prompt processing per phase, as far as the provider reports it (prompt_eval_sec is Ollama/mock only)"""
+        session = self.active_sessions.get(session_id)
+        if session is None or "prompt_eval" not in session:
+            return
+        usage = conversation.last_usage if conversation is not None else {}
+        stats = session["prompt_eval"].setdefault(
+            phase, {"calls": 0, "sec": 0.0, "prompt_tokens": 0, "cached_tokens": 0, "call_sec": 0.0})
+        stats["calls"] += 1
+        stats["sec"] = round(stats["sec"] + (usage.get("prompt_eval_sec") or 0), 4)
+        stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        stats["cached_tokens"] += usage.get("cached_tokens") or 0
+        stats["call_sec"] = round(stats["call_sec"] + call_sec, 4)
+
+    def _conversation(self, session_id: Optional[str], llm_name: str) -> Optional[Conversation]:
+        """``llm_name``'s conversation in the session (None when conversations are disabled)"""
+        settings = self.config.collaboration.get('conversation', {})
+        runtime = self._runtime.get(session_id) if session_id else None
+        if runtime is None or not settings.get('enabled', True):
+            return None
+        conversation = runtime["conversations"].get(llm_name)
+        if conversation is None:
+            conversation = runtime["conversations"][llm_name] = Conversation(
+                system_prompt(self.config.models.get(llm_name, {}), self.config.collaboration_contract),
+                f"{session_id}:{llm_name}", settings.get('keep_alive'))
+        return conversation
+
+    async def _call(self, session_id: Optional[str], llm_name: str, prompt: str, phase: str,
+                    stream: bool = False) -> str:
+        """One LLM call on behalf of a session, charged against the session's budget"""
+        conversation = self._conversation(session_id, llm_name)
+        history = conversation.tokens() if conversation is not None else 0
+        if session_id is not None:
+            self._record_prompt(session_id, phase, prompt, history)
+        start = time.perf_counter()
+        if stream:
+            output = await self._stream_with_partials(llm_name, prompt, session_id, phase, conversation)
+        else:
+            output = await call_slot(self.config, llm_name, prompt, conversation=conversation)
+        if session_id is not None:
+            self._record_prompt_eval(session_id, phase, conversation, time.perf_counter() - start)
+            self._charge(session_id, llm_name, prompt, output, history)
+        return output
+
+    def _charge(self, session_id: str, llm_name: str, prompt: str, output: str, history: int = 0):
+        """Add a call's estimated tokens and cost to the session; cancel it once over budget"""
+        session = self.active_sessions.get(session_id)
+        if session is None or "usage" not in session:
+            return
+        tokens = estimate_tokens(prompt) + history + estimate_tokens(output or "")
+        rate = float(self.config.models.get(llm_name, {}).get('cost_per_1k_tokens', 0) or 0)
+        usage = session["usage"]
+        usage["calls"] += 1
+        usage["tokens"] += tokens
+        usage["cost_usd"] = round(usage["cost_usd"] + tokens / 1000 * rate, 6)
+        per_llm = usage["by_llm"].setdefault(llm_name, {"calls": 0, "tokens": 0})
+        per_llm["calls"] += 1
+        per_llm["tokens"] += tokens
+        budget = session.get("budget", {})
+        over = ((budget.get("max_tokens") and usage["tokens"] > budget["max_tokens"])
+                or (budget.get("max_cost_usd") and usage["cost_usd"] > budget["max_cost_usd"]))
+        if over and session.get("status") == "active":
+            # The calling worker is cancelled too, at its next await
+            cancelled = self._cancel_workers(session_id, "budget_exceeded")
+            self._emit_soon({
+                "slot": "system",
+                "event": "collaboration.budget_exceeded",
+                "text": f"Budget exceeded ({usage['tokens']} tokens, ${usage['cost_usd']:.4f}); "
+                        f"cancelled {cancelled} workers",
+                "session_id": session_id
+            })
+
+    def _deadline_expired(self, session_id: str):
+        session = self.active_sessions.get(session_id)
+        if session is None or session.get("status") != "active":
+            return
+        cancelled = self._cancel_workers(session_id, "deadline_exceeded")
+        self._emit_soon({
+            "slot": "system",
+            "event": "collaboration.deadline_exceeded",
+            "text": f"Session deadline of {session['budget']['deadline_sec']}s passed; cancelled {cancelled} workers",
+            "session_id": session_id
+        })
+
+    @staticmethod
+    def _emit_soon(event: Dict[str, Any]):
+        """Publish from synchronous code running on the event loop"""
+        emit_soon(event)
+
+    async def cancel(self, session_id: str, reason: str = "cancelled") -> Optional[int]:
+        """Cancel a running session's workers; returns how many were cancelled (None if unknown)"""
+        session = self.active_sessions.get(session_id)
+        if session is None:
+            return None
+        if session.get("status") != "active":
+            return 0
+        cancelled = self._cancel_workers(session_id, reason)
+        await emit({
+            "slot": "system",
+            "event": "collaboration.cancelled",
+            "text": f"Collaboration {reason}; cancelled {cancelled} workers",
+            "session_id": session_id
+        })
+        return cancelled
+
+    async def _stream_with_partials(self, llm_name: str, prompt: str, session_id: str, phase: str,
+                                    conversation: Optional[Conversation] = None) -> str:
+        """Stream a slot's answer, publishing partial text to the event bus as it arrives"""
+        interval = float(self.config.collaboration.get('partial_interval_sec', 0.5))
+        parts: List[str] = []
+        pending: List[str] = []
+        last_emit = time.monotonic()
+        async for chunk in stream_slot(self.config, llm_name, prompt, conversation=conversation):
+            parts.append(chunk)
+            pending.append(chunk)
+            if time.monotonic() - last_emit >= interval:
+                await emit({
+                    "slot": llm_name,
+                    "event": f"{phase}.partial",
+                    "text": "".join(pending),
+                    "chars": sum(len(p) for p in parts),
+                    "session_id": session_id
+                })
+                pending = []
+                last_emit = time.monotonic()
+        return "".join(parts)
+
+    def _continues_conversation(self, session_id: Optional[str], llm_name: str) -> bool:
+        conversation = self._conversation(session_id, llm_name)
+        return conversation is not None and conversation.turns > 0
+
+    async def _get_llm_refinement(self, llm_name: str, user_input: str, original_proposal: str, peer_proposals: List[Dict],
+                                  session_id: Optional[str] = None) -> str:
         """Get refined proposal after reading peers"""
-        peer_text = "\n\n".join([f"=== {p['llm']} ===\n{p['content']}" for p in peer_proposals])
-        
-        prompt = f"""User request: {user_input}
+        template = """User request: {user_input}
 
 Your original proposal:
 {original_proposal}
@@ -174,16 +938,29 @@ After reviewing your peers' proposals, refine your solution. Consider:
 3. How can you improve your original proposal?
 
 Provide your refined solution:"""
+        if self._continues_conversation(session_id, llm_name):
+            # The request and this slot's proposal are already in its conversation
+            template = """Peer proposals:
+{peer_text}
+
+After reviewing your peers' proposals, refine your solution above. Consider:
+1. What good ideas can you incorporate from peers?
+2. What weaknesses do you see in other approaches?
+3. How can you improve your original proposal?
+
+Provide your refined solution:"""
+        fixed = template.format(user_input=user_input, original_proposal=original_proposal, peer_text="")
+        peers = self._fit_peers(session_id, llm_name, {p['llm']: p['content'] for p in peer_proposals},
+                                fixed, "refinement")
+        peer_text = "\n\n".join([f"=== {name} ===\n{content}" for name, content in peers.items()])
+        prompt = template.format(user_input=user_input, original_proposal=original_proposal, peer_text=peer_text)
         
-        return await call_slot(self.config, llm_name, prompt)
+        return await self._call(session_id, llm_name, prompt, "refinement")
 
-    async def _get_llm_vote(self, llm_name: str, user_input: str, all_solutions: Dict[str, str]) -> str:
+    async def _get_llm_vote(self, llm_name: str, user_input: str, all_solutions: Dict[str, str],
+                            session_id: Optional[str] = None) -> str:
         """Get LLM's vote on best solution"""
-        solutions_text = "\n\n".join([f"=== {llm} ===\n{content}" 
-                                     for llm, content in all_solutions.items() 
-                                     if llm != llm_name])
-        
-        prompt = f"""User request: {user_input}
+        template = """User request: {user_input}
 
 All team solutions (including refinements):
 {solutions_text}
@@ -195,20 +972,32 @@ Vote for the BEST solution (including your own if appropriate). Consider:
 4. Likelihood of success
 
 Respond with just: VOTE: <llm_name>"""
+        if self._continues_conversation(session_id, llm_name):
+            template = """All team solutions (including refinements):
+{solutions_text}
+
+Vote for the BEST solution for the request above (including your own if appropriate). Consider:
+1. Correctness and safety
+2. Completeness 
+3. Code quality (if applicable)
+4. Likelihood of success
+
+Respond with just: VOTE: <llm_name>"""
+        fixed = template.format(user_input=user_input, solutions_text="")
+        others = {llm: content for llm, content in all_solutions.items() if llm != llm_name}
+        others = self._fit_peers(session_id, llm_name, others, fixed, "vote")
+        solutions_text = "\n\n".join([f"=== {llm} ===\n{content}" for llm, content in others.items()])
+        prompt = template.format(user_input=user_input, solutions_text=solutions_text)
         
-        return await call_slot(self.config, llm_name, prompt)
+        return await self._call(session_id, llm_name, prompt, "vote")
 
-    async def _write_collaboration_file(self, session_id: str, llm_name: str, phase: str, content: str):
-        """Write LLM output to collaboration file as JSON in per-model directory"""
-        # Resolve per-model directory from config
+    def _model_dir(self, llm_name: str) -> str:
         base_dir = getattr(self.config, 'collaboration', {}).get('base_directory', './collaboration')
         model_cfg = self.config.models.get(llm_name, {})
-        model_dir = model_cfg.get('collaboration_directory', f"{base_dir}/{llm_name}")
-        os.makedirs(model_dir, exist_ok=True)
-        
-        # Build filename and JSON payload
-        filename = f"{session_id}_{llm_name}_{phase}.json"
-        file_path = os.path.join(model_dir, filename)
+        return model_cfg.get('collaboration_directory', f"{base_dir}/{llm_name}")
+
+    async def _write_collaboration_file(self, session_id: str, llm_name: str, phase: str, content: str):
+        """Record LLM output in the slot's collaboration log (or a per-phase JSON file)"""
         payload = {
             "timestamp": time.time(),
             "llm": llm_name,
@@ -216,23 +1005,44 @@ Respond with just: VOTE: <llm_name>"""
             "session": session_id,
             "content": content,
         }
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        self.heads.push(llm_name, payload)
+        if self.log is not None:
+            # Queued; the log writes batches from a worker thread
+            self.log.append(llm_name, payload)
+            self.files_index.record(llm_name, f"{session_id}_{llm_name}_{phase}.json",
+                                    len(content.encode('utf-8')), payload['timestamp'], logged=True)
+        else:
+            model_dir = self._model_dir(llm_name)
+            filename = f"{session_id}_{llm_name}_{phase}.json"
+            size = await asyncio.to_thread(self._write_json_file, model_dir, os.path.join(model_dir, filename), payload)
+            self.files_index.record(llm_name, filename, size, payload['timestamp'])
         
-        # Update session
-        if session_id in self.active_sessions:
+        # Update session (tournament rounds keep their ballots in the session's bracket)
+        if session_id in self.active_sessions and phase in PHASE_KEYS:
             session = self.active_sessions[session_id]
-            if phase not in session:
-                session[phase] = {}
-            session[phase][llm_name] = content
+            key = PHASE_KEYS[phase]
+            if key not in session:
+                session[key] = {}
+            session[key][llm_name] = content
+            if phase == "vote":
+                self._tally_vote(session, llm_name, content)
+
+    @staticmethod
+    def _write_json_file(model_dir: str, file_path: str, payload: Dict[str, Any]) -> int:
+        os.makedirs(model_dir, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+            return f.tell()
 
     async def _read_peer_proposals(self, session_id: str, exclude_llm: str) -> List[Dict]:
         """Read proposals from peer LLMs"""
         proposals = []
         session = self.active_sessions.get(session_id, {})
+        # In a tournament slots only read their own panel
+        panel = next((p for p in session.get("tournament", {}).get("panels", []) if exclude_llm in p), None)
         
         for llm_name, content in session.get("proposals", {}).items():
-            if llm_name != exclude_llm:
+            if llm_name != exclude_llm and (panel is None or llm_name in panel):
                 proposals.append({"llm": llm_name, "content": content})
         
         return proposals
@@ -256,18 +1066,32 @@ Respond with just: VOTE: <llm_name>"""
         """Get final collaboration results"""
         return self.active_sessions.get(session_id, {})
 
+    @staticmethod
+    def _tally_vote(session: Dict[str, Any], voter: str, content: str):
+        """Update the session's running tally with ``voter``'s ballot"""
+        tally = session.setdefault("vote_tally", {})
+        ballots = session.setdefault("ballots", {})
+        previous = ballots.get(voter)
+        if previous is not None:
+            tally[previous] -= 1
+            if not tally[previous]:
+                del tally[previous]
+        choice = parse_vote(content)
+        ballots[voter] = choice
+        if choice is not None:
+            tally[choice] = tally.get(choice, 0) + 1
+
     def count_votes(self, session_id: str) -> Dict[str, int]:
         """Count votes and determine winner"""
         session = self.active_sessions.get(session_id, {})
-        votes = session.get("votes", {})
+        if "vote_tally" in session:
+            return dict(session["vote_tally"])
         
+        # Sessions recorded before running tallies were kept
         vote_counts = {}
-        for voter, vote_content in votes.items():
-            # Extract vote from content (looking for "VOTE: <name>")
-            import re
-            match = re.search(r"VOTE:\s*(\w+)", vote_content, re.IGNORECASE)
-            if match:
-                voted_for = match.group(1).lower()
+        for vote_content in session.get("votes", {}).values():
+            voted_for = parse_vote(vote_content)
+            if voted_for:
                 vote_counts[voted_for] = vote_counts.get(voted_for, 0) + 1
         
         return vote_counts
@@ -276,6 +1100,18 @@ Respond with just: VOTE: <llm_name>"""
         """Get the winning solution based on votes"""
         vote_counts = self.count_votes(session_id)
         if not vote_counts:
+            consensus = self.active_sessions.get(session_id, {}).get("consensus")
+            if consensus and consensus.get("action") == "finish":
+                # Settled without a vote: the proposals agreed
+                winner_name = consensus["representative"]
+                return {
+                    "winner": winner_name,
+                    "vote_count": 0,
+                    "total_votes": 0,
+                    "solution": self.active_sessions[session_id].get("proposals", {}).get(winner_name),
+                    "all_vote_counts": {},
+                    "consensus": True
+                }
             return None
         
         winner = max(vote_counts.items(), key=lambda x: x[1])
@@ -300,21 +1136,113 @@ Respond with just: VOTE: <llm_name>"""
             "all_vote_counts": vote_counts
         }
 
+    def _check_complete(self, session_id: str) -> bool:
+        """Signal the session's completion event once every expected vote is in"""
+        session = self.active_sessions.get(session_id)
+        if session is None or self._cascade_pending(session):
+            return False
+        # Settled once every expected vote is in, or without a vote when the proposals agreed
+        settled = (session.get("status") == "completed"
+                   or (session.get("consensus") or {}).get("action") == "finish")
+        if not settled and not self.expected_voters(session_id) <= set(session.get("votes", {})):
+            return False
+        if session.get("status") == "active":
+            session["status"] = "completed"
+            session["completed_ts"] = time.time()
+        runtime = self._runtime.get(session_id)
+        if runtime is not None:
+            runtime["done"].set()
+        return True
+
+    async def _decide_early(self, session_id: str) -> bool:
+        """Complete the session once the outstanding votes can no longer change the winner.
+
+        ``collaboration.early_decision`` is "majority" (the leader holds an
+        absolute majority of the expected voters), "unreachable" (the leader
+        is ahead by more than the votes still outstanding) or "off".
+        """
+        policy = self.config.collaboration.get('early_decision', 'majority')
+        session = self.active_sessions.get(session_id)
+        if policy not in ("majority", "unreachable") or session is None or session.get("status") != "active":
+            return False
+        if self._cascade_pending(session):
+            return False  # the tier's full vote feeds the escalation check
+        tally = session.get("vote_tally", {})
+        if not tally:
+            return False
+        voted = set(session.get("votes", {}))
+        outstanding = sorted(self.expected_voters(session_id) - voted)
+        ranked = sorted(tally.values(), reverse=True)
+        leader_votes, runner_up = ranked[0], (ranked[1] if len(ranked) > 1 else 0)
+        if policy == "unreachable":
+            decided = leader_votes > runner_up + len(outstanding)
+        else:
+            decided = leader_votes * 2 > len(voted) + len(outstanding)
+        if not decided:
+            return False
+        leader = max(tally, key=tally.get)
+        session["early_decision"] = {
+            "policy": policy,
+            "leader": leader,
+            "votes_counted": len(voted),
+            "votes_skipped": outstanding,
+        }
+        cancelled = self._cancel_workers(session_id, "completed", exclude=asyncio.current_task())
+        await emit({
+            "slot": "system",
+            "event": "collaboration.decided",
+            "text": f"{leader} wins with {leader_votes}/{len(voted) + len(outstanding)} votes; "
+                    f"skipped {len(outstanding)} outstanding votes, cancelled {cancelled} workers",
+            "session_id": session_id,
+            "winner": leader,
+        })
+        return True
+
+    def _cancel_workers(self, session_id: str, status: str, exclude: Optional[asyncio.Task] = None) -> int:
+        """Cancel a session's outstanding workers (but ``exclude``) and wake anyone waiting on it"""
+        session = self.active_sessions.get(session_id)
+        if session is not None and session.get("status") == "active":
+            session["status"] = status
+            session["completed_ts"] = time.time()
+        runtime = self._runtime.get(session_id)
+        if runtime is None:
+            return 0
+        pending = [task for task in runtime["tasks"].values() if not task.done() and task is not exclude]
+        for task in pending:
+            task.cancel()
+        runtime["done"].set()
+        return len(pending)
+
+    def expected_voters(self, session_id: str) -> set:
+        """LLMs still expected to vote: failed workers and open circuits are dropped"""
+        session = self.active_sessions.get(session_id, {})
+        # A tournament's final round names its own voters
+        expected = set(session.get("voters", session.get("llms", []))) - set(session.get("errors", {}))
+        for name in list(expected):
+            breaker = get_breaker(self.config, name)
+            if breaker is not None and breaker.is_open() and name not in session.get("votes", {}):
+                expected.discard(name)
+        return expected
+
     async def wait_for_collaboration_complete(self, session_id: str, timeout: float = 30.0) -> bool:
         """Wait for collaboration to complete with timeout"""
-        start_time = time.time()
-        session = self.active_sessions.get(session_id, {})
-        expected_llms = set(session.get("llms", []))
-        
-        while time.time() - start_time < timeout:
-            # Check if all LLMs have voted
-            votes = session.get("votes", {})
-            if set(votes.keys()) >= expected_llms:
-                return True
-            
-            await asyncio.sleep(0.5)
-        
-        return False  # Timeout
+        if session_id not in self.active_sessions or self._check_complete(session_id):
+            return True
+        runtime = self._runtime.get(session_id)
+        if runtime is None:
+            return False  # all workers finished without completing
+        try:
+            await asyncio.wait_for(runtime["done"].wait(), timeout)
+        except asyncio.TimeoutError:
+            cancelled = self._cancel_workers(session_id, "timed_out")
+            await emit({
+                "slot": "system",
+                "event": "collaboration.timeout",
+                "text": f"Collaboration timed out after {timeout}s; cancelled {cancelled} workers",
+                "session_id": session_id
+            })
+            return False
+        return self._check_complete(session_id)
 
     def get_active_sessions(self) -> List[Dict]:
         """Get list of currently active collaboration sessions"""
@@ -366,30 +1294,33 @@ Respond with just: VOTE: <llm_name>"""
         
         return active
 
-    def get_model_collaboration_files(self, model_name: str) -> List[Dict[str, Any]]:
-        """Get all collaboration files for a specific model"""
-        files = []
+    def get_model_collaboration_files(self, model_name: str, *, types: Optional[List[str]] = None,
+                                      offset: int = 0, limit: Optional[int] = None,
+                                      order: str = 'recent') -> List[Dict[str, Any]]:
+        """Get collaboration files for a specific model (from the cached index)"""
+        return self.list_collaboration_files(model_name, types=types, offset=offset, limit=limit, order=order)[1]
+
+    def list_collaboration_files(self, model_name: str, *, types: Optional[List[str]] = None,
+                                 offset: int = 0, limit: Optional[int] = None,
+                                 order: str = 'recent') -> Tuple[int, List[Dict[str, Any]]]:
+        """``(total, page)`` of a model's collaboration files, log records included"""
         model_config = self.config.models.get(model_name, {})
-        
         if not model_config.get('collaboration_enabled', True):
-            return files
-        
-        base_dir = self.config.collaboration.get('base_directory', './collaboration')
-        model_dir = model_config.get('collaboration_directory', f'{base_dir}/{model_name}')
-        
-        if os.path.exists(model_dir):
-            for filename in os.listdir(model_dir):
-                filepath = os.path.join(model_dir, filename)
-                if os.path.isfile(filepath):
-                    stat = os.stat(filepath)
-                    files.append({
-                        'name': filename,
-                        'size': stat.st_size,
-                        'modified': stat.st_mtime,
-                        'path': filepath
-                    })
-        
-        return sorted(files, key=lambda x: x['modified'], reverse=True)
+            return 0, []
+        return self.files_index.files(model_name, types=types, offset=offset, limit=limit, order=order)
+
+    def warm_heads(self):
+        """Fill the head buffers from the log and legacy JSON files (blocking; run at startup)."""
+        for name in list(self.config.models):
+            records = []
+            for entry in self.get_model_collaboration_files(name)[:self.heads.size]:
+                try:
+                    record = json.loads(self.read_collaboration_file(name, entry['name']))
+                except (OSError, ValueError):
+                    continue  # legacy .txt files have no structured content
+                if isinstance(record, dict):
+                    records.append(record)
+            self.heads.warm(name, records)
 
     def read_collaboration_file(self, model_name: str, filename: str) -> str:
         """Read content of a specific collaboration file"""
@@ -399,6 +1330,9 @@ Respond with just: VOTE: <llm_name>"""
         filepath = os.path.join(model_dir, filename)
         
         if not os.path.exists(filepath):
+            record = self.log.read_entry(model_name, filename) if self.log is not None else None
+            if record is not None:
+                return json.dumps(record, ensure_ascii=False, indent=2)
             raise FileNotFoundError(f"File {filename} not found for model {model_name}")
         
         try:
@@ -421,8 +1355,10 @@ Respond with just: VOTE: <llm_name>"""
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(content)
+                size = f.tell()
         except Exception as e:
             raise IOError(f"Error writing file {filename}: {str(e)}")
+        self.files_index.record(model_name, filename, size, time.time())
 
     def get_all_collaboration_files(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get collaboration files for all models"""
@@ -1,12 +1,13 @@
 from __future__ import annotations
-import os, json
+import os
 from pathlib import Path
-from collections import deque
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
+from .io import JsonlTail
 
 COLLAB_DIR = Path(os.environ.get('DEXTER_COLLAB','backend/collaboration'))
 router = APIRouter(prefix='/collaboration', tags=['collaboration'])
+_tails = JsonlTail()
 
 @router.get('/head')
 def head(slot: str = Query(...), n: int = Query(1, ge=1, le=500)):
@@ -17,18 +18,7 @@ def head(slot: str = Query(...), n: int = Query(1, ge=1, le=500)):
     if not files:
         return {"source":"real","items":[]}
     path = files[0]
-    dq = deque(maxlen=n)
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            s = line.strip()
-            if s:
-                dq.append(s)
-    items = []
-    for s in dq:
-        try:
-            items.append(json.loads(s))
-        except Exception:
-            pass
+    items = _tails.tail(str(path), n)
     return {"source":"real","file": str(path), "items": items}
 
 @router.get('/file')
@@ -20,6 +20,7 @@ class Config:
             m.setdefault('local_endpoint', 'http://localhost:11434')
             m.setdefault('collaboration_enabled', True)
             m.setdefault('collaboration_directory', f'./collaboration/{name}')
+            m.setdefault('cost_per_1k_tokens', 0.0)
         # runtime
         rt = data.setdefault('runtime', {})
         rt.setdefault('db_path', './dexter.db')
@@ -27,6 +28,44 @@ class Config:
         rt.setdefault('stm_ratio', 0.5)
         rt.setdefault('stm_max_bytes', 0)
         rt.setdefault('stm_min_free_bytes', 268_435_456)  # 256MB
+        # shared read-only memory lookups used by call_slot
+        mc = rt.setdefault('memory_context', {})
+        mc.setdefault('enabled', True)
+        mc.setdefault('limit', 5)
+        mc.setdefault('pool_size', 2)
+        # optional LLM response cache (slots opt in with models.<name>.cache)
+        lc = rt.setdefault('llm_cache', {})
+        lc.setdefault('enabled', True)
+        lc.setdefault('ttl_sec', 3600)
+        lc.setdefault('memory_max_entries', 256)
+        lc.setdefault('memory_max_bytes', 16 * 1024 * 1024)
+        lc.setdefault('disk_max_entries', 5000)
+        # share one upstream call between identical concurrent requests
+        rt.setdefault('llm_singleflight', {}).setdefault('enabled', True)
+        # per provider endpoint rate limits (slots may override with models.<name>.rate_limit)
+        rl = rt.setdefault('rate_limit', {})
+        rl.setdefault('enabled', True)
+        rl.setdefault('requests_per_min', 0)  # 0 = unlimited
+        rl.setdefault('tokens_per_min', 0)
+        rl.setdefault('max_concurrency', 8)
+        rl.setdefault('min_concurrency', 1)
+        rl.setdefault('max_retries', 3)
+        rl.setdefault('backoff_base_sec', 1.0)
+        rl.setdefault('backoff_max_sec', 30.0)
+        # per-slot circuit breakers (slots may override with models.<name>.circuit_breaker)
+        cb = rt.setdefault('circuit_breaker', {})
+        cb.setdefault('enabled', True)
+        cb.setdefault('failure_threshold', 3)
+        cb.setdefault('open_sec', 60.0)
+        cb.setdefault('slow_call_sec', 90.0)
+        cb.setdefault('half_open_max_calls', 1)
+        # pooled provider HTTP clients (see http_clients.py)
+        http = rt.setdefault('http', {})
+        http.setdefault('max_connections', 20)
+        http.setdefault('max_keepalive_connections', 10)
+        http.setdefault('keepalive_expiry', 60.0)
+        http.setdefault('http2', True)
+        http.setdefault('connect_timeout', 10.0)
         sb = rt.setdefault('sandbox', {})
         sb.setdefault('provider', 'docker')  # Default to Docker instead of Hyper-V
         sb.setdefault('host_shared_dir', './vm_shared')
@@ -65,6 +104,81 @@ class Config:
         collab.setdefault('allowed_extensions', ['.txt', '.md', '.json', '.log'])
         collab.setdefault('watch_enabled', True)
         collab.setdefault('cross_communication', True)
+        # phase barriers: move on when everyone is in, or a quorum is in and the deadline passed
+        collab.setdefault('phase_quorum', 0.5)
+        collab.setdefault('phase_deadline_sec', {'proposal': 20.0, 'refinement': 15.0})
+        collab.setdefault('phase_max_wait_sec', 120.0)
+        # bounded in-memory session tier; finished sessions spill to runtime.db_path
+        store = collab.setdefault('session_store', {})
+        store.setdefault('max_sessions', 200)
+        store.setdefault('max_bytes', 32 * 1024 * 1024)
+        store.setdefault('persist', True)
+        # append-only per-slot collaboration log (see collab_log.py)
+        clog = collab.setdefault('log', {})
+        clog.setdefault('enabled', True)
+        clog.setdefault('compression', 'gzip')  # none | gzip | zstd (needs the zstandard package)
+        clog.setdefault('segment_max_bytes', 4 * 1024 * 1024)
+        clog.setdefault('flush_interval_sec', 0.05)
+        clog.setdefault('max_batch', 256)
+        clog.setdefault('compact_interval_sec', 3600)
+        clog.setdefault('retention_days', 30)
+        # per-session limits; sessions past them are cancelled (0 = no limit)
+        collab.setdefault('session_deadline_sec', 300)
+        budget = collab.setdefault('budget', {})
+        budget.setdefault('max_tokens', 0)
+        budget.setdefault('max_cost_usd', 0.0)
+        # admission control in front of broadcast_user_input (see collab_scheduler.py)
+        sched = collab.setdefault('scheduler', {})
+        sched.setdefault('enabled', True)
+        sched.setdefault('max_concurrent_sessions', 4)
+        sched.setdefault('max_inflight_per_slot', 4)
+        sched.setdefault('max_queued', {'interactive': 50, 'campaign': 20, 'skill_generation': 10, 'healing': 5})
+        sched.setdefault('max_queued_total', 50)
+        sched.setdefault('max_wait_sec', {'interactive': 0, 'campaign': 300, 'skill_generation': 120, 'healing': 60})
+        # fit peer outputs into each slot's context window (see prompt_budget.py)
+        pbudget = collab.setdefault('prompt_budget', {})
+        pbudget.setdefault('enabled', True)
+        pbudget.setdefault('default_context_tokens', 8192)
+        pbudget.setdefault('default_output_tokens', 1024)
+        pbudget.setdefault('safety_margin', 0.1)
+        # skip refinement when proposals already agree (see consensus.py)
+        cons = collab.setdefault('consensus', {})
+        cons.setdefault('enabled', True)
+        cons.setdefault('threshold', 0.8)  # MinHash similarity at which two proposals count as the same
+        cons.setdefault('min_share', 1.0)  # share of proposals the largest cluster must hold
+        cons.setdefault('action', 'vote')  # vote: skip refinement | finish: take the representative
+        cons.setdefault('num_perm', 64)
+        cons.setdefault('shingle_words', 5)
+        # cheap-first cascade: start with the cheapest tier of slots, escalate on a weak result (see cascade.py)
+        casc = collab.setdefault('cascade', {})
+        casc.setdefault('enabled', False)
+        casc.setdefault('min_agreement', 0.6)
+        casc.setdefault('min_confidence', 0.5)
+        casc.setdefault('sandbox', False)
+        # per request class overrides (interactive, campaign, skill_generation, healing)
+        # (healing patches define no run() for the sandbox harness, so they get the agreement/confidence checks only)
+        casc.setdefault('classes', {'skill_generation': {'sandbox': True}})
+        # send each slot's phases as one conversation so providers reuse the prompt prefix (see conversation.py)
+        conv = collab.setdefault('conversation', {})
+        conv.setdefault('enabled', True)
+        conv.setdefault('keep_alive', '10m')  # how long Ollama keeps the model and its context loaded
+        # complete voting early: majority | unreachable | off
+        collab.setdefault('early_decision', 'majority')
+        # all (everyone reads everyone) | tournament (panels whose winners advance; see collab_topology.py)
+        collab.setdefault('topology', 'all')
+        collab.setdefault('panel_size', 4)
+        # latest outputs per slot served by /api/collaboration/head
+        collab.setdefault('head_buffer_size', 20)
+        collab.setdefault('stream_partials', False)
+        collab.setdefault('partial_interval_sec', 0.5)
+        # SSE event bus: a bounded queue per /events client (see events.py)
+        ev = data.setdefault('events', {})
+        ev.setdefault('keepalive_sec', 20)
+        ev.setdefault('queue_size', 1000)
+        ev.setdefault('overflow', 'drop_oldest')  # drop_oldest | drop_newest | disconnect
+        # replay ring for clients resuming with Last-Event-ID / ?since=
+        ev.setdefault('replay_max_events', 5000)
+        ev.setdefault('replay_max_bytes', 4 * 1024 * 1024)
 
     @classmethod
     def load(cls, path: str) -> 'Config':
@@ -100,3 +214,7 @@ class Config:
     @property
     def collaboration(self) -> Dict[str, Any]:
         return self._data.get('collaboration', {})
+
+    @property
+    def events(self) -> Dict[str, Any]:
+        return self._data.get('events', {})
@@ -0,0 +1,118 @@
+"""
+Early consensus between collaboration proposals.
+
+When every slot proposes essentially the same solution, refinement only
+repeats the work. ``find_clusters`` groups proposals that are the same:
+either their fenced code is identical once comments and whitespace are
+normalised, or the MinHash estimate of their word-shingle Jaccard similarity
+reaches ``threshold``. ``CollaborationManager`` runs this check when the
+proposal barrier releases. If the largest cluster holds ``min_share`` of the
+proposals, it skips refinement ("vote") or takes the cluster's
+representative as the answer ("finish").
+"""
+
+from __future__ import annotations
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CONSENSUS_SETTINGS: Dict[str, Any] = {
+    'enabled': True,
+    'threshold': 0.8,
+    'min_share': 1.0,
+    'action': 'vote',  # vote: skip refinement | finish: no refinement or voting
+    'num_perm': 64,
+    'shingle_words': 5,
+}
+ACTIONS = ('vote', 'finish')
+
+_FENCE_RE = re.compile(r"```[^\n`]*\n(.*?)```", re.DOTALL)
+_COMMENT_RE = re.compile(r"#[^\n]*")
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE = (1 << 61) - 1
+
+
+def code_hash(text: str) -> Optional[str]:
+    """Hash of ``text``'s fenced code with comments, blank lines and spacing normalised (None if no code)."""
+    blocks = _FENCE_RE.findall(text or "")
+    if not blocks:
+        return None
+    lines = []
+    for block in blocks:
+        for line in _COMMENT_RE.sub("", block).splitlines():
+            line = " ".join(line.split())
+            if line:
+                lines.append(line)
+    return hashlib.sha1("\n".join(lines).encode('utf-8')).hexdigest() if lines else None
+
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _permutations(num_perm: int) -> List[Tuple[int, int]]:
+    return [(_hash64(f"a{i}") % (_MERSENNE - 1) + 1, _hash64(f"b{i}") % _MERSENNE) for i in range(num_perm)]
+
+
+def minhash(text: str, num_perm: int = 64, shingle_words: int = 5,
+            permutations: Optional[List[Tuple[int, int]]] = None) -> Tuple[int, ...]:
+    """MinHash signature of ``text``'s lowercase word shingles."""
+    words = _WORD_RE.findall((text or "").lower())
+    k = max(1, shingle_words)
+    shingles = {_hash64(" ".join(words[i:i + k])) for i in range(max(1, len(words) - k + 1))}
+    permutations = permutations or _permutations(num_perm)
+    return tuple(min((a * h + b) % _MERSENNE for h in shingles) for a, b in permutations)
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def find_clusters(texts: Dict[str, str], settings: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+    """Clusters of equivalent ``texts`` (name -> text), largest first.
+
+    Each is ``{"members", "representative", "similarity"}``. The
+    representative is the member most similar to the rest, and similarity is
+    the mean pairwise similarity inside the cluster.
+    """
+    settings = {**DEFAULT_CONSENSUS_SETTINGS, **(settings or {})}
+    names = list(texts)
+    perms = _permutations(int(settings['num_perm']))
+    hashes = {name: code_hash(texts[name]) for name in names}
+    signatures = {name: minhash(texts[name], shingle_words=int(settings['shingle_words']), permutations=perms)
+                  for name in names}
+    parent = {name: name for name in names}
+
+    def root(name: str) -> str:
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    pair_sim: Dict[Tuple[str, str], float] = {}
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            same_code = hashes[a] is not None and hashes[a] == hashes[b]
+            sim = 1.0 if same_code else similarity(signatures[a], signatures[b])
+            pair_sim[(a, b)] = pair_sim[(b, a)] = sim
+            if sim >= float(settings['threshold']):
+                parent[root(b)] = root(a)
+
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        groups.setdefault(root(name), []).append(name)
+    clusters = []
+    for members in groups.values():
+        def closeness(name: str) -> float:
+            return sum(pair_sim[(name, other)] for other in members if other != name)
+        pairs = len(members) * (len(members) - 1)
+        clusters.append({
+            "members": members,
+            "representative": max(members, key=lambda n: (closeness(n), -members.index(n))),
+            "similarity": round(sum(closeness(n) for n in members) / pairs, 3) if pairs else 1.0,
+        })
+    clusters.sort(key=lambda c: (-len(c["members"]), names.index(c["members"][0])))
+    return clusters
@@ -0,0 +1,64 @@
+"""
+Per-slot conversations for collaboration sessions.
+
+Without them every phase sends a new single-message prompt that repeats the
+user request and the slot's own proposal, so no provider can reuse its
+prompt cache. A ``Conversation`` holds one slot's turns in a session behind a
+stable system prefix, so each phase only adds a turn:
+
+* Ollama gets back the ``context`` it returned last time (plus ``keep_alive``)
+  and evaluates only the new turn.
+* Anthropic slots with ``prompt_cache`` mark the system prompt and the
+  latest history turn with ``cache_control``.
+* OpenAI-compatible slots with ``prompt_cache`` send a ``prompt_cache_key``
+  that stays the same for the whole session.
+
+After each call, providers leave the prompt tokens, cached tokens and
+prompt-eval seconds they report in ``last_usage``.
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+try:
+    from .rate_limit import estimate_tokens
+except ImportError:  # pragma: no cover
+    from rate_limit import estimate_tokens
+
+
+def system_prompt(model_config: Dict[str, Any], preamble: str = '') -> str:
+    """A slot's system prompt: identity and role, then ``preamble``."""
+    identity = f"{model_config.get('identity', '')} {model_config.get('role', '')}".strip()
+    return "\n\n".join(part for part in (identity, (preamble or '').strip()) if part)
+
+
+class Conversation:
+    """One slot's message history within a collaboration session."""
+
+    def __init__(self, system: str, key: str, keep_alive: Optional[str] = None):
+        self.system = system
+        self.key = key
+        self.keep_alive = keep_alive
+        self.messages: List[Dict[str, str]] = []
+        self.ollama_context: Optional[List[int]] = None
+        self.last_usage: Dict[str, Any] = {}
+        self._tokens = estimate_tokens(system) if system else 0
+
+    def messages_for(self, prompt: str) -> List[Dict[str, str]]:
+        """System prefix, history, then ``prompt`` as the next user turn."""
+        head = [{"role": "system", "content": self.system}] if self.system else []
+        return head + self.messages + [{"role": "user", "content": prompt}]
+
+    def commit(self, prompt: str, reply: str):
+        """Record a completed turn."""
+        self.messages.append({"role": "user", "content": prompt})
+        self.messages.append({"role": "assistant", "content": reply})
+        self._tokens += estimate_tokens(prompt) + estimate_tokens(reply)
+
+    def tokens(self) -> int:
+        """Estimated tokens of the system prefix and history."""
+        return self._tokens
+
+    @property
+    def turns(self) -> int:
+        return len(self.messages) // 2
@@ -128,6 +128,10 @@ class BrainDB:
             vote_results TEXT  -- JSON vote results
         )
         """)
+        # Added later: compressed JSON of the full session, written when it is spilled from memory
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(collaboration_sessions)")}
+        if 'session_blob' not in columns:
+            self.conn.execute("ALTER TABLE collaboration_sessions ADD COLUMN session_blob BLOB")
         
         # Create indexes
         self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_type ON memories(type)")
@@ -390,6 +394,29 @@ class BrainDB:
         ))
         self.conn.commit()
     
+    def spill_collaboration_session(self, session_id: str, user_input: str, started_ts: float,
+                                    completed_ts: Optional[float], status: str,
+                                    winning_solution: Dict[str, Any] = None,
+                                    vote_results: Dict[str, Any] = None,
+                                    session_blob: bytes = b''):
+        """Persist a finished session; its full contents go in the compressed ``session_blob``."""
+        self.conn.execute("""
+        INSERT OR REPLACE INTO collaboration_sessions
+        (id, user_input, started_ts, completed_ts, status, winning_solution, all_solutions, vote_results, session_blob)
+        VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)
+        """, (
+            session_id, user_input, started_ts, completed_ts, status,
+            json.dumps(winning_solution or {}),
+            json.dumps(vote_results or {}),
+            sqlite3.Binary(session_blob)
+        ))
+        self.conn.commit()
+    
+    def load_collaboration_session_blob(self, session_id: str) -> Optional[bytes]:
+        """Compressed session written by :meth:`spill_collaboration_session`, if any."""
+        row = self.fetchone("SELECT session_blob FROM collaboration_sessions WHERE id = ?", (session_id,))
+        return bytes(row[0]) if row and row[0] is not None else None
+    
     def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
         """Convert SQLite row to dictionary."""
         if not row:
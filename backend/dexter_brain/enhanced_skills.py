@@ -192,7 +192,8 @@ Remember: The corrected code will be tested immediately in the sandbox environme
         # Start healing collaboration
         healing_session = await collaboration_manager.broadcast_user_input(
             healing_prompt, 
-            f"skill_healing_{error_id}_{int(time.time())}"
+            f"skill_healing_{error_id}_{int(time.time())}",
+            priority='healing'
         )
         
         # Wait for healing to complete (shorter timeout for skill healing)
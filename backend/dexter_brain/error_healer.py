@@ -6,6 +6,7 @@ import time
 from typing import Dict, List, Any, Optional
 from .error_tracker import ErrorTracker, SystemError, ErrorSeverity
 from .collaboration import CollaborationManager
+from .collab_scheduler import CollaborationOverloaded
 from .llm import call_slot
 
 
@@ -109,7 +110,7 @@ class ErrorHealer:
         try:
             # Broadcast to LLM team for collaborative healing
             collab_session = await self.collaboration_manager.broadcast_user_input(
-                healing_prompt, session_id
+                healing_prompt, session_id, priority='healing'
             )
             
             # Wait for collaboration to complete
@@ -129,6 +130,9 @@ class ErrorHealer:
                     {"original_error_id": error.id, "session_id": session_id}
                 )
                 
+        except CollaborationOverloaded as e:
+            # Shed under load; the error stays eligible for a later healing pass
+            print(f"⏳ Healing deferred for error {error.id}: {e}")
         except Exception as e:
             print(f"❌ Healing session failed for error {error.id}: {e}")
             self.error_tracker.log_error(
@@ -1,17 +1,285 @@
+"""
+In-process fan-out event bus for SSE.
+
+Every subscriber (one per ``/events`` connection) gets its own bounded queue,
+so each client sees every event instead of competing for them. ``emit`` never
+waits: an event is serialized to JSON once and appended to each subscriber's
+queue. When a queue is full, the subscription's overflow policy decides:
+
+* ``drop_oldest``: discard the oldest queued event (the client skips ahead)
+* ``drop_newest``: discard the incoming event
+* ``disconnect``: close the subscription; the client reconnects
+
+Every event also gets a monotonically increasing id (``event_id``; the SSE
+``id:`` field) and goes into a replay ring bounded by ``replay_max_events``
+and ``replay_max_bytes``. A reconnecting client passes its last id back
+(``Last-Event-ID`` or ``?since=``) and gets what it missed before the live
+stream resumes. Clients that are far behind can page through
+``/events/catchup`` instead.
+
+Settings come from the ``events`` config section; per-subscriber lag and
+drop counters are served by ``/events/stats``.
+"""
+
+from __future__ import annotations
 import asyncio
+import itertools
+import json
 import time
-from typing import AsyncIterator, Dict, Any
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+DEFAULT_EVENT_SETTINGS: Dict[str, Any] = {
+    'queue_size': 1000,
+    'overflow': 'drop_oldest',
+    'replay_max_events': 5000,
+    'replay_max_bytes': 4 * 1024 * 1024,
+}
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'disconnect')
+
+
+class SubscriptionClosed(Exception):
+    """The subscription was closed (by the bus on overflow, or by its owner)."""
+
+
+class Envelope:
+    """An emitted event with its id and encodings, shared by every subscriber and the replay ring."""
+
+    __slots__ = ('id', 'event', 'data', 'frame')
+
+    def __init__(self, event_id: int, event: Dict[str, Any]):
+        self.id = event_id
+        self.event = event
+        self.data = json.dumps(event, ensure_ascii=False, default=str)
+        self.frame = f"id: {event_id}\ndata: {self.data}\n\n"
+
+
+class Subscription:
+    """One consumer's bounded queue of envelopes."""
+
+    def __init__(self, bus: 'EventBus', sub_id: int, name: str, maxsize: int, overflow: str):
+        self.bus = bus
+        self.id = sub_id
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.created_ts = time.time()
+        self.delivered = 0
+        self.dropped = 0
+        self.max_lag = 0
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self._queue: Deque[Envelope] = deque()
+        self._wakeup = asyncio.Event()
+
+    @property
+    def lag(self) -> int:
+        """Events queued but not yet taken."""
+        return len(self._queue)
+
+    def offer(self, envelope: Envelope):
+        """Queue ``envelope`` without waiting, applying the overflow policy when full."""
+        if self.closed:
+            return
+        if len(self._queue) >= self.maxsize:
+            if self.overflow == 'drop_newest':
+                self.dropped += 1
+                return
+            if self.overflow == 'disconnect':
+                self.dropped += len(self._queue) + 1
+                self.close('overflow')
+                return
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(envelope)
+        self.max_lag = max(self.max_lag, len(self._queue))
+        self._wakeup.set()
+
+    async def get(self) -> Envelope:
+        """Next envelope; raises SubscriptionClosed once the subscription is closed."""
+        while not self._queue:
+            if self.closed:
+                raise SubscriptionClosed(self.close_reason)
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        if self.closed:
+            raise SubscriptionClosed(self.close_reason)
+        self.delivered += 1
+        return self._queue.popleft()
+
+    def close(self, reason: str = 'closed'):
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self._queue.clear()
+        self._wakeup.set()
+        self.bus._forget(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'overflow': self.overflow,
+            'queue_size': self.maxsize,
+            'lag': self.lag,
+            'max_lag': self.max_lag,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'age_sec': round(time.time() - self.created_ts, 1),
+        }
+
+
+class EventBus:
+    """Broadcasts emitted events to every subscriber."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = {**DEFAULT_EVENT_SETTINGS, **(settings or {})}
+        self._subscribers: Dict[int, Subscription] = {}
+        self._ids = itertools.count(1)
+        self._event_ids = itertools.count(1)
+        self.last_id = 0
+        self._ring: Deque[Envelope] = deque()
+        self._ring_bytes = 0
+        self.replays = 0
+        self.published = 0
+        self.serialized = 0
+        self.closed_subscribers = 0
+        self.disconnected = 0
+        self._retired = {'delivered': 0, 'dropped': 0}
+
+    @classmethod
+    def from_config(cls, config) -> 'EventBus':
+        return cls(getattr(config, 'events', None) or {})
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Fan ``event`` out without blocking; returns how many subscribers got it."""
+        event.setdefault("ts", time.time())
+        event.setdefault("source", "real")
+        self.last_id = event["event_id"] = next(self._event_ids)
+        self.published += 1
+        envelope = Envelope(self.last_id, event)
+        self.serialized += 1
+        self._remember(envelope)
+        for sub in list(self._subscribers.values()):
+            sub.offer(envelope)
+        return len(self._subscribers)
+
+    def _remember(self, envelope: Envelope):
+        self._ring.append(envelope)
+        self._ring_bytes += len(envelope.frame)
+        self._trim()
+
+    def _trim(self):
+        """Evict the oldest ring events until it is within the replay bounds."""
+        max_events = max(0, int(self.settings['replay_max_events']))
+        max_bytes = max(0, int(self.settings['replay_max_bytes']))
+        while self._ring and (len(self._ring) > max_events or self._ring_bytes > max_bytes):
+            self._ring_bytes -= len(self._ring.popleft().frame)
+
+    @property
+    def oldest_id(self) -> Optional[int]:
+        """Oldest id still in the replay ring."""
+        return self._ring[0].id if self._ring else None
+
+    def replay(self, since: int, limit: Optional[int] = None) -> Tuple[List[Envelope], bool]:
+        """Ring events after id ``since`` (oldest first), and whether none after it were lost.
+
+        Events are lost when the ring evicted them, or when ``since`` is ahead of
+        this process (ids restart with the server).
+        """
+        self.replays += 1
+        if since > self.last_id:
+            since = 0
+            complete = False
+        else:
+            complete = since + 1 >= (self.oldest_id or self.last_id + 1)
+        # ids in the ring are consecutive
+        start = max(0, since + 1 - (self.oldest_id or 0))
+        stop = None if limit is None else start + max(0, limit)
+        return list(itertools.islice(self._ring, start, stop)), complete
+
+    def subscribe(self, name: str = '', queue_size: Optional[int] = None,
+                  overflow: Optional[str] = None) -> Subscription:
+        overflow = overflow or self.settings['overflow']
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}' (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        sub = Subscription(self, next(self._ids), name, int(queue_size or self.settings['queue_size']), overflow)
+        self._subscribers[sub.id] = sub
+        return sub
+
+    def _forget(self, sub: Subscription):
+        if self._subscribers.pop(sub.id, None) is None:
+            return
+        self.closed_subscribers += 1
+        if sub.close_reason == 'overflow':
+            self.disconnected += 1
+        self._retired['delivered'] += sub.delivered
+        self._retired['dropped'] += sub.dropped
+
+    def stats(self) -> Dict[str, Any]:
+        subs = [sub.to_dict() for sub in self._subscribers.values()]
+        return {
+            'settings': dict(self.settings),
+            'published': self.published,
+            'serialized': self.serialized,
+            'last_id': self.last_id,
+            'replay': {'events': len(self._ring), 'bytes': self._ring_bytes,
+                       'oldest_id': self.oldest_id, 'replays': self.replays},
+            'subscribers': subs,
+            'closed_subscribers': self.closed_subscribers,
+            'disconnected_on_overflow': self.disconnected,
+            'delivered': self._retired['delivered'] + sum(s['delivered'] for s in subs),
+            'dropped': self._retired['dropped'] + sum(s['dropped'] for s in subs),
+        }
+
+
+bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    return bus
+
+
+def configure_event_bus(config) -> EventBus:
+    """Apply the ``events`` config section to the process-wide bus (called from app lifespan)."""
+    bus.settings = {**DEFAULT_EVENT_SETTINGS, **(getattr(config, 'events', None) or {})}
+    bus._trim()
+    return bus
 
-# Simple in-process event bus for SSE
-bus: asyncio.Queue = asyncio.Queue(maxsize=50000)
 
 async def emit(event: Dict[str, Any]):
-    event.setdefault("ts", time.time())
-    event.setdefault("source", "real")
-    await bus.put(event)
+    """Publish ``event`` to every subscriber; never waits on slow consumers."""
+    bus.publish(event)
+
+
+# Tasks started by emit_soon, held until done (the loop only keeps weak references)
+_emit_tasks: Set[asyncio.Task] = set()
+
+
+def _emit_done(task: asyncio.Task):
+    _emit_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Warning: event emit failed: {task.exception()}")
+
+
+def emit_soon(event: Dict[str, Any]) -> asyncio.Task:
+    """Schedule :func:`emit` from synchronous code running on the event loop."""
+    task = asyncio.get_running_loop().create_task(emit(event))
+    _emit_tasks.add(task)
+    task.add_done_callback(_emit_done)
+    return task
 
-async def consume() -> AsyncIterator[Dict[str, Any]]:
-    while True:
-        e = await bus.get()
-        yield e
 
+async def consume(name: str = '') -> AsyncIterator[Dict[str, Any]]:
+    """Events emitted from now on, through a subscription of its own."""
+    sub = bus.subscribe(name)
+    try:
+        while True:
+            try:
+                envelope = await sub.get()
+            except SubscriptionClosed:
+                return
+            yield envelope.event
+    finally:
+        sub.close()
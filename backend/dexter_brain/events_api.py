@@ -1,7 +1,8 @@
 import json, asyncio, os
-from fastapi import APIRouter, Body
+from typing import List, Optional
+from fastapi import APIRouter, Body, HTTPException, Query, Request
 from starlette.responses import StreamingResponse
-from .events import consume, emit
+from .events import OVERFLOW_POLICIES, Envelope, Subscription, SubscriptionClosed, emit, get_event_bus
 
 router = APIRouter()
 
@@ -13,24 +14,59 @@ def _keepalive_interval() -> int:
     except Exception:
         return 20
 
-async def _stream():
+async def _stream(sub: Subscription, backlog: List[Envelope], gap: Optional[dict] = None):
     interval = _keepalive_interval()
-    agen = consume()
-    while True:
-        try:
-            e = await asyncio.wait_for(agen.__anext__(), timeout=interval)
-            yield f"data: {json.dumps(e, ensure_ascii=False)}\n\n"
-        except asyncio.TimeoutError:
-            # SSE comment line as heartbeat (not delivered to onmessage)
-            yield ": keepalive\n\n"
-        except StopAsyncIteration:
-            # End of stream
-            break
+    try:
+        if gap is not None:
+            # Some missed events are gone; the client should resync (e.g. from /events/catchup)
+            yield f"event: reset\ndata: {json.dumps(gap)}\n\n"
+        for envelope in backlog:
+            yield envelope.frame
+        while True:
+            try:
+                envelope = await asyncio.wait_for(sub.get(), timeout=interval)
+                # serialized once by the bus for every subscriber
+                yield envelope.frame
+            except asyncio.TimeoutError:
+                # SSE comment line as heartbeat (not delivered to onmessage)
+                yield ": keepalive\n\n"
+            except SubscriptionClosed as e:
+                # Fell too far behind under the disconnect policy; EventSource reconnects
+                yield f": closed ({e})\n\n"
+                break
+    finally:
+        sub.close()
+
+def _resume_id(request: Request, since: Optional[int]) -> Optional[int]:
+    """Where a client resumes: ``?since=`` or the ``Last-Event-ID`` EventSource sends on reconnect"""
+    if since is not None:
+        return since
+    try:
+        return int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        return None
 
 @router.get("/events")
-async def events():
+async def events(request: Request, since: Optional[int] = None, overflow: Optional[str] = None,
+                 queue_size: Optional[int] = None):
+    """Server-sent event stream, resumed after ``since``/``Last-Event-ID`` when given.
+
+    ``overflow``/``queue_size`` override the configured policy for this client.
+    """
+    if overflow is not None and overflow not in OVERFLOW_POLICIES:
+        raise HTTPException(400, f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+    bus = get_event_bus()
+    client = request.client
+    sub = bus.subscribe(f"{client.host}:{client.port}" if client else "", queue_size, overflow)
+    # No await between subscribing and the replay, so nothing is missed or sent twice
+    backlog, gap = [], None
+    resume = _resume_id(request, since)
+    if resume is not None:
+        backlog, complete = bus.replay(resume)
+        if not complete:
+            gap = {"since": resume, "oldest_id": bus.oldest_id, "last_id": bus.last_id}
     return StreamingResponse(
-        _stream(),
+        _stream(sub, backlog, gap),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -40,6 +76,32 @@ async def events():
     )
 
 
+@router.get("/events/catchup")
+async def catchup(since: int = 0, limit: int = Query(1000, ge=1, le=5000)):
+    """Events after ``since`` in one JSON page, for clients too far behind to replay over SSE.
+
+    ``complete`` is false when some events after ``since`` already left the
+    replay ring; ``more`` means another page follows from ``last_id``.
+    """
+    bus = get_event_bus()
+    page, complete = bus.replay(since, limit)
+    last_id = page[-1].id if page else min(since, bus.last_id)
+    return {
+        "events": [envelope.event for envelope in page],
+        "last_id": last_id,
+        "head_id": bus.last_id,
+        "oldest_id": bus.oldest_id,
+        "complete": complete,
+        "more": bool(page) and last_id < bus.last_id,
+    }
+
+
+@router.get("/events/stats")
+async def event_stats():
+    """Bus totals plus each subscriber's lag and drop counters"""
+    return get_event_bus().stats()
+
+
 @router.post("/events/ping")
 async def ping(slot: str = Body("dexter"), text: str = Body("UI ping"), event: str = Body("ui.ping")):
     await emit({"slot": slot, "event": event, "text": text})
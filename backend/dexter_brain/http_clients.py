@@ -0,0 +1,197 @@
+"""
+Pooled HTTP clients for LLM providers.
+
+One long-lived ``httpx.AsyncClient`` is kept per provider endpoint (scheme,
+host and port) so proposals, refinements and votes reuse warm keep-alive
+connections instead of paying a TCP+TLS handshake on every call.
+"""
+
+from __future__ import annotations
+import asyncio
+import importlib.util
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+DEFAULT_HTTP_SETTINGS: Dict[str, Any] = {
+    'max_connections': 20,
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 60.0,
+    'http2': True,
+    'connect_timeout': 10.0,
+}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package; fall back to HTTP/1.1 without it."""
+    return importlib.util.find_spec('h2') is not None
+
+
+def endpoint_key(url: str) -> str:
+    """Normalize a URL to the ``scheme://host:port`` key used for pooling."""
+    parts = urlsplit(url if '://' in url else f'http://{url}')
+    scheme = (parts.scheme or 'http').lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port or (443 if scheme == 'https' else 80)
+    return f"{scheme}://{host}:{port}"
+
+
+class _EndpointStats:
+    """Per-endpoint request and connection counters."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.errors = 0
+        self.created_ts = time.time()
+        self.last_used_ts: Optional[float] = None
+        self.http_versions: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.new_connections, 0)
+        return {
+            'requests': self.requests,
+            'new_connections': self.new_connections,
+            'reused_connections': reused,
+            'reuse_ratio': round(reused / self.requests, 3) if self.requests else 0.0,
+            'errors': self.errors,
+            'http_versions': dict(self.http_versions),
+            'created_ts': self.created_ts,
+            'last_used_ts': self.last_used_ts,
+        }
+
+
+class ProviderClientRegistry:
+    """Owns one pooled ``httpx.AsyncClient`` per provider endpoint."""
+
+    def __init__(self, settings: Dict[str, Any] | None = None):
+        self.settings = {**DEFAULT_HTTP_SETTINGS, **(settings or {})}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stale: List[httpx.AsyncClient] = []  # left behind by a finished loop, closed by aclose()
+
+    @classmethod
+    def from_config(cls, config) -> 'ProviderClientRegistry':
+        rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+        settings = rt.get('http', {}) if isinstance(rt, dict) else {}
+        return cls(settings)
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Return the shared client for the endpoint serving ``url``."""
+        self._bind_loop()
+        key = endpoint_key(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._build_client(key)
+            self._clients[key] = client
+            self._stats.setdefault(key, _EndpointStats())
+        return client
+
+    def _bind_loop(self):
+        # Pooled connections belong to the loop that opened them. If we are
+        # called from a new loop (e.g. successive asyncio.run() calls in
+        # scripts) the old pools are unusable, so start fresh. The old clients
+        # are closed on their own loop if it still runs, otherwise by aclose().
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not loop:
+            old_loop, self._loop = self._loop, loop
+            stale, self._clients = self._clients, {}
+            for client in stale.values():
+                if old_loop is not None and old_loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+                else:
+                    self._stale.append(client)
+
+    def _build_client(self, key: str) -> httpx.AsyncClient:
+        s = self.settings
+        limits = httpx.Limits(
+            max_connections=int(s['max_connections']),
+            max_keepalive_connections=int(s['max_keepalive_connections']),
+            keepalive_expiry=float(s['keepalive_expiry']),
+        )
+        # HTTP/2 is negotiated via ALPN, so it only applies to TLS endpoints.
+        http2 = bool(s.get('http2')) and key.startswith('https://') and _http2_available()
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=http2,
+            timeout=httpx.Timeout(60.0, connect=float(s['connect_timeout'])),
+            event_hooks={
+                'request': [self._make_request_hook(key)],
+                'response': [self._make_response_hook(key)],
+            },
+        )
+
+    def _make_request_hook(self, key: str):
+        async def on_request(request: httpx.Request):
+            stats = self._stats.setdefault(key, _EndpointStats())
+            stats.requests += 1
+            stats.last_used_ts = time.time()
+
+            async def trace(event_name: str, info: Dict[str, Any]):
+                # httpcore only emits connect_tcp when it has to open a socket;
+                # requests served from the pool skip straight to send_request.
+                if event_name == 'connection.connect_tcp.complete':
+                    stats.new_connections += 1
+                elif event_name == 'connection.connect_tcp.failed':
+                    stats.errors += 1
+
+            request.extensions['trace'] = trace
+        return on_request
+
+    def _make_response_hook(self, key: str):
+        async def on_response(response: httpx.Response):
+            stats = self._stats.setdefault(key, _EndpointStats())
+            version = response.http_version or 'unknown'
+            stats.http_versions[version] = stats.http_versions.get(version, 0) + 1
+            if response.status_code >= 500:
+                stats.errors += 1
+        return on_response
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-endpoint connection reuse statistics."""
+        return {
+            'settings': {k: self.settings[k] for k in DEFAULT_HTTP_SETTINGS},
+            'http2_available': _http2_available(),
+            'open_clients': sum(1 for c in self._clients.values() if not c.is_closed),
+            'endpoints': {key: st.to_dict() for key, st in self._stats.items()},
+        }
+
+    async def aclose(self):
+        """Close every pooled client; safe to call more than once."""
+        clients, self._clients = list(self._clients.values()), {}
+        stale, self._stale = self._stale, []
+        for client in stale + clients:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+
+_registry: Optional[ProviderClientRegistry] = None
+
+
+def get_client_registry() -> ProviderClientRegistry:
+    """Return the process-wide registry, creating a default one on first use."""
+    global _registry
+    if _registry is None:
+        _registry = ProviderClientRegistry()
+    return _registry
+
+
+def configure_client_registry(config) -> ProviderClientRegistry:
+    """Install a registry built from ``runtime.http`` (called from app lifespan)."""
+    global _registry
+    _registry = ProviderClientRegistry.from_config(config)
+    return _registry
+
+
+async def close_client_registry():
+    """Shut down the process-wide registry (called from app lifespan)."""
+    if _registry is not None:
+        await _registry.aclose()
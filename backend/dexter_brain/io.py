@@ -1,5 +1,8 @@
 import json
 import os
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, List, Optional
 
 def append_jsonl(path: str, obj: dict):
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -8,3 +11,135 @@ def append_jsonl(path: str, obj: dict):
         f.flush()
         os.fsync(f.fileno())
 
+
+def _parse(line: bytes) -> Optional[Any]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _last_newline_end(f, size: int, block_size: int) -> int:
+    """Offset just past the file's last newline (0 if there is none)."""
+    pos = size
+    while pos > 0:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        i = f.read(step).rfind(b"\n")
+        if i != -1:
+            return pos + i + 1
+    return 0
+
+
+def read_tail_lines(f, end: int, n: int, block_size: int = 65536) -> List[bytes]:
+    """The last ``n`` non-empty lines before ``end``, oldest first, reading blocks backwards from ``end``."""
+    lines: List[bytes] = []
+    pos = end
+    head = b""
+    while pos > 0 and len(lines) < n:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        parts = (f.read(step) + head).split(b"\n")
+        head = parts[0]  # may continue in the previous block
+        for part in reversed(parts[1:]):
+            if part.strip():
+                lines.append(part)
+                if len(lines) >= n:
+                    break
+    if pos == 0 and len(lines) < n and head.strip():
+        lines.append(head)
+    lines.reverse()
+    return lines
+
+
+class _TailState:
+    __slots__ = ("ino", "size", "mtime", "end", "records")
+
+    def __init__(self, ino: int, end: int, capacity: int):
+        self.ino = ino
+        self.size = -1
+        self.mtime = -1.0
+        self.end = end
+        self.records: Deque[Any] = deque(maxlen=capacity)
+
+
+class JsonlTail:
+    """Last ``n`` records of append-only JSONL files, without scanning them from the start.
+
+    The first read of a file seeks from EOF and reads blocks backwards until it
+    has ``n`` complete lines. Per file the parsed tail and the offset of the
+    last complete line are cached under its (inode, size, mtime): an unchanged
+    file costs one ``stat``, and a file that grew only has its new bytes read.
+    A trailing line without a newline (a write in progress) is returned if it
+    already parses, but is not cached.
+    """
+
+    def __init__(self, max_files: int = 64, block_size: int = 65536):
+        self.max_files = max_files
+        self.block_size = block_size
+        self._files: "OrderedDict[str, _TailState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "appends": 0, "rebuilds": 0}
+
+    def tail(self, path: str, n: int) -> List[Any]:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            state = self._files.get(path)
+            if state is not None:
+                self._files.move_to_end(path)
+            with open(path, "rb") as f:
+                if (state is None or state.ino != st.st_ino or st.st_size < state.end
+                        or n > (state.records.maxlen or 0)):
+                    state = self._rebuild(f, path, st, n)
+                elif (st.st_size, st.st_mtime) != (state.size, state.mtime):
+                    self._read_appended(f, state, st.st_size)
+                    self.counters["appends"] += 1
+                else:
+                    self.counters["hits"] += 1
+                state.size, state.mtime = st.st_size, st.st_mtime
+                partial = self._partial(f, state)
+            records = list(state.records)
+        if partial is not None:
+            records.append(partial)
+        return records[-n:] if n > 0 else []
+
+    def _rebuild(self, f, path: str, st: os.stat_result, n: int) -> _TailState:
+        end = _last_newline_end(f, st.st_size, self.block_size)
+        state = _TailState(st.st_ino, end, max(n, 1))
+        for line in read_tail_lines(f, end, n, self.block_size):
+            record = _parse(line)
+            if record is not None:
+                state.records.append(record)
+        self._files[path] = state
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+        self.counters["rebuilds"] += 1
+        return state
+
+    def _read_appended(self, f, state: _TailState, size: int):
+        f.seek(state.end)
+        data = f.read(size - state.end)
+        cut = data.rfind(b"\n")
+        if cut == -1:
+            return
+        for line in data[:cut].split(b"\n"):
+            if line.strip():
+                record = _parse(line)
+                if record is not None:
+                    state.records.append(record)
+        state.end += cut + 1
+
+    @staticmethod
+    def _partial(f, state: _TailState) -> Optional[Any]:
+        if state.size <= state.end:
+            return None
+        f.seek(state.end)
+        fragment = f.read(state.size - state.end)
+        return _parse(fragment) if fragment.strip() else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "files": len(self._files)}
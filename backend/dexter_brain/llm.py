@@ -7,27 +7,59 @@ from __future__ import annotations
 import asyncio
 import json
 import os
-from typing import Any, Dict, Optional
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 import httpx
 
 try:  # Allow running as standalone module
     from .db import BrainDB
+    from .http_clients import get_client_registry
+    from .memory import MemoryContextProvider, get_memory_context_provider
+    from .llm_cache import get_response_cache, request_key
+    from .singleflight import SingleFlight
+    from .mock_provider import call_mock, prompt_usage, stream_mock
+    from .rate_limit import estimate_tokens, get_rate_limiter, http_error, throttle_info
+    from .circuit_breaker import get_breaker
+    from .conversation import Conversation, system_prompt
 except ImportError:  # pragma: no cover
     from db import BrainDB
+    from http_clients import get_client_registry
+    from memory import MemoryContextProvider, get_memory_context_provider
+    from llm_cache import get_response_cache, request_key
+    from singleflight import SingleFlight
+    from mock_provider import call_mock, prompt_usage, stream_mock
+    from rate_limit import estimate_tokens, get_rate_limiter, http_error, throttle_info
+    from circuit_breaker import get_breaker
+    from conversation import Conversation, system_prompt
 
 OPENAI_COMPAT_PROVIDERS = {"openai", "vultr", "nvidia", "custom"}
+NATIVE_PROVIDERS = {"ollama", "nemotron", "anthropic", "model", "mock"}
 
-async def call_slot(config, llm_name: str, prompt: str, *, db: BrainDB | None = None) -> str:
-    """
-    Call a specific LLM slot with the given prompt.
-    
-    Args:
-        config: Configuration object containing LLM settings
-        llm_name: Name of the LLM to call (e.g., 'openai', 'ollama', 'nemotron')
-        prompt: The prompt to send to the LLM
-        
-    Returns:
-        The LLM's response as a string
+# Sampling temperature each provider uses when params.temperature is unset
+_DEFAULT_TEMPERATURE = {"ollama": 0.2, "anthropic": 1.0, "mock": 0.0}
+
+# Identical concurrent requests (same slot, model, params and prompt) share one upstream call
+_inflight = SingleFlight()
+# Collaboration prompts name their session; two sessions asking the same thing still share a call
+_SESSION_HEADER_RE = re.compile(r"^Collaboration Session ID: .*$\n?", re.MULTILINE)
+
+def get_singleflight_stats() -> Dict[str, Any]:
+    return _inflight.stats()
+
+@asynccontextmanager
+async def _provider_client(endpoint: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Borrow the pooled client for ``endpoint``; it stays open for reuse."""
+    yield get_client_registry().get(endpoint)
+
+async def _prepare_call(config, llm_name: str, prompt: str, *, db: BrainDB | None = None,
+                        memory: MemoryContextProvider | None = None, conversation: Conversation | None = None):
+    """Validate the slot and prefix the prompt with memory context.
+
+    A conversation only gets memory context on its first turn, so the prefix
+    of later turns stays the same. The memory lookup is a SQLite query, so it
+    runs in a worker thread.
     """
     models = config.models
     if llm_name not in models:
@@ -38,42 +70,170 @@ async def call_slot(config, llm_name: str, prompt: str, *, db: BrainDB | None =
         raise ValueError(f"LLM '{llm_name}' is not enabled")
 
     # Load context from Dexter's brain if available
-    close_db = False
-    if db is None:
+    context = ""
+    if conversation is not None and conversation.messages:
+        pass
+    elif db is not None:
         try:
-            rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
-            db_path = rt.get('db_path') if isinstance(rt, dict) else None
-            enable_fts = rt.get('enable_fts', True) if isinstance(rt, dict) else True
-            if db_path:
-                db = BrainDB(db_path=db_path, enable_fts=enable_fts)
-                close_db = True
-        except Exception:
-            db = None
-    if db:
-        try:
-            memories = db.search_memories(prompt, limit=5)
+            memories = await asyncio.to_thread(db.search_memories, prompt, limit=5)
             context = "\n".join(m.get('content', '') for m in memories if m.get('content'))
-            if context:
-                prompt = f"Context:\n{context}\n\n{prompt}"
-        finally:
-            if close_db:
-                db.close()
+        except Exception:
+            context = ""
+    else:
+        if memory is None:
+            try:
+                memory = get_memory_context_provider(config)
+            except Exception:
+                memory = None
+        if memory is not None:
+            context = await asyncio.to_thread(memory.context_for, prompt)
+    if context:
+        prompt = f"Context:\n{context}\n\n{prompt}"
+    return model_config, prompt
+
+async def call_slot(config, llm_name: str, prompt: str, *, db: BrainDB | None = None,
+                    memory: MemoryContextProvider | None = None, use_cache: bool = True,
+                    conversation: Conversation | None = None) -> str:
+    """
+    Call a specific LLM slot with the given prompt.
     
+    Args:
+        config: Configuration object containing LLM settings
+        llm_name: Name of the LLM to call (e.g., 'openai', 'ollama', 'nemotron')
+        prompt: The prompt to send to the LLM
+        db: Optional open BrainDB to search for context (legacy path)
+        memory: Optional memory-context provider; defaults to the shared
+            read-only provider for ``config.runtime.db_path``
+        use_cache: Set False to skip the response cache for this call
+        conversation: Send ``prompt`` as the next turn of this conversation
+            (see conversation.py); such calls bypass the response cache, and
+            only their first turn (which depends on no history) goes through
+            single-flight
+        
+    Returns:
+        The LLM's response as a string
+    """
+    model_config, prompt = await _prepare_call(config, llm_name, prompt, db=db, memory=memory, conversation=conversation)
+    if conversation is not None:
+        if conversation.messages or not _singleflight_enabled(config):
+            return await _limited_dispatch(config, model_config, llm_name, prompt, conversation)
+        return await _first_turn(config, model_config, llm_name, prompt, conversation)
+    key = request_key(llm_name, model_config, prompt)
+
+    def upstream():
+        if _singleflight_enabled(config):
+            return _inflight.do(key, lambda: _limited_dispatch(config, model_config, llm_name, prompt))
+        return _limited_dispatch(config, model_config, llm_name, prompt)
+
+    policy = _cache_policy(config, model_config) if use_cache else None
+    if policy is None:
+        return await upstream()
+    cache, ttl_sec = policy
+    return await cache.get_or_call(key, llm_name, upstream, ttl_sec)
+
+async def _first_turn(config, model_config: Dict[str, Any], llm_name: str, prompt: str,
+                      conversation: Conversation) -> str:
+    """A conversation's opening turn, shared with other sessions sending the same one.
+
+    The key leaves out the session header, so a campaign broadcast and a chat
+    with the same request share the slot's proposal call. Conversations that
+    joined another's flight record the shared reply as their own turn.
+    """
+    shared = f"{conversation.system}\n\n{_SESSION_HEADER_RE.sub('', prompt)}"
+    key = "turn:" + request_key(llm_name, model_config, shared)
+    text = await _inflight.do(key, lambda: _limited_dispatch(config, model_config, llm_name, prompt, conversation))
+    if not conversation.messages:
+        conversation.commit(prompt, text)
+    return text
+
+def _record_outcome(config, llm_name: str, start: float, error: BaseException | None = None):
+    """Feed a finished provider call into the slot's circuit breaker."""
+    breaker = get_breaker(config, llm_name)
+    if breaker is None:
+        return
+    elapsed = time.perf_counter() - start
+    if error is None:
+        breaker.record_success(elapsed)
+    else:
+        breaker.record_failure(elapsed, error)
+
+def _singleflight_enabled(config) -> bool:
+    rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+    if not isinstance(rt, dict):
+        return True
+    return bool(rt.get('llm_singleflight', {}).get('enabled', True))
+
+def _cache_policy(config, model_config: Dict[str, Any]):
+    """Return ``(cache, ttl_sec)`` when this slot opted into caching, else None.
+
+    Slots opt in with ``"cache": true`` or ``"cache": {"ttl_sec": ..,
+    "allow_temperature": ..}``. Sampled (temperature > 0) completions are not
+    cached unless ``allow_temperature`` is set.
+    """
+    slot_cache = model_config.get('cache')
+    if not slot_cache:
+        return None
+    slot_cache = slot_cache if isinstance(slot_cache, dict) else {}
+    if not slot_cache.get('enabled', True):
+        return None
+    cache = get_response_cache(config)
+    if cache is None:
+        return None
+    provider = model_config.get('provider', '').lower()
+    temperature = model_config.get('params', {}).get('temperature', _DEFAULT_TEMPERATURE.get(provider, 0.7))
+    try:
+        sampled = float(temperature) > 0
+    except (TypeError, ValueError):
+        sampled = True
+    if sampled and not slot_cache.get('allow_temperature', False):
+        cache.counters['bypassed'] += 1
+        return None
+    return cache, slot_cache.get('ttl_sec')
+
+async def _limited_dispatch(config, model_config: Dict[str, Any], llm_name: str, prompt: str,
+                            conversation: Conversation | None = None) -> str:
+    """Dispatch through the provider endpoint's rate limiter (retrying 429/503)."""
+    limiter = get_rate_limiter(config, model_config)
+    start = time.perf_counter()
+    try:
+        if limiter is None:
+            result = await _dispatch(model_config, llm_name, prompt, conversation)
+        else:
+            tokens = estimate_tokens(prompt) + (conversation.tokens() if conversation is not None else 0)
+            result = await limiter.run(lambda: _dispatch(model_config, llm_name, prompt, conversation), tokens)
+    except Exception as e:
+        _record_outcome(config, llm_name, start, e)
+        raise
+    _record_outcome(config, llm_name, start)
+    return result
+
+async def _dispatch(model_config: Dict[str, Any], llm_name: str, prompt: str,
+                    conversation: Conversation | None = None) -> str:
+    """Send a prepared prompt to the slot's provider (as the next turn of ``conversation``, if given)."""
     provider = model_config.get('provider', '').lower()
+    if conversation is not None:
+        conversation.last_usage = {}
     if provider in OPENAI_COMPAT_PROVIDERS:
-        return await _call_openai_compatible(model_config, prompt)
+        text = await _call_openai_compatible(model_config, prompt, conversation)
     elif provider == 'ollama':
-        return await _call_ollama(model_config, prompt)
+        text = await _call_ollama(model_config, prompt, conversation)
     elif provider == 'nemotron':
-        return await _call_nemotron(model_config, prompt)
+        text = await _call_nemotron(model_config, prompt, conversation)
     elif provider == 'anthropic':
-        return await _call_anthropic(model_config, prompt)
+        text = await _call_anthropic(model_config, prompt, conversation)
     elif provider == 'model':
-        return await _call_model_api(model_config, prompt)
+        text = await _call_model_api(model_config, prompt, conversation)
+    elif provider == 'mock':
+        text = await call_mock(model_config, llm_name, prompt)
+        if conversation is not None:
+            conversation.last_usage = prompt_usage(model_config, prompt, conversation.tokens())
     else:
         raise ValueError(f"Unknown provider '{provider}' for LLM '{llm_name}'")
+    if conversation is not None:
+        conversation.commit(prompt, text)
+    return text
 # External "model" API integration
-async def _call_model_api(model_config: Dict[str, Any], prompt: str) -> str:
+async def _call_model_api(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None) -> str:
     """Call the external 'model' API for Dexter backend operations."""
     api_key = model_config.get('api_key')
     if not api_key:
@@ -81,15 +241,9 @@ async def _call_model_api(model_config: Dict[str, Any], prompt: str) -> str:
     endpoint = model_config.get('endpoint', 'https://api.model.com/v1').rstrip('/')
     model = model_config.get('model', '')
     params = model_config.get('params', {})
-    identity = model_config.get('identity', '')
-    role = model_config.get('role', '')
-    system_prompt = f"{identity} {role}".strip()
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
+    messages = _chat_messages(model_config, prompt, conversation)
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    async with httpx.AsyncClient() as client:
+    async with _provider_client(endpoint) as client:
         resp = await client.post(f"{endpoint}/chat/completions", headers=headers, json={
             "model": model,
             "messages": messages,
@@ -99,14 +253,15 @@ async def _call_model_api(model_config: Dict[str, Any], prompt: str) -> str:
         try:
             resp.raise_for_status()
         except httpx.HTTPStatusError as e:
-            raise ValueError(f"Model API error {e.response.status_code}: {e.response.text}")
+            raise http_error("Model API", e.response)
         data = resp.json()
         try:
             return data['choices'][0]['message']['content']
         except Exception:
             raise ValueError(f"Unexpected response format: {data}")
 
-async def _call_openai_compatible(model_config: Dict[str, Any], prompt: str) -> str:
+async def _call_openai_compatible(model_config: Dict[str, Any], prompt: str,
+                                  conversation: Conversation | None = None) -> str:
     """Call OpenAI compatible endpoint honoring configured endpoint URL."""
     api_key = model_config.get('api_key')
     if not api_key:
@@ -117,65 +272,137 @@ async def _call_openai_compatible(model_config: Dict[str, Any], prompt: str) ->
     if not model:
         raise ValueError("Model not specified")
     params = model_config.get('params', {})
-    identity = model_config.get('identity', '')
-    role = model_config.get('role', '')
-    system_prompt = f"{identity} {role}".strip()
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers, json={
-            "model": model,
-            "messages": messages,
-            "temperature": params.get('temperature', 0.7),
-            "max_tokens": params.get('max_tokens', 2000)
-        }, timeout=60.0)
+    body = {
+        "model": model,
+        "messages": _chat_messages(model_config, prompt, conversation),
+        "temperature": params.get('temperature', 0.7),
+        "max_tokens": params.get('max_tokens', 2000)
+    }
+    if conversation is not None and model_config.get('prompt_cache'):
+        body["prompt_cache_key"] = conversation.key
+    async with _provider_client(endpoint) as client:
+        resp = await client.post(url, headers=headers, json=body, timeout=60.0)
         try:
             resp.raise_for_status()
         except httpx.HTTPStatusError as e:
-            raise ValueError(f"OpenAI-compatible API error {e.response.status_code}: {e.response.text}")
+            raise http_error("OpenAI-compatible API", e.response)
         data = resp.json()
+        if conversation is not None:
+            usage = data.get('usage') or {}
+            conversation.last_usage = {
+                "prompt_tokens": usage.get('prompt_tokens'),
+                "cached_tokens": (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0),
+                "prompt_eval_sec": None,
+            }
         try:
             return data['choices'][0]['message']['content']
         except Exception:
             raise ValueError(f"Unexpected response format: {data}")
 
-async def _call_anthropic(model_config: Dict[str, Any], prompt: str) -> str:
+def _anthropic_body(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None) -> Dict[str, Any]:
+    """Messages API body; ``prompt_cache`` slots mark the system prompt and latest history turn as cacheable."""
+    # Anthropic uses top-level system plus messages array with user roles
+    if conversation is not None:
+        system = conversation.system
+        messages = [dict(m) for m in conversation.messages_for(prompt) if m["role"] != "system"]
+    else:
+        system = system_prompt(model_config)
+        messages = [{"role": "user", "content": prompt}]
+    body = {"model": model_config.get('model', ''), "messages": messages,
+            "max_tokens": model_config.get('params', {}).get('max_tokens', 1024)}
+    if model_config.get('prompt_cache'):
+        cache = {"type": "ephemeral"}
+        if system:
+            body["system"] = [{"type": "text", "text": system, "cache_control": cache}]
+        if len(messages) > 1:
+            last = messages[-2]
+            last["content"] = [{"type": "text", "text": last["content"], "cache_control": cache}]
+    elif system:
+        body["system"] = system
+    return body
+
+def _anthropic_usage(conversation: Conversation | None, usage: Dict[str, Any]):
+    if conversation is None or not usage:
+        return
+    cached = usage.get('cache_read_input_tokens') or 0
+    conversation.last_usage = {
+        "prompt_tokens": (usage.get('input_tokens') or 0) + cached + (usage.get('cache_creation_input_tokens') or 0),
+        "cached_tokens": cached,
+        "prompt_eval_sec": None,
+    }
+
+async def _call_anthropic(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None) -> str:
     """Minimal Anthropic messages API call (Claude)."""
     api_key = model_config.get('api_key')
     if not api_key:
         raise ValueError("Anthropic API key not configured")
     endpoint = (model_config.get('endpoint') or 'https://api.anthropic.com/v1').rstrip('/')
     url = f"{endpoint}/messages"
-    model = model_config.get('model', '')
-    identity = model_config.get('identity', '')
-    role = model_config.get('role', '')
-    system_prompt = f"{identity} {role}".strip()
-    # Anthropic uses top-level system plus messages array with user roles
     headers = {
         "x-api-key": api_key,
         "anthropic-version": "2023-06-01",
         "content-type": "application/json"
     }
-    messages = [{"role": "user", "content": prompt}]
-    body = {"model": model, "messages": messages, "max_tokens": model_config.get('params', {}).get('max_tokens', 1024)}
-    if system_prompt:
-        body["system"] = system_prompt
-    async with httpx.AsyncClient() as client:
+    body = _anthropic_body(model_config, prompt, conversation)
+    async with _provider_client(endpoint) as client:
         resp = await client.post(url, headers=headers, json=body, timeout=60.0)
         try:
             resp.raise_for_status()
         except httpx.HTTPStatusError as e:
-            raise ValueError(f"Anthropic API error {e.response.status_code}: {e.response.text}")
+            raise http_error("Anthropic API", e.response)
         data = resp.json()
+        _anthropic_usage(conversation, data.get('usage') or {})
         try:
             return ''.join(block.get('text', '') for block in data.get('content', [])) or str(data)
         except Exception:
             return str(data)
 
-async def _call_ollama(model_config: Dict[str, Any], prompt: str) -> str:
+def _ollama_generate_body(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None,
+                          stream: bool = False) -> Dict[str, Any]:
+    """``/api/generate`` body; a conversation sends only its new turn plus the ``context`` Ollama returned last."""
+    params = model_config.get('params', {})
+    if conversation is None:
+        system = system_prompt(model_config)
+        text = f"{system}\n\n{prompt}" if system else prompt
+    elif conversation.ollama_context is not None:
+        text = prompt
+    else:
+        text = "\n\n".join(part for part in [conversation.system, *(m['content'] for m in conversation.messages), prompt]
+                           if part)
+    body = {
+        "model": model_config.get('model', 'llama3.1:8b-instruct-q4_0'),
+        "prompt": text,
+        "stream": stream,
+        "options": {
+            "temperature": params.get('temperature', 0.2),
+            "top_p": params.get('top_p', 0.9),
+            "num_ctx": params.get('num_ctx', 4096)
+        }
+    }
+    if conversation is not None:
+        if conversation.ollama_context is not None:
+            body["context"] = conversation.ollama_context
+        if conversation.keep_alive:
+            body["keep_alive"] = conversation.keep_alive
+    return body
+
+def _ollama_usage(conversation: Conversation | None, data: Dict[str, Any], body: Dict[str, Any]):
+    """Keep the ``context`` and prompt-eval stats of a final Ollama response."""
+    if conversation is None:
+        return
+    if data.get('context') is not None:
+        conversation.ollama_context = data['context']
+    if 'prompt_eval_count' in data or 'prompt_eval_duration' in data:
+        # prompt_eval_count covers only the tokens evaluated; a resent context was not
+        cached = len(body.get('context') or [])
+        conversation.last_usage = {
+            "prompt_tokens": (data.get('prompt_eval_count') or 0) + cached,
+            "cached_tokens": cached,
+            "prompt_eval_sec": (data.get('prompt_eval_duration') or 0) / 1e9,
+        }
+
+async def _call_ollama(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None) -> str:
     """Call Ollama API (local or remote)."""
     endpoint = model_config.get('endpoint', 'http://localhost:11434')
     model = model_config.get('model', 'llama3.1:8b-instruct-q4_0')
@@ -191,22 +418,24 @@ async def _call_ollama(model_config: Dict[str, Any], prompt: str) -> str:
     if api_key_env:
         api_key = os.environ.get(api_key_env)
     
-    # Add identity and role to the prompt
-    identity = model_config.get('identity', '')
-    role = model_config.get('role', '')
-    system_prompt = f"{identity} {role}".strip()
-    
     # Check if this is a remote Ollama service (has API key and https endpoint)
     is_remote = api_key and endpoint.startswith('https')
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with _provider_client(endpoint) as client:
             if is_remote:
                 # Use chat format for remote Ollama service - try the correct endpoint
-                messages = []
-                if system_prompt:
-                    messages.append({"role": "system", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
+                body = {
+                    "model": model,
+                    "messages": _chat_messages(model_config, prompt, conversation),
+                    "stream": False,
+                    "options": {
+                        "temperature": params.get('temperature', 0.2),
+                        "num_ctx": params.get('num_ctx', 4096)
+                    }
+                }
+                if conversation is not None and conversation.keep_alive:
+                    body["keep_alive"] = conversation.keep_alive
                 
                 # Try the direct chat endpoint first
                 try:
@@ -216,48 +445,32 @@ async def _call_ollama(model_config: Dict[str, Any], prompt: str) -> str:
                             "Authorization": f"Bearer {api_key}",
                             "Content-Type": "application/json"
                         },
-                        json={
-                            "model": model,
-                            "messages": messages,
-                            "stream": False,
-                            "options": {
-                                "temperature": params.get('temperature', 0.2),
-                                "num_ctx": params.get('num_ctx', 4096)
-                            }
-                        },
+                        json=body,
                         timeout=120.0
                     )
                     response.raise_for_status()
                     data = response.json()
+                    _ollama_usage(conversation, data, body)
                     return data['message']['content']
                 except httpx.HTTPStatusError as e:
                     if e.response.status_code == 404:
                         # Fall back to generate endpoint for remote Ollama
-                        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
-                        
+                        body = _ollama_generate_body(model_config, prompt, conversation)
                         response = await client.post(
                             f"{endpoint}/api/generate",
                             headers={
                                 "Authorization": f"Bearer {api_key}",
                                 "Content-Type": "application/json"
                             },
-                            json={
-                                "model": model,
-                                "prompt": full_prompt,
-                                "stream": False,
-                                "options": {
-                                    "temperature": params.get('temperature', 0.2),
-                                    "top_p": params.get('top_p', 0.9),
-                                    "num_ctx": params.get('num_ctx', 4096)
-                                }
-                            },
+                            json=body,
                             timeout=120.0
                         )
                         response.raise_for_status()
                         data = response.json()
+                        _ollama_usage(conversation, data, body)
                         return data['response']
                     else:
-                        raise ValueError(f"Remote Ollama HTTP error {e.response.status_code}: {e.response.text}")
+                        raise http_error("Remote Ollama HTTP", e.response)
                 except httpx.ConnectError as e:
                     raise ValueError(f"Failed to connect to remote Ollama at {endpoint}. Please check the endpoint URL. Error: {str(e)}")
                 except httpx.TimeoutException as e:
@@ -266,7 +479,7 @@ async def _call_ollama(model_config: Dict[str, Any], prompt: str) -> str:
                     raise ValueError(f"Invalid response from remote Ollama server.")
             else:
                 # Use generate format for local Ollama
-                full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+                body = _ollama_generate_body(model_config, prompt, conversation)
                 
                 # Prepare headers
                 headers = {"Content-Type": "application/json"}
@@ -276,20 +489,12 @@ async def _call_ollama(model_config: Dict[str, Any], prompt: str) -> str:
                 response = await client.post(
                     f"{endpoint}/api/generate",
                     headers=headers,
-                    json={
-                        "model": model,
-                        "prompt": full_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": params.get('temperature', 0.2),
-                            "top_p": params.get('top_p', 0.9),
-                            "num_ctx": params.get('num_ctx', 4096)
-                        }
-                    },
+                    json=body,
                     timeout=120.0
                 )
                 response.raise_for_status()
                 data = response.json()
+                _ollama_usage(conversation, data, body)
                 return data['response']
     
     except httpx.ConnectError as e:
@@ -302,13 +507,15 @@ async def _call_ollama(model_config: Dict[str, Any], prompt: str) -> str:
         elif e.response.status_code == 500:
             raise ValueError(f"Ollama server error. The model '{model}' may not be compatible or loaded properly.")
         else:
-            raise ValueError(f"Ollama HTTP error {e.response.status_code}: {e.response.text}")
+            raise http_error("Ollama HTTP", e.response)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid response from Ollama server. Server may be starting up or misconfigured.")
+    except ValueError:
+        raise
     except Exception as e:
         raise ValueError(f"Unexpected error calling Ollama: {str(e)}")
 
-async def _call_nemotron(model_config: Dict[str, Any], prompt: str) -> str:
+async def _call_nemotron(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None) -> str:
     """Call Nemotron API."""
     api_key = model_config.get('api_key')
     if not api_key:
@@ -317,18 +524,9 @@ async def _call_nemotron(model_config: Dict[str, Any], prompt: str) -> str:
     endpoint = model_config.get('endpoint', 'https://api.nemotron.ai')
     model = model_config.get('model', 'nemotron-340b-instruct')
     params = model_config.get('params', {})
+    messages = _chat_messages(model_config, prompt, conversation)
     
-    # Add identity and role to the prompt
-    identity = model_config.get('identity', '')
-    role = model_config.get('role', '')
-    system_prompt = f"{identity} {role}".strip()
-    
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
-    
-    async with httpx.AsyncClient() as client:
+    async with _provider_client(endpoint) as client:
         response = await client.post(
             f"{endpoint}/api/chat",
             headers={
@@ -346,6 +544,309 @@ async def _call_nemotron(model_config: Dict[str, Any], prompt: str) -> str:
         data = response.json()
         return data['message']['content']
 
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+class _LatencyStats:
+    """Rolling time-to-first-token / total-time counters for one slot."""
+
+    def __init__(self):
+        self.streams = 0
+        self.errors = 0
+        self.cancelled = 0  # consumer left or the task was cancelled; not a provider error
+        self.completed = 0
+        self.ttft_count = 0
+        self.ttft_total = 0.0
+        self.ttft_min: Optional[float] = None
+        self.ttft_max = 0.0
+        self.ttft_last: Optional[float] = None
+        self.duration_total = 0.0
+        self.chunks = 0
+
+    def record_ttft(self, seconds: float):
+        self.ttft_count += 1
+        self.ttft_total += seconds
+        self.ttft_last = seconds
+        self.ttft_max = max(self.ttft_max, seconds)
+        self.ttft_min = seconds if self.ttft_min is None else min(self.ttft_min, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(v):
+            return round(v * 1000, 1) if v is not None else None
+
+        return {
+            'streams': self.streams,
+            'errors': self.errors,
+            'cancelled': self.cancelled,
+            'chunks': self.chunks,
+            'ttft_ms_avg': ms(self.ttft_total / self.ttft_count) if self.ttft_count else None,
+            'ttft_ms_min': ms(self.ttft_min),
+            'ttft_ms_max': ms(self.ttft_max) if self.ttft_min is not None else None,
+            'ttft_ms_last': ms(self.ttft_last),
+            'duration_ms_avg': ms(self.duration_total / self.completed) if self.completed else None,
+        }
+
+_stream_stats: Dict[str, _LatencyStats] = {}
+
+def get_stream_stats() -> Dict[str, Any]:
+    """Time-to-first-token statistics per slot."""
+    return {name: st.to_dict() for name, st in _stream_stats.items()}
+
+async def stream_slot(config, llm_name: str, prompt: str, *, db: BrainDB | None = None,
+                      memory: MemoryContextProvider | None = None,
+                      conversation: Conversation | None = None) -> AsyncIterator[str]:
+    """
+    Stream a slot's completion as text chunks as they arrive.
+
+    Same arguments as :func:`call_slot`. Providers without a streaming API
+    yield their whole completion as a single chunk. Time-to-first-token is
+    recorded per slot (see :func:`get_stream_stats`). A ``conversation``
+    gets the turn once the stream completes.
+    """
+    model_config, prompt = await _prepare_call(config, llm_name, prompt, db=db, memory=memory, conversation=conversation)
+    provider = model_config.get('provider', '').lower()
+    if provider not in OPENAI_COMPAT_PROVIDERS and provider not in NATIVE_PROVIDERS:
+        raise ValueError(f"Unknown provider '{provider}' for LLM '{llm_name}'")
+    chunks = _limited_stream(config, model_config, llm_name, prompt, conversation)
+    parts: List[str] = []
+
+    stats = _stream_stats.setdefault(llm_name, _LatencyStats())
+    stats.streams += 1
+    start = time.perf_counter()
+    first = True
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if first:
+                stats.record_ttft(time.perf_counter() - start)
+                first = False
+            stats.chunks += 1
+            if conversation is not None:
+                parts.append(chunk)
+            yield chunk
+    except Exception as e:
+        stats.errors += 1
+        _record_outcome(config, llm_name, start, e)
+        raise
+    except BaseException:
+        # GeneratorExit (the consumer went away) or cancellation
+        stats.cancelled += 1
+        raise
+    else:
+        _record_outcome(config, llm_name, start)
+        stats.completed += 1
+        stats.duration_total += time.perf_counter() - start
+        if first:  # completed without producing any text
+            stats.record_ttft(time.perf_counter() - start)
+        if conversation is not None:
+            conversation.commit(prompt, "".join(parts))
+
+def _open_stream(model_config: Dict[str, Any], llm_name: str, prompt: str,
+                 conversation: Conversation | None = None) -> AsyncIterator[str]:
+    provider = model_config.get('provider', '').lower()
+    if conversation is not None:
+        conversation.last_usage = {}
+    if provider in OPENAI_COMPAT_PROVIDERS:
+        return _stream_openai_compatible(model_config, prompt, conversation)
+    elif provider == 'model':
+        return _stream_openai_compatible(
+            {**model_config, 'endpoint': model_config.get('endpoint', 'https://api.model.com/v1')}, prompt, conversation)
+    elif provider == 'ollama':
+        return _stream_ollama(model_config, prompt, conversation)
+    elif provider == 'anthropic':
+        return _stream_anthropic(model_config, prompt, conversation)
+    elif provider == 'nemotron':
+        return _single_chunk(_call_nemotron(model_config, prompt, conversation))
+    elif provider == 'mock':
+        if conversation is not None:
+            conversation.last_usage = prompt_usage(model_config, prompt, conversation.tokens())
+        return stream_mock(model_config, llm_name, prompt)
+    else:
+        raise ValueError(f"Unknown provider '{provider}' for LLM '{llm_name}'")
+
+async def _limited_stream(config, model_config: Dict[str, Any], llm_name: str, prompt: str,
+                          conversation: Conversation | None = None) -> AsyncIterator[str]:
+    """Stream under the endpoint's rate limiter; throttling is retried only before the first chunk."""
+    limiter = get_rate_limiter(config, model_config)
+    if limiter is None:
+        async for chunk in _open_stream(model_config, llm_name, prompt, conversation):
+            yield chunk
+        return
+    tokens = estimate_tokens(prompt) + (conversation.tokens() if conversation is not None else 0)
+    attempt = 0
+    while True:
+        await limiter.acquire(tokens)
+        produced = 0
+        try:
+            async for chunk in _open_stream(model_config, llm_name, prompt, conversation):
+                produced += len(chunk)
+                yield chunk
+        except Exception as e:
+            info = throttle_info(e)
+            await limiter.release(throttled=info is not None, retry_after=info[1] if info else None)
+            if info is None or produced:
+                raise
+            if attempt >= int(limiter.settings['max_retries']):
+                limiter.counters['gave_up'] += 1
+                raise
+            limiter.counters['retries'] += 1
+            await asyncio.sleep(limiter.backoff(attempt, info[1]))
+            attempt += 1
+        except BaseException:
+            await limiter.release()
+            raise
+        else:
+            await limiter.release(extra_tokens=produced // 4)
+            return
+
+async def _single_chunk(awaitable) -> AsyncIterator[str]:
+    yield await awaitable
+
+def _chat_messages(model_config: Dict[str, Any], prompt: str, conversation: Conversation | None = None) -> list:
+    if conversation is not None:
+        return conversation.messages_for(prompt)
+    system = system_prompt(model_config)
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+async def _raise_for_stream_status(resp: httpx.Response, label: str):
+    if resp.status_code >= 400:
+        await resp.aread()
+        raise http_error(label, resp)
+
+async def _stream_openai_compatible(model_config: Dict[str, Any], prompt: str,
+                                    conversation: Conversation | None = None) -> AsyncIterator[str]:
+    """OpenAI-compatible server-sent events (``data: {...}`` / ``data: [DONE]``)."""
+    api_key = model_config.get('api_key')
+    if not api_key:
+        raise ValueError("API key not configured")
+    endpoint = (model_config.get('endpoint') or 'https://api.openai.com/v1').rstrip('/')
+    model = model_config.get('model', '')
+    if not model:
+        raise ValueError("Model not specified")
+    params = model_config.get('params', {})
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    body = {
+        "model": model,
+        "messages": _chat_messages(model_config, prompt, conversation),
+        "temperature": params.get('temperature', 0.7),
+        "max_tokens": params.get('max_tokens', 2000),
+        "stream": True,
+    }
+    if conversation is not None and model_config.get('prompt_cache'):
+        body["prompt_cache_key"] = conversation.key
+    async with _provider_client(endpoint) as client:
+        async with client.stream("POST", f"{endpoint}/chat/completions", headers=headers,
+                                 json=body, timeout=60.0) as resp:
+            await _raise_for_stream_status(resp, "OpenAI-compatible API")
+            async for line in resp.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    delta = json.loads(data)['choices'][0].get('delta', {})
+                except (json.JSONDecodeError, KeyError, IndexError):
+                    continue
+                if delta.get('content'):
+                    yield delta['content']
+
+async def _stream_anthropic(model_config: Dict[str, Any], prompt: str,
+                            conversation: Conversation | None = None) -> AsyncIterator[str]:
+    """Anthropic messages streaming (``content_block_delta`` text deltas)."""
+    api_key = model_config.get('api_key')
+    if not api_key:
+        raise ValueError("Anthropic API key not configured")
+    endpoint = (model_config.get('endpoint') or 'https://api.anthropic.com/v1').rstrip('/')
+    headers = {
+        "x-api-key": api_key,
+        "anthropic-version": "2023-06-01",
+        "content-type": "application/json"
+    }
+    body = {**_anthropic_body(model_config, prompt, conversation), "stream": True}
+    async with _provider_client(endpoint) as client:
+        async with client.stream("POST", f"{endpoint}/messages", headers=headers,
+                                 json=body, timeout=60.0) as resp:
+            await _raise_for_stream_status(resp, "Anthropic API")
+            async for line in resp.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                try:
+                    event = json.loads(line[5:].strip())
+                except json.JSONDecodeError:
+                    continue
+                if event.get('type') == 'message_start':
+                    _anthropic_usage(conversation, event.get('message', {}).get('usage') or {})
+                elif event.get('type') == 'content_block_delta':
+                    text = event.get('delta', {}).get('text')
+                    if text:
+                        yield text
+                elif event.get('type') == 'message_stop':
+                    break
+                elif event.get('type') == 'error':
+                    raise ValueError(f"Anthropic stream error: {event.get('error')}")
+
+async def _stream_ollama(model_config: Dict[str, Any], prompt: str,
+                         conversation: Conversation | None = None) -> AsyncIterator[str]:
+    """Ollama NDJSON streaming: ``/api/chat`` for remote services, ``/api/generate`` locally."""
+    endpoint = model_config.get('endpoint', 'http://localhost:11434')
+    model = model_config.get('model', 'llama3.1:8b-instruct-q4_0')
+    params = model_config.get('params', {})
+    if not model or model.strip() == "":
+        raise ValueError(f"No model specified for Ollama. Please set the 'model' field in configuration.")
+    api_key = None
+    api_key_env = model_config.get('api_key_env')
+    if api_key_env:
+        api_key = os.environ.get(api_key_env)
+    is_remote = api_key and endpoint.startswith('https')
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    if is_remote:
+        url = f"{endpoint}/api/chat"
+        body = {"model": model, "messages": _chat_messages(model_config, prompt, conversation),
+                "stream": True, "options": {
+                    "temperature": params.get('temperature', 0.2),
+                    "top_p": params.get('top_p', 0.9),
+                    "num_ctx": params.get('num_ctx', 4096)
+                }}
+        if conversation is not None and conversation.keep_alive:
+            body["keep_alive"] = conversation.keep_alive
+    else:
+        url = f"{endpoint}/api/generate"
+        body = _ollama_generate_body(model_config, prompt, conversation, stream=True)
+    try:
+        async with _provider_client(endpoint) as client:
+            async with client.stream("POST", url, headers=headers, json=body, timeout=120.0) as resp:
+                if resp.status_code == 404:
+                    raise ValueError(f"Model '{model}' not found in Ollama. Please run 'ollama pull {model}' to download it.")
+                await _raise_for_stream_status(resp, "Ollama HTTP")
+                async for line in resp.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if data.get('error'):
+                        raise ValueError(f"Ollama stream error: {data['error']}")
+                    text = data.get('message', {}).get('content') if is_remote else data.get('response')
+                    if text:
+                        yield text
+                    if data.get('done'):
+                        _ollama_usage(conversation, data, body)
+                        break
+    except httpx.ConnectError as e:
+        raise ValueError(f"Failed to connect to Ollama at {endpoint}. Please ensure Ollama is running and accessible. Error: {str(e)}")
+    except httpx.TimeoutException as e:
+        raise ValueError(f"Ollama request timed out after 120 seconds. The model '{model}' may be loading for the first time. Error: {str(e)}")
+
 # Test function for development
 async def test_llm_call():
     """Test function for development."""
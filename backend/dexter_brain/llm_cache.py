@@ -0,0 +1,330 @@
+"""
+Two-tier LLM response cache.
+
+An in-memory LRU sits in front of a SQLite table so repeated prompts (healing
+the same error type, the same skill-generation template, ...) skip the LLM
+round trip. Entries expire by TTL and both tiers are size-bounded. From async
+callers (``get_or_call``) the SQLite tier is used off the event loop. Concurrent
+identical requests wait on a per-key lock, so only one of them reaches the
+provider and the rest are served from the freshly stored entry.
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_SETTINGS: Dict[str, Any] = {
+    'enabled': True,
+    'db_path': None,  # defaults to runtime.db_path
+    'ttl_sec': 3600,
+    'memory_max_entries': 256,
+    'memory_max_bytes': 16 * 1024 * 1024,
+    'disk_max_entries': 5000,
+}
+
+
+def request_key(llm_name: str, model_config: Dict[str, Any], prompt: str) -> str:
+    """Stable hash of everything that determines a slot's completion."""
+    material = {
+        'slot': llm_name,
+        'provider': (model_config.get('provider') or '').lower(),
+        'model': model_config.get('model', ''),
+        'endpoint': model_config.get('endpoint', ''),
+        'params': model_config.get('params', {}),
+        'system': f"{model_config.get('identity', '')} {model_config.get('role', '')}".strip(),
+        'prompt_sha256': hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+    }
+    blob = json.dumps(material, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU backed by a SQLite table, both bounded and TTL-expired."""
+
+    def __init__(self, db_path: Optional[str], *, ttl_sec: float = 3600,
+                 memory_max_entries: int = 256, memory_max_bytes: int = 16 * 1024 * 1024,
+                 disk_max_entries: int = 5000):
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self.memory_max_entries = memory_max_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_entries = disk_max_entries
+        self._memory: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}  # callers holding or waiting on each key's lock
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._puts_since_trim = 0
+        self.counters: Dict[str, int] = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'waited_hits': 0,
+            'stores': 0,
+            'bypassed': 0,
+            'expired': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'disk_errors': 0,
+        }
+
+    # -- storage ------------------------------------------------------------
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self.db_path:
+            return None
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                key TEXT PRIMARY KEY,
+                slot TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_ts REAL NOT NULL,
+                expires_ts REAL NOT NULL,
+                hits INTEGER DEFAULT 0
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_response_cache(expires_ts)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _memory_put(self, key: str, value: str, expires_ts: float):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[0])
+        self._memory[key] = (value, expires_ts)
+        self._memory_bytes += len(value)
+        while self._memory and (len(self._memory) > self.memory_max_entries
+                                or self._memory_bytes > self.memory_max_bytes):
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.counters['memory_evictions'] += 1
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        value, expires_ts = entry
+        if expires_ts > now:
+            self._memory.move_to_end(key)
+            self.counters['memory_hits'] += 1
+            return value
+        self._memory.pop(key, None)
+        self._memory_bytes -= len(value)
+        self.counters['expired'] += 1
+        return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        """``(response, expires_ts)`` from the SQLite tier (blocking)."""
+        try:
+            with self._db_lock:
+                conn = self._db()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT response, expires_ts FROM llm_response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    self.counters['expired'] += 1
+                    return None
+                conn.execute("UPDATE llm_response_cache SET hits = hits + 1 WHERE key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error:
+            self.counters['disk_errors'] += 1
+            return None
+        self.counters['disk_hits'] += 1
+        return row[0], row[1]
+
+    def _disk_put(self, key: str, slot: str, value: str, now: float, expires_ts: float):
+        """Store a row in the SQLite tier (blocking)."""
+        try:
+            with self._db_lock:
+                conn = self._db()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache (key, slot, response, created_ts, expires_ts) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, slot, value, now, expires_ts),
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= 50:
+                    self._trim(conn, now)
+                conn.commit()
+        except sqlite3.Error:
+            self.counters['disk_errors'] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Look a key up in memory, then on disk (promoting disk hits). Blocking on a memory miss."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None or not self.db_path:
+            return value
+        row = self._disk_get(key, now)
+        if row is None:
+            return None
+        self._memory_put(key, *row)
+        return row[0]
+
+    async def aget(self, key: str) -> Optional[str]:
+        """``get`` with the SQLite lookup run in a worker thread."""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None or not self.db_path:
+            return value
+        row = await asyncio.to_thread(self._disk_get, key, now)
+        if row is None:
+            return None
+        self._memory_put(key, *row)
+        return row[0]
+
+    def _expiry(self, ttl_sec: Optional[float]) -> Tuple[float, float]:
+        now = time.time()
+        return now, now + (self.ttl_sec if ttl_sec is None else ttl_sec)
+
+    def put(self, key: str, slot: str, value: str, ttl_sec: Optional[float] = None):
+        now, expires_ts = self._expiry(ttl_sec)
+        self._memory_put(key, value, expires_ts)
+        self.counters['stores'] += 1
+        if self.db_path:
+            self._disk_put(key, slot, value, now, expires_ts)
+
+    async def aput(self, key: str, slot: str, value: str, ttl_sec: Optional[float] = None):
+        """``put`` with the SQLite write run in a worker thread."""
+        now, expires_ts = self._expiry(ttl_sec)
+        self._memory_put(key, value, expires_ts)
+        self.counters['stores'] += 1
+        if self.db_path:
+            await asyncio.to_thread(self._disk_put, key, slot, value, now, expires_ts)
+
+    def _trim(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then the oldest rows beyond ``disk_max_entries``."""
+        self._puts_since_trim = 0
+        cur = conn.execute("DELETE FROM llm_response_cache WHERE expires_ts <= ?", (now,))
+        self.counters['expired'] += max(cur.rowcount, 0)
+        count = conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+        excess = count - self.disk_max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE key IN "
+                "(SELECT key FROM llm_response_cache ORDER BY created_ts ASC LIMIT ?)",
+                (excess,),
+            )
+            self.counters['disk_evictions'] += excess
+
+    # -- async front door ---------------------------------------------------
+
+    async def get_or_call(self, key: str, slot: str, call: Callable[[], Awaitable[str]],
+                          ttl_sec: Optional[float] = None) -> str:
+        """Return the cached response for ``key`` or compute, store and return it.
+
+        Memory hits are served inline; the SQLite tier is read and written in a worker thread.
+        """
+        value = await self.aget(key)
+        if value is not None:
+            return value
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                # Someone holding the lock before us may have just stored it
+                value = await self.aget(key)
+                if value is not None:
+                    self.counters['waited_hits'] += 1
+                    return value
+                self.counters['misses'] += 1
+                value = await call()
+                await self.aput(key, slot, value, ttl_sec)
+                return value
+        finally:
+            # Drop the lock only once its last user is done, so later callers share it
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                self._locks.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+        hits = lookups - self.counters['misses']
+        return {
+            **self.counters,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'db_path': self.db_path,
+        }
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_bytes = 0
+        try:
+            with self._db_lock:
+                conn = self._db()
+                if conn is not None:
+                    conn.execute("DELETE FROM llm_response_cache")
+                    conn.commit()
+        except sqlite3.Error:
+            self.counters['disk_errors'] += 1
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_caches: Dict[Optional[str], ResponseCache] = {}
+
+
+def cache_settings(config) -> Dict[str, Any]:
+    rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+    rt = rt if isinstance(rt, dict) else {}
+    settings = {**DEFAULT_CACHE_SETTINGS, **rt.get('llm_cache', {})}
+    if not settings.get('db_path'):
+        settings['db_path'] = rt.get('db_path')
+    return settings
+
+
+def get_response_cache(config) -> Optional[ResponseCache]:
+    """Shared cache for this config's storage path, or None if disabled."""
+    settings = cache_settings(config)
+    if not settings.get('enabled', True):
+        return None
+    db_path = settings['db_path']
+    if db_path == ':memory:':
+        db_path = None  # a private :memory: connection could not be shared anyway
+    cache = _caches.get(db_path)
+    if cache is None:
+        cache = _caches[db_path] = ResponseCache(
+            db_path,
+            ttl_sec=float(settings['ttl_sec']),
+            memory_max_entries=int(settings['memory_max_entries']),
+            memory_max_bytes=int(settings['memory_max_bytes']),
+            disk_max_entries=int(settings['disk_max_entries']),
+        )
+    return cache
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    return {str(path): cache.stats() for path, cache in _caches.items()}
+
+
+def close_response_caches():
+    for cache in list(_caches.values()):
+        cache.close()
+    _caches.clear()
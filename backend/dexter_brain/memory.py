@@ -1,6 +1,11 @@
 from __future__ import annotations
+import re
+import sqlite3
+import threading
+import time
 from collections import deque
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 from .db import BrainDB
 
@@ -42,3 +47,184 @@ class MemoryManager:
         if limit <= 0:
             return []
         return list(self.stm)[-limit:]
+
+
+_FTS_TERM_RE = re.compile(r"\w{3,}", re.UNICODE)
+
+
+def _fts_query(text: str, max_terms: int = 16) -> str:
+    """Turn free text into a safe FTS5 OR-query of quoted terms."""
+    seen: List[str] = []
+    for term in _FTS_TERM_RE.findall(text.lower()):
+        if term not in seen:
+            seen.append(term)
+            if len(seen) >= max_terms:
+                break
+    return " OR ".join(f'"{t}"' for t in seen)
+
+
+class MemoryContextProvider:
+    """Shared, read-only memory lookup used to prefix LLM prompts with context.
+
+    Holds a small pool of read-only SQLite connections so ``call_slot`` pays a
+    single indexed FTS query per call instead of opening a ``BrainDB`` (and
+    re-running its schema DDL) every time.
+    """
+
+    def __init__(self, db_path: str, enable_fts: bool = True,
+                 pool_size: int = 2, limit: int = 5):
+        self.db_path = db_path
+        self.enable_fts = enable_fts
+        self.pool_size = max(1, pool_size)
+        self.limit = limit
+        self._idle: List[sqlite3.Connection] = []
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._ready = False
+        self.lookups = 0
+        self.errors = 0
+        self.total_sec = 0.0
+
+    @classmethod
+    def from_config(cls, config) -> Optional['MemoryContextProvider']:
+        rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+        if not isinstance(rt, dict) or rt.get('db_path') in (None, '', ':memory:'):
+            return None
+        mc = rt.get('memory_context', {})
+        if not mc.get('enabled', True):
+            return None
+        return cls(
+            rt['db_path'],
+            enable_fts=rt.get('enable_fts', True),
+            pool_size=mc.get('pool_size', 2),
+            limit=mc.get('limit', 5),
+        )
+
+    def _prepare(self):
+        """Run the BrainDB schema DDL once per process, not once per lookup."""
+        if self._ready:
+            return
+        with self._lock:
+            if not self._ready:
+                BrainDB(db_path=self.db_path, enable_fts=self.enable_fts).close()
+                self._ready = True
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        if self.enable_fts:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'"
+            ).fetchone()
+            if row is None:
+                self.enable_fts = False
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._available:
+            while not self._idle and self._opened >= self.pool_size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+        try:
+            return self._connect()
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._available:
+            self._idle.append(conn)
+            self._available.notify()
+
+    def search(self, prompt: str, limit: Optional[int] = None) -> List[str]:
+        """Return memory contents relevant to ``prompt`` (best match first)."""
+        limit = self.limit if limit is None else limit
+        self._prepare()
+        conn = self._acquire()
+        try:
+            if self.enable_fts:
+                query = _fts_query(prompt)
+                if not query:
+                    return []
+                rows = conn.execute(
+                    """
+                    SELECT memories.content FROM memories_fts
+                    JOIN memories ON memories.id = memories_fts.rowid
+                    WHERE memories_fts MATCH ?
+                    ORDER BY rank LIMIT ?
+                    """,
+                    (query, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    """
+                    SELECT content FROM memories
+                    WHERE content LIKE ? OR tags LIKE ?
+                    ORDER BY accessed_ts DESC LIMIT ?
+                    """,
+                    (f"%{prompt}%", f"%{prompt}%", limit),
+                ).fetchall()
+        finally:
+            self._release(conn)
+        return [r[0] for r in rows if r[0]]
+
+    def context_for(self, prompt: str, limit: Optional[int] = None) -> str:
+        """Newline-joined memory context for ``prompt``; empty on any failure."""
+        start = time.perf_counter()
+        try:
+            return "\n".join(self.search(prompt, limit))
+        except Exception:
+            self.errors += 1
+            return ""
+        finally:
+            self.lookups += 1
+            self.total_sec += time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'db_path': self.db_path,
+            'fts': self.enable_fts,
+            'pool_size': self.pool_size,
+            'open_connections': self._opened,
+            'lookups': self.lookups,
+            'errors': self.errors,
+            'avg_ms': round(self.total_sec * 1000 / self.lookups, 3) if self.lookups else 0.0,
+        }
+
+    def close(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+_context_providers: Dict[Tuple[str, bool], MemoryContextProvider] = {}
+
+
+def get_memory_context_provider(config) -> Optional[MemoryContextProvider]:
+    """Return the shared provider for ``config.runtime.db_path`` (or None)."""
+    candidate = MemoryContextProvider.from_config(config)
+    if candidate is None:
+        return None
+    key = (candidate.db_path, candidate.enable_fts)
+    provider = _context_providers.get(key)
+    if provider is None:
+        provider = _context_providers[key] = candidate
+    return provider
+
+
+def close_memory_context_providers():
+    """Close every shared provider (called from app lifespan)."""
+    for provider in list(_context_providers.values()):
+        provider.close()
+    _context_providers.clear()
@@ -0,0 +1,195 @@
+"""
+Deterministic, latency-simulating "mock" LLM provider.
+
+Lets the collaboration, voting, sandbox and autonomy pipeline be load-tested
+offline. Every response is derived from (seed, slot, prompt), so runs are
+reproducible. Configure per slot under ``models.<name>.mock``::
+
+    "mock": {
+        "seed": 0,
+        "latency": {"distribution": "fixed" | "normal" | "longtail",
+                    "mean_ms": 50, "stddev_ms": 10, "sigma": 1.0},
+        "tokens_per_sec": 0,          # 0 = emit the whole reply at once
+        "prompt_tokens_per_sec": 0,   # prompt processing rate; 0 = free
+        "error_rate": 0.0,            # fraction of calls that raise
+        "throttle_rate": 0.0,         # fraction of calls answered with HTTP 429
+        "retry_after": null,          # Retry-After seconds sent with those 429s
+        "vote_for": "analyst",        # otherwise picks among listed solutions
+        "responses": {"proposal": "...", "refinement": "...", "vote": "..."}
+    }
+
+Response templates may use ``{slot}``, ``{vote}`` and ``{request}``; other braces
+are kept as written.
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import math
+import random
+import re
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+try:
+    from .rate_limit import ProviderHTTPError, estimate_tokens
+except ImportError:  # pragma: no cover
+    from rate_limit import ProviderHTTPError, estimate_tokens
+
+DEFAULT_RESPONSES: Dict[str, str] = {
+    'proposal': (
+        "Analysis: {slot} reviewed the request: {request}\n"
+        "Approach: Provide a small, self-contained skill.\n"
+        "Implementation:\n"
+        "```python\n"
+        "def run(message: str) -> dict:\n"
+        "    return {\"success\": True, \"result\": \"handled by {slot}\", \"message\": message}\n"
+        "```\n"
+    ),
+    'refinement': (
+        "Refined by {slot} after reviewing peer proposals.\n"
+        "```python\n"
+        "def run(message: str) -> dict:\n"
+        "    return {\"success\": True, \"result\": \"refined by {slot}\", \"message\": message}\n"
+        "```\n"
+    ),
+    'vote': "VOTE: {vote}",
+    'chat': "[{slot}] mock reply to: {request}",
+}
+
+_SOLUTION_HEADER_RE = re.compile(r"^=== (\w+) ===$", re.MULTILINE)
+_REQUEST_RE = re.compile(r"(?:User request|Request):\s*(.+)")
+
+
+class MockProviderError(ValueError):
+    """Raised when a mock call hits its configured error injection rate."""
+
+
+# Calls per (slot, prompt digest), so throttling varies between retries of one
+# prompt but does not depend on what other prompts or slots ran before. Only
+# the most recently retried prompts are remembered.
+MAX_TRACKED_PROMPTS = 1024
+_attempts: 'OrderedDict[Tuple[str, bytes], int]' = OrderedDict()
+
+
+def reset_attempts():
+    """Forget retry counts, so the next run sees the same throttling again."""
+    _attempts.clear()
+
+
+def _rng(settings: Dict[str, Any], llm_name: str, prompt: str) -> random.Random:
+    material = f"{settings.get('seed', 0)}|{llm_name}|{prompt}".encode('utf-8')
+    return random.Random(int.from_bytes(hashlib.sha256(material).digest()[:8], 'big'))
+
+
+def detect_phase(prompt: str) -> str:
+    """Guess the collaboration phase from the prompt wording."""
+    if 'VOTE:' in prompt:
+        return 'vote'
+    if 'Peer proposals:' in prompt:
+        return 'refinement'
+    if 'initial proposal' in prompt or 'Collaboration Session ID' in prompt:
+        return 'proposal'
+    return 'chat'
+
+
+def sample_latency(settings: Dict[str, Any], rng: random.Random, prompt: str = '') -> float:
+    """Seconds of simulated latency before the first token (including prompt processing)."""
+    lat = settings.get('latency', {})
+    mean = float(lat.get('mean_ms', 50)) / 1000.0
+    dist = lat.get('distribution', 'fixed')
+    if dist == 'normal':
+        value = rng.gauss(mean, float(lat.get('stddev_ms', mean * 1000 * 0.2)) / 1000.0)
+    elif dist == 'longtail':
+        # Log-normal with the configured mean as its median
+        value = rng.lognormvariate(math.log(max(mean, 1e-6)), float(lat.get('sigma', 1.0)))
+    else:
+        value = mean
+    pps = float(settings.get('prompt_tokens_per_sec', 0) or 0)
+    if pps > 0:
+        value += estimate_tokens(prompt) / pps
+    return max(0.0, value)
+
+
+def prompt_usage(model_config: Dict[str, Any], prompt: str, cached_tokens: int = 0) -> Dict[str, Any]:
+    """Prompt usage a prefix-caching server reports for ``prompt`` sent after ``cached_tokens`` of history."""
+    pps = float(_settings(model_config).get('prompt_tokens_per_sec', 0) or 0)
+    tokens = estimate_tokens(prompt)
+    return {"prompt_tokens": tokens + cached_tokens, "cached_tokens": cached_tokens,
+            "prompt_eval_sec": tokens / pps if pps > 0 else 0.0}
+
+
+def render_response(settings: Dict[str, Any], llm_name: str, prompt: str, rng: random.Random) -> str:
+    phase = detect_phase(prompt)
+    scripted = {**DEFAULT_RESPONSES, **settings.get('responses', {})}
+    template = scripted.get(phase, scripted['chat'])
+    if isinstance(template, list):
+        template = rng.choice(template) if template else ''
+    candidates: List[str] = _SOLUTION_HEADER_RE.findall(prompt)
+    vote = settings.get('vote_for') or (rng.choice(sorted(candidates)) if candidates else llm_name)
+    match = _REQUEST_RE.search(prompt)
+    if match:
+        request = match.group(1)
+    else:
+        lines = prompt.strip().splitlines()
+        request = lines[-1] if lines else ''
+    request = request[:120]
+    # Plain substitution: scripted replies are often code or JSON with literal braces
+    for name, value in (('slot', llm_name), ('vote', vote), ('request', request)):
+        template = template.replace('{' + name + '}', value)
+    return template
+
+
+def _settings(model_config: Dict[str, Any]) -> Dict[str, Any]:
+    settings = model_config.get('mock')
+    return settings if isinstance(settings, dict) else {}
+
+
+def _maybe_fail(settings: Dict[str, Any], llm_name: str, prompt: str, rng: random.Random):
+    if rng.random() < float(settings.get('error_rate', 0.0)):
+        raise MockProviderError(f"Mock provider injected error for '{llm_name}'")
+    throttle_rate = float(settings.get('throttle_rate', 0.0))
+    if throttle_rate > 0:
+        key = (llm_name, hashlib.sha256(prompt.encode('utf-8')).digest()[:16])
+        attempt = _attempts[key] = _attempts.pop(key, -1) + 1
+        while len(_attempts) > MAX_TRACKED_PROMPTS:
+            _attempts.popitem(last=False)
+        if _rng(settings, llm_name, f"{prompt}|{attempt}").random() < throttle_rate:
+            retry_after = settings.get('retry_after')
+            raise ProviderHTTPError(f"Mock provider error 429: '{llm_name}' throttled", 429,
+                                    None if retry_after is None else float(retry_after))
+
+
+def _chunks(text: str) -> List[str]:
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+async def call_mock(model_config: Dict[str, Any], llm_name: str, prompt: str) -> str:
+    """Non-streaming mock completion: waits latency plus generation time."""
+    settings = _settings(model_config)
+    rng = _rng(settings, llm_name, prompt)
+    delay = sample_latency(settings, rng, prompt)
+    _maybe_fail(settings, llm_name, prompt, rng)
+    text = render_response(settings, llm_name, prompt, rng)
+    tps = float(settings.get('tokens_per_sec', 0) or 0)
+    if tps > 0:
+        delay += len(_chunks(text)) / tps
+    await asyncio.sleep(delay)
+    return text
+
+
+async def stream_mock(model_config: Dict[str, Any], llm_name: str, prompt: str) -> AsyncIterator[str]:
+    """Streaming mock completion: first chunk after latency, then ``tokens_per_sec``."""
+    settings = _settings(model_config)
+    rng = _rng(settings, llm_name, prompt)
+    await asyncio.sleep(sample_latency(settings, rng, prompt))
+    _maybe_fail(settings, llm_name, prompt, rng)
+    text = render_response(settings, llm_name, prompt, rng)
+    tps = float(settings.get('tokens_per_sec', 0) or 0)
+    if tps <= 0:
+        yield text
+        return
+    for i, chunk in enumerate(_chunks(text)):
+        if i:
+            await asyncio.sleep(1.0 / tps)
+        yield chunk
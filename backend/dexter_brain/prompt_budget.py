@@ -0,0 +1,147 @@
+"""
+Context budgets for collaboration prompts.
+
+Refinement and voting prompts embed every peer's output, so prompt size grows
+with the square of the number of slots. ``prompt_tokens_for`` works out how
+many prompt tokens a slot can take: its context window (``params.num_ctx``,
+or ``context_window``) minus the tokens reserved for the answer
+(``params.max_tokens`` / ``num_predict``) and a safety margin. ``digest``
+shrinks a peer's text to a token budget by keeping the head of every section
+(and of every code block) rather than cutting the tail off.
+
+Digests are cached per session by ``DigestCache``, keyed by the text and a
+bucketed budget, so each peer is condensed once rather than once per reader.
+"""
+
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Tuple
+
+try:
+    from .rate_limit import estimate_tokens
+except ImportError:  # pragma: no cover
+    from rate_limit import estimate_tokens
+
+DEFAULT_PROMPT_BUDGET: Dict[str, Any] = {
+    'enabled': True,
+    'default_context_tokens': 8192,
+    'default_output_tokens': 1024,
+    'safety_margin': 0.1,
+    'min_digest_tokens': 64,
+    'bucket_tokens': 128,
+}
+
+# Markdown headings, "**Bold:**" lines and "Label:" lines start a new section
+_SECTION_RE = re.compile(r"^(#{1,6}\s|\*\*[^*\n]{1,60}\*\*:?\s*$|[A-Z][A-Za-z_ ]{1,40}:)")
+_TRUNCATED = "\n…[truncated]"
+# Joining and marking a section as cut costs ~8 chars; a kept section should also show a useful head
+_SECTION_OVERHEAD = 8
+_MIN_SECTION_CHARS = 40
+
+
+def prompt_tokens_for(model_config: Dict[str, Any], settings: Dict[str, Any] | None = None) -> int:
+    """Prompt tokens a slot can accept, after reserving room for its answer."""
+    settings = {**DEFAULT_PROMPT_BUDGET, **(settings or {})}
+    params = model_config.get('params', {}) or {}
+    window = int(model_config.get('context_window') or params.get('num_ctx') or settings['default_context_tokens'])
+    output = int(params.get('max_tokens') or params.get('num_predict') or settings['default_output_tokens'])
+    output = min(output, window // 2)
+    return max(0, int((window - output) * (1 - float(settings['safety_margin']))))
+
+
+def _allot(sizes: List[int], budget: int) -> List[int]:
+    """Split ``budget`` across items: those under an even share keep their size, the rest share what is left."""
+    allot = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for i, idx in enumerate(order):
+        allot[idx] = min(sizes[idx], remaining // (len(order) - i))
+        remaining -= allot[idx]
+    return allot
+
+
+def _sections(text: str) -> List[str]:
+    sections: List[List[str]] = [[]]
+    in_code = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            if not in_code:
+                sections.append([])  # a code block is its own section
+            sections[-1].append(line)
+            in_code = not in_code
+            if not in_code:
+                sections.append([])
+            continue
+        if not in_code and _SECTION_RE.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return ["\n".join(s) for s in sections if any(l.strip() for l in s)]
+
+
+def _head(section: str, chars: int) -> str:
+    head = section[:chars]
+    cut = max(head.rfind("\n"), head.rfind(" "))
+    if cut > chars // 2:
+        head = head[:cut]
+    if head.lstrip().startswith("```"):
+        head += "\n```"
+    return head + " …"
+
+
+def digest(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """``text`` cut down to about ``max_tokens``; returns (digest, truncated)."""
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+    max_chars = max(16, max_tokens * 4 - len(_TRUNCATED))
+    # Keep the head of every section that fits, with the budget spread so short sections survive whole
+    sections = _sections(text)[:max_chars // _MIN_SECTION_CHARS]
+    if len(sections) < 2:
+        return text[:max_chars] + _TRUNCATED, True
+    allot = _allot([len(sec) for sec in sections], max_chars - _SECTION_OVERHEAD * len(sections))
+    condensed = "\n".join(sec if n >= len(sec) else _head(sec, n)
+                           for sec, n in zip(sections, allot) if n > 0)
+    return condensed[:max_chars] + _TRUNCATED, True
+
+
+class DigestCache:
+    """Peer digests for one session."""
+
+    def __init__(self, settings: Dict[str, Any] | None = None):
+        self.settings = {**DEFAULT_PROMPT_BUDGET, **(settings or {})}
+        self._digests: Dict[Tuple[str, int, int], Tuple[str, bool]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def bucket(self, tokens: int) -> int:
+        """Round a budget down so readers with similar windows share digests."""
+        floor = int(self.settings['min_digest_tokens'])
+        step = int(self.settings['bucket_tokens'])
+        return max(floor, tokens // step * step)
+
+    def fit(self, texts: Dict[str, str], available_tokens: int) -> Tuple[Dict[str, str], int]:
+        """Digest ``texts`` (name -> text) to share ``available_tokens``; returns (texts, truncated count).
+
+        Texts smaller than an even share are kept whole and their unused share
+        goes to the larger ones.
+        """
+        names = list(texts)
+        sizes = [estimate_tokens(texts[name]) for name in names]
+        if sum(sizes) <= available_tokens:
+            return dict(texts), 0
+        fitted: Dict[str, str] = {}
+        truncated = 0
+        for name, size, share in zip(names, sizes, _allot(sizes, available_tokens)):
+            if size <= share:
+                fitted[name] = texts[name]
+                continue
+            per_text = self.bucket(share)
+            key = (name, hash(texts[name]), per_text)
+            cached = self._digests.get(key)
+            if cached is None:
+                self.misses += 1
+                cached = self._digests[key] = digest(texts[name], per_text)
+            else:
+                self.hits += 1
+            fitted[name] = cached[0]
+            truncated += cached[1]
+        return fitted, truncated
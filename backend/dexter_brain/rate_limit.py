@@ -0,0 +1,308 @@
+"""
+Adaptive per-provider rate limiting.
+
+Every provider endpoint gets one limiter shared by all slots that talk to it.
+A limiter admits a call once its request and token buckets (requests/min,
+tokens/min) have room and the number of calls in flight is below its current
+concurrency limit. That limit adapts AIMD-style: it grows by roughly one per
+round of successful calls and halves whenever the provider throttles (429 or
+503). Throttled calls are retried after the provider's ``Retry-After`` or a
+jittered exponential backoff, and the whole endpoint is held back meanwhile.
+
+Limits come from ``runtime.rate_limit`` and can be overridden per slot with
+``models.<name>.rate_limit``; the first slot to reach an endpoint sets its
+limits.
+"""
+
+from __future__ import annotations
+import asyncio
+import email.utils
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    from .http_clients import endpoint_key
+except ImportError:  # pragma: no cover
+    from http_clients import endpoint_key
+
+DEFAULT_RATE_LIMIT_SETTINGS: Dict[str, Any] = {
+    'enabled': True,
+    'requests_per_min': 0,   # 0 = unlimited
+    'tokens_per_min': 0,     # 0 = unlimited
+    'max_concurrency': 8,
+    'min_concurrency': 1,
+    'max_retries': 3,
+    'backoff_base_sec': 1.0,
+    'backoff_max_sec': 30.0,
+}
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class ProviderHTTPError(ValueError):
+    """A provider answered with an HTTP error status."""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def http_error(label: str, response: httpx.Response) -> ProviderHTTPError:
+    """Build the error raised for a failed provider response."""
+    return ProviderHTTPError(
+        f"{label} error {response.status_code}: {response.text}",
+        response.status_code,
+        parse_retry_after(response.headers.get('retry-after')),
+    )
+
+
+def throttle_info(exc: BaseException) -> Optional[Tuple[int, Optional[float]]]:
+    """``(status, retry_after)`` if ``exc`` means the provider is throttling us."""
+    if isinstance(exc, ProviderHTTPError):
+        status, retry_after = exc.status_code, exc.retry_after
+    elif isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        retry_after = parse_retry_after(exc.response.headers.get('retry-after'))
+    else:
+        return None
+    return (status, retry_after) if status in THROTTLE_STATUSES else None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class _TokenBucket:
+    """Continuously refilled bucket holding up to one minute of allowance."""
+
+    def __init__(self, per_min: float):
+        self.per_min = float(per_min or 0)
+        self.level = self.per_min
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_min <= 0
+
+    def _refill(self, now: float):
+        self.level = min(self.per_min, self.level + (now - self.updated) * self.per_min / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        # Requests bigger than the whole bucket go through once it is full
+        needed = min(amount, self.per_min)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60.0 / self.per_min
+
+    def take(self, amount: float, now: float):
+        if not self.unlimited:
+            self._refill(now)
+            self.level -= amount
+
+
+class ProviderRateLimiter:
+    """Token buckets plus an AIMD concurrency limit for one provider endpoint."""
+
+    def __init__(self, key: str, settings: Dict[str, Any] | None = None):
+        self.key = key
+        self.settings = {**DEFAULT_RATE_LIMIT_SETTINGS, **(settings or {})}
+        self.requests = _TokenBucket(self.settings['requests_per_min'])
+        self.tokens = _TokenBucket(self.settings['tokens_per_min'])
+        self.max_concurrency = max(1, int(self.settings['max_concurrency']))
+        self.min_concurrency = max(1, min(int(self.settings['min_concurrency']), self.max_concurrency))
+        self.concurrency = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counters: Dict[str, int] = {
+            'admitted': 0,
+            'delayed': 0,
+            'throttled': 0,
+            'retries': 0,
+            'gave_up': 0,
+            'decreases': 0,
+            'cancelled': 0,
+        }
+        self.wait_sec_total = 0.0
+        self.last_throttle_ts: Optional[float] = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            # A new event loop (tests, reloads) cannot reuse the old condition
+            self._cond = asyncio.Condition()
+            self._loop = loop
+            self.in_flight = 0
+        return self._cond
+
+    def _admission_delay(self, tokens: int, now: float) -> Optional[float]:
+        """Seconds until a call may start, or None if it must wait for a release."""
+        if self.in_flight >= max(self.min_concurrency, int(self.concurrency)):
+            return None
+        return max(self.blocked_until - now,
+                   self.requests.wait_time(1, now),
+                   self.tokens.wait_time(tokens, now))
+
+    async def acquire(self, tokens: int = 1):
+        cond = self._condition()
+        start = time.monotonic()
+        async with cond:
+            while True:
+                now = time.monotonic()
+                delay = self._admission_delay(tokens, now)
+                if delay is not None and delay <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(cond.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self.in_flight += 1
+        waited = time.monotonic() - start
+        self.counters['admitted'] += 1
+        if waited > 0.001:
+            self.counters['delayed'] += 1
+            self.wait_sec_total += waited
+
+    async def release(self, *, throttled: bool = False, retry_after: Optional[float] = None,
+                      extra_tokens: int = 0, cancelled: bool = False):
+        """Return a slot, feeding the outcome back into the AIMD limit.
+
+        A cancelled call says nothing about provider capacity, so it frees
+        its slot without growing or shrinking the limit.
+        """
+        cond = self._condition()
+        async with cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if extra_tokens:
+                self.tokens.take(extra_tokens, now)
+            if throttled:
+                self.counters['throttled'] += 1
+                self.last_throttle_ts = time.time()
+                self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+                self.counters['decreases'] += 1
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+            elif cancelled:
+                self.counters['cancelled'] += 1
+            else:
+                self.concurrency = min(float(self.max_concurrency),
+                                       self.concurrency + 1.0 / max(self.concurrency, 1.0))
+            cond.notify_all()
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Delay before retry number ``attempt`` (0-based)."""
+        cap = float(self.settings['backoff_max_sec'])
+        if retry_after is not None:
+            return min(retry_after, cap)
+        # Full jitter keeps throttled callers from retrying in lockstep
+        ceiling = min(cap, float(self.settings['backoff_base_sec']) * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def run(self, call: Callable[[], Awaitable[str]], tokens: int = 1) -> str:
+        """Run ``call`` under this limiter, retrying throttled attempts."""
+        max_retries = int(self.settings['max_retries'])
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            try:
+                result = await call()
+            except BaseException as e:
+                info = throttle_info(e) if isinstance(e, Exception) else None
+                await self.release(throttled=info is not None,
+                                   retry_after=info[1] if info else None,
+                                   cancelled=not isinstance(e, Exception))
+                if info is None:
+                    raise
+                if attempt >= max_retries:
+                    self.counters['gave_up'] += 1
+                    raise
+                delay = self.backoff(attempt, info[1])
+                attempt += 1
+                self.counters['retries'] += 1
+                await asyncio.sleep(delay)
+                continue
+            await self.release(extra_tokens=estimate_tokens(result) if isinstance(result, str) else 0)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self.counters,
+            'in_flight': self.in_flight,
+            'concurrency_limit': round(self.concurrency, 2),
+            'max_concurrency': self.max_concurrency,
+            'min_concurrency': self.min_concurrency,
+            'requests_per_min': self.requests.per_min,
+            'tokens_per_min': self.tokens.per_min,
+            'requests_available': None if self.requests.unlimited else round(self.requests.level, 1),
+            'tokens_available': None if self.tokens.unlimited else round(self.tokens.level, 1),
+            'blocked_for_sec': round(max(0.0, self.blocked_until - now), 2),
+            'wait_sec_total': round(self.wait_sec_total, 3),
+            'last_throttle_ts': self.last_throttle_ts,
+        }
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def limiter_key(model_config: Dict[str, Any]) -> str:
+    provider = (model_config.get('provider') or '').lower()
+    endpoint = model_config.get('endpoint') or ''
+    return f"{provider}|{endpoint_key(endpoint)}" if endpoint else provider
+
+
+def rate_limit_settings(config, model_config: Dict[str, Any]) -> Dict[str, Any]:
+    rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+    rt = rt if isinstance(rt, dict) else {}
+    return {**DEFAULT_RATE_LIMIT_SETTINGS, **rt.get('rate_limit', {}), **(model_config.get('rate_limit') or {})}
+
+
+def get_rate_limiter(config, model_config: Dict[str, Any]) -> Optional[ProviderRateLimiter]:
+    """Shared limiter for the slot's provider endpoint, or None if disabled."""
+    settings = rate_limit_settings(config, model_config)
+    if not settings.get('enabled', True):
+        return None
+    key = limiter_key(model_config)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = ProviderRateLimiter(key, settings)
+    return limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    return {key: limiter.stats() for key, limiter in _limiters.items()}
+
+
+def reset_rate_limiters():
+    _limiters.clear()
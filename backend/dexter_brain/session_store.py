@@ -0,0 +1,241 @@
+"""
+Bounded, persisted store for collaboration sessions.
+
+``CollaborationManager.active_sessions`` used to be a plain dict that kept
+every proposal, refinement and vote forever. ``SessionStore`` keeps a hot LRU
+tier bounded by session count and (estimated) bytes. Finished sessions are
+spilled to the ``collaboration_sessions`` table as zlib-compressed JSON, off
+the event loop, and may then be evicted from memory. Sessions still running
+are never evicted.
+
+It behaves like a dict of the hot tier keyed by session id: ``[]``, ``get``,
+``in``, iteration and ``len`` never touch the database. ``await load(id)``
+reads an evicted session back in a worker thread and makes it hot again.
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from .db import BrainDB
+except ImportError:  # pragma: no cover
+    from db import BrainDB
+
+DEFAULT_STORE_SETTINGS: Dict[str, Any] = {
+    'max_sessions': 200,
+    'max_bytes': 32 * 1024 * 1024,
+    'persist': True,
+}
+
+
+class _Entry:
+    __slots__ = ('bytes', 'done', 'persisted', 'spilling')
+
+    def __init__(self):
+        self.bytes = 0
+        self.done = False
+        self.persisted = False
+        self.spilling = False
+
+
+class SessionStore(MutableMapping):
+    """Hot LRU of session dicts backed by the ``collaboration_sessions`` table."""
+
+    def __init__(self, db_path: Optional[str], *, max_sessions: int = 200,
+                 max_bytes: int = 32 * 1024 * 1024, enable_fts: bool = False):
+        self.db_path = db_path
+        self.enable_fts = enable_fts
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._hot: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._entries: Dict[str, _Entry] = {}
+        self._db: Optional[BrainDB] = None
+        self._db_lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            'hot_hits': 0,
+            'reloads': 0,
+            'misses': 0,
+            'spills': 0,
+            'evictions': 0,
+            'dropped': 0,
+            'spill_errors': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config) -> 'SessionStore':
+        collab = getattr(config, 'collaboration', {}) if hasattr(config, 'collaboration') else {}
+        rt = getattr(config, 'runtime', {}) if hasattr(config, 'runtime') else {}
+        settings = {**DEFAULT_STORE_SETTINGS, **(collab or {}).get('session_store', {})}
+        db_path = (rt or {}).get('db_path') if settings.get('persist', True) else None
+        return cls(db_path, max_sessions=int(settings['max_sessions']), max_bytes=int(settings['max_bytes']))
+
+    # -- database -----------------------------------------------------------
+
+    def _brain(self) -> Optional[BrainDB]:
+        if not self.db_path:
+            return None
+        if self._db is None:
+            self._db = BrainDB(self.db_path, enable_fts=self.enable_fts)
+        return self._db
+
+    def _spill(self, session_id: str, session: Dict[str, Any], data: bytes, entry: _Entry,
+               summary: Dict[str, Any]):
+        try:
+            blob = zlib.compress(data, 6)
+            with self._db_lock:
+                db = self._brain()
+                if db is None:
+                    return
+                db.spill_collaboration_session(
+                    session_id, session.get('user_input', ''), session.get('started_ts', time.time()),
+                    session.get('completed_ts'), session.get('status', 'completed'),
+                    winning_solution=summary.get('winning_solution'), vote_results=summary.get('vote_results'),
+                    session_blob=blob,
+                )
+            entry.persisted = True
+            self.counters['spills'] += 1
+        except Exception:
+            # Evicting it later drops it rather than keeping it in memory for good
+            self.counters['spill_errors'] += 1
+        finally:
+            entry.spilling = False
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._db_lock:
+                db = self._brain()
+                blob = db.load_collaboration_session_blob(session_id) if db is not None else None
+        except Exception:
+            return None
+        if blob is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(blob))
+        except (zlib.error, ValueError):
+            return None
+
+    # -- mapping interface --------------------------------------------------
+
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        session = self._hot.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        self._hot.move_to_end(session_id)
+        self.counters['hot_hits'] += 1
+        return session
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session, read back from the database off the event loop if it was evicted."""
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        session = await asyncio.to_thread(self._load, session_id)
+        if session_id in self._hot:  # stored again while we were reading
+            return self._hot[session_id]
+        if session is None:
+            self.counters['misses'] += 1
+            return None
+        self.counters['reloads'] += 1
+        entry = _Entry()
+        entry.done = entry.persisted = True
+        entry.bytes = len(json.dumps(session, default=str))
+        self._hot[session_id] = session
+        self._entries[session_id] = entry
+        self._enforce()
+        return session
+
+    def __setitem__(self, session_id: str, session: Dict[str, Any]):
+        self._hot[session_id] = session
+        self._hot.move_to_end(session_id)
+        self._entries.setdefault(session_id, _Entry())
+        self._enforce()
+
+    def __delitem__(self, session_id: str):
+        del self._hot[session_id]
+        self._entries.pop(session_id, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._hot))
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._hot
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def mark_done(self, session_id: str, *, winning_solution: Dict[str, Any] | None = None,
+                  vote_results: Dict[str, Any] | None = None):
+        """The session will not change any more: spill it and make it evictable.
+
+        ``winning_solution`` and ``vote_results`` are also stored as plain JSON
+        columns so they stay queryable without decompressing the session.
+        """
+        session = self._hot.get(session_id)
+        entry = self._entries.get(session_id)
+        if session is None or entry is None:
+            return
+        data = json.dumps(session, ensure_ascii=False, default=str).encode('utf-8')
+        entry.bytes = len(data)
+        entry.done = True
+        if not self.db_path:
+            self._enforce()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        summary = {'winning_solution': winning_solution, 'vote_results': vote_results}
+        entry.spilling = True
+        if loop is None:
+            self._spill(session_id, session, data, entry, summary)
+            self._enforce()
+        else:
+            future = loop.run_in_executor(None, self._spill, session_id, session, data, entry, summary)
+            future.add_done_callback(lambda _f: self._enforce())
+
+    def hot_bytes(self) -> int:
+        return sum(self._entries[sid].bytes for sid in self._hot if sid in self._entries)
+
+    def _enforce(self):
+        """Evict least recently used finished sessions until within bounds."""
+        total = self.hot_bytes()
+        if len(self._hot) <= self.max_sessions and total <= self.max_bytes:
+            return
+        for session_id in list(self._hot):
+            if len(self._hot) <= self.max_sessions and total <= self.max_bytes:
+                break
+            entry = self._entries.get(session_id)
+            if entry is None or not entry.done:
+                continue
+            if entry.spilling:
+                continue
+            del self._hot[session_id]
+            self._entries.pop(session_id, None)
+            total -= entry.bytes
+            self.counters['evictions' if entry.persisted else 'dropped'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            'hot_sessions': len(self._hot),
+            'hot_bytes': self.hot_bytes(),
+            'running': sum(1 for sid in self._hot if not self._entries.get(sid, _Entry()).done),
+            'max_sessions': self.max_sessions,
+            'max_bytes': self.max_bytes,
+            'db_path': self.db_path,
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,69 @@
+"""
+Single-flight coalescing for identical in-flight LLM requests.
+
+Concurrent callers asking for the same key share one upstream call and all
+receive its result (or its exception). The upstream call runs as its own task
+so one caller going away does not cancel it for everyone else; it is only
+cancelled once every waiter has gone.
+"""
+
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.counters: Dict[str, int] = {
+            'leaders': 0,
+            'coalesced': 0,
+            'waiter_cancellations': 0,
+            'abandoned': 0,
+        }
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` for ``key`` unless an identical call is already in flight."""
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            task = asyncio.ensure_future(fn())
+            flight = self._flights[key] = _Flight(task)
+            task.add_done_callback(lambda _t, k=key, f=flight: self._forget(k, f))
+            self.counters['leaders'] += 1
+        else:
+            self.counters['coalesced'] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.cancelled():
+                # This waiter was cancelled; the shared call keeps running
+                self.counters['waiter_cancellations'] += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.counters['abandoned'] += 1
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, 'in_flight': self.in_flight()}
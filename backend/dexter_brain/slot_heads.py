@@ -0,0 +1,75 @@
+"""
+Latest outputs per slot, kept in memory for ``/api/collaboration/head``.
+
+Every slot pane polls the head endpoint every few seconds. ``SlotHeads``
+holds the last ``size`` outputs of each slot in a ring buffer, filled by
+``CollaborationManager`` as outputs are written and warmed from the
+collaboration log at startup, so a poll never touches the disk.
+
+Each slot has a version that bumps on every push. Together with a per-process
+epoch it forms the ETag, so an unchanged poll can be answered with 304.
+"""
+
+from __future__ import annotations
+import threading
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+DEFAULT_HEAD_BUFFER_SIZE = 20
+
+
+def _item(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'text': record.get('content', ''),
+        'timestamp': record.get('timestamp'),
+        'session_id': record.get('session', ''),
+        'phase': record.get('phase'),
+    }
+
+
+class SlotHeads:
+    """Per-slot ring buffers of recent outputs, newest first."""
+
+    def __init__(self, size: int = DEFAULT_HEAD_BUFFER_SIZE):
+        self.size = max(1, int(size))
+        self.epoch = uuid.uuid4().hex[:8]
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def push(self, slot: str, record: Dict[str, Any]):
+        """Record a new output of ``slot`` (a collaboration log record)."""
+        item = _item(record)
+        with self._lock:
+            buffer = self._buffers.get(slot)
+            if buffer is None:
+                buffer = self._buffers[slot] = deque(maxlen=self.size)
+            buffer.appendleft(item)
+            self._versions[slot] = self._versions.get(slot, 0) + 1
+
+    def warm(self, slot: str, records: Iterable[Dict[str, Any]]):
+        """Fill ``slot`` from records given newest first, without displacing newer pushes."""
+        with self._lock:
+            buffer = self._buffers.setdefault(slot, deque(maxlen=self.size))
+            for record in records:
+                if len(buffer) >= self.size:
+                    break
+                buffer.append(_item(record))
+            self._versions[slot] = self._versions.get(slot, 0) + 1
+
+    def head(self, slot: str, n: int = 1) -> Tuple[List[Dict[str, Any]], str]:
+        """The ``n`` newest outputs of ``slot`` and the ETag of that view."""
+        n = max(0, min(int(n), self.size))
+        with self._lock:
+            buffer = self._buffers.get(slot, ())
+            items = [dict(item) for _, item in zip(range(n), buffer)]
+            version = self._versions.get(slot, 0)
+        return items, f'W/"{self.epoch}-{slot}-{version}-{n}"'
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'slots': {slot: len(buffer) for slot, buffer in self._buffers.items()},
+            }
@@ -5,10 +5,10 @@ import asyncio
 import uuid
 import time
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
 
@@ -37,9 +37,18 @@ if __package__ in (None, ""):
 from .dexter_brain.config import Config
 from .dexter_brain.campaigns import CampaignManager
 from .dexter_brain.collaboration import CollaborationManager
-from .dexter_brain.llm import call_slot
+from .dexter_brain.collab_scheduler import CollaborationOverloaded
+from .dexter_brain.llm import call_slot, stream_slot, get_stream_stats, get_singleflight_stats
+# Pooled provider HTTP clients shared by every LLM call
+from .dexter_brain.http_clients import configure_client_registry, close_client_registry, get_client_registry
+# Fan-out SSE event bus
+from .dexter_brain.events import configure_event_bus
 # NEW: BrainDB for STM/LTM
 from .dexter_brain.db import BrainDB
+from .dexter_brain.memory import close_memory_context_providers
+from .dexter_brain.llm_cache import close_response_caches, get_cache_stats
+from .dexter_brain.rate_limit import get_rate_limit_stats
+from .dexter_brain.circuit_breaker import get_breaker
 # NEW: SkillsManager for dynamic skill execution
 from .skills.skills_manager import SkillsManager
 # NEW: Error tracking and healing
@@ -70,9 +79,38 @@ try:
 except Exception:
     _db = None  # Fail open; endpoints continue to work without memory
 
+# Fire-and-forget tasks, referenced here so they are not garbage-collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro, what: str) -> asyncio.Task:
+    """Run ``coro`` in the background; failures are logged rather than lost"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"Warning: {what} failed: {t.exception()}")
+
+    task.add_done_callback(_done)
+    return task
+
 # Initialize managers
 _campaign_mgr: CampaignManager = None  # Will be initialized after DB setup
 _collab_mgr: CollaborationManager = CollaborationManager(_app_cfg)
+
+
+def _reload_collab_mgr() -> CollaborationManager:
+    """Manager for the reloaded config; takes over the log, caches, scheduler and sessions of the current one"""
+    mgr = CollaborationManager(_app_cfg, log=_collab_mgr.log, heads=_collab_mgr.heads,
+                               files_index=_collab_mgr.files_index, scheduler=_collab_mgr.scheduler,
+                               sessions=_collab_mgr.active_sessions)
+    mgr.consensus_stats = _collab_mgr.consensus_stats
+    mgr.cascade_stats = _collab_mgr.cascade_stats
+    mgr.sandbox_check = _collab_mgr.sandbox_check
+    return mgr
+
 # NEW: Initialize SkillsManager for dynamic skill execution
 _skills_mgr: Optional[SkillsManager] = None
 try:
@@ -91,11 +129,30 @@ _autonomy_mgr: Optional['AutonomyManager'] = None
 startup_time = time.time()
 
 
+async def _cascade_sandbox_check(code: str, request: str) -> bool:
+    """Whether a cascade tier's winning code runs in the sandbox"""
+    if _autonomy_mgr is None:
+        return True
+    result = await _autonomy_mgr.test_skill_in_sandbox(code, request)
+    return bool(result.get('success'))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application startup and shutdown."""
     global _error_healer, _campaign_mgr, _autonomy_mgr
     try:
+        configure_client_registry(_app_cfg)
+        configure_event_bus(_app_cfg)
+        if _collab_mgr.log is not None:
+            await asyncio.to_thread(_collab_mgr.log.open_slots, list(_app_cfg.models))
+            _collab_mgr.log.start_compactor(lambda: list(_app_cfg.models))
+        await asyncio.to_thread(_collab_mgr.files_index.refresh, list(_app_cfg.models))
+        if _app_cfg.collaboration.get('watch_enabled', True):
+            _collab_mgr.files_index.start_watcher(lambda: list(_app_cfg.models),
+                                                  float(_app_cfg.collaboration.get('file_sync_interval', 5)))
+        await asyncio.to_thread(_collab_mgr.warm_heads)
+
         if _db:
             _campaign_mgr = CampaignManager(_db)
             print("✅ Campaign manager initialized")
@@ -107,6 +164,7 @@ async def lifespan(app: FastAPI):
         if _skills_mgr and _collab_mgr:
             from .dexter_brain.sandbox import create_sandbox
             _autonomy_mgr = AutonomyManager(_app_cfg, _collab_mgr, _skills_mgr, create_sandbox)
+            _collab_mgr.sandbox_check = _cascade_sandbox_check
             print("✅ Autonomous skill generation system initialized")
         else:
             print("⚠️  Autonomy manager not initialized - missing dependencies")
@@ -139,8 +197,13 @@ async def lifespan(app: FastAPI):
     try:
         yield
     finally:
-        # Placeholder for any required cleanup
-        pass
+        await _collab_mgr.files_index.aclose()
+        if _collab_mgr.log is not None:
+            await _collab_mgr.log.aclose()
+        await close_client_registry()
+        close_memory_context_providers()
+        close_response_caches()
+        _collab_mgr.active_sessions.close()
 
 
 app = FastAPI(title="Dexter API v3", version="3.0", docs_url="/docs", redoc_url="/redoc", lifespan=lifespan)
@@ -209,6 +272,7 @@ class CampaignOut(BaseModel):
 class ChatIn(BaseModel):
     message: str
     campaign_id: Optional[str] = None
+    topology: Optional[str] = None  # collaboration topology: all | tournament
 
 class ChatOut(BaseModel):
     reply: str
@@ -278,8 +342,17 @@ def detailed_health():
             "stats": healing_stats
         },
         "collaboration": {
-            "active_sessions": len(_collab_mgr.get_active_sessions())
-        }
+            "active_sessions": len(_collab_mgr.get_active_sessions()),
+            "session_store": _collab_mgr.active_sessions.stats(),
+            "log": _collab_mgr.log.stats() if _collab_mgr.log is not None else None,
+            "files_index": _collab_mgr.files_index.stats(),
+            "scheduler": _collab_mgr.scheduler.stats()
+        },
+        "llm_http": get_client_registry().stats(),
+        "llm_streaming": get_stream_stats(),
+        "llm_cache": get_cache_stats(),
+        "llm_singleflight": get_singleflight_stats(),
+        "llm_rate_limits": get_rate_limit_stats()
     }
 
 # NEW: Error tracking endpoints
@@ -379,7 +452,7 @@ def put_config(payload: Dict[str, Any]):
     
     # Reload config and managers
     _app_cfg = Config.load(CONFIG_PATH)
-    _collab_mgr = CollaborationManager(_app_cfg)
+    _collab_mgr = _reload_collab_mgr()
     
     return ConfigOut(config=_app_cfg.to_json())
 
@@ -396,12 +469,18 @@ async def create_campaign(payload: CampaignIn):
         payload.initial_request
     )
     
-    # Broadcast to LLMs for initial planning if there's a request
+    # Broadcast to LLMs for initial planning if there's a request; it may queue behind chat
     if payload.initial_request:
-        session_id = await _collab_mgr.broadcast_user_input(
-            f"Campaign: {payload.name}\nRequest: {payload.initial_request}",
-            f"campaign_{campaign.id}"
-        )
+        async def plan_campaign():
+            try:
+                await _collab_mgr.broadcast_user_input(
+                    f"Campaign: {payload.name}\nRequest: {payload.initial_request}",
+                    f"campaign_{campaign.id}",
+                    priority='campaign'
+                )
+            except CollaborationOverloaded as e:
+                print(f"Warning: campaign planning not started: {e}")
+        _spawn(plan_campaign(), f"campaign planning for {campaign.id}")
     
     return CampaignOut(
         id=campaign.id,
@@ -466,38 +545,29 @@ async def get_campaign(campaign_id: str):
         progress=campaign.progress
     )
 
-# Enhanced chat with autonomous skill generation
-@app.post("/chat", response_model=ChatOut)
-async def chat(payload: ChatIn):
-    """Enhanced chat with autonomous skill generation and execution"""
-    msg = payload.message or ""
-    
-    # Check if Dexter is properly configured
-    dexter_config = _app_cfg.models.get('dexter', {})
-    dexter_errors = validate_model_config('dexter', dexter_config)
-    
-    if dexter_errors:
-        error_msg = f"Dexter is not properly configured: {', '.join(dexter_errors)}"
-        return ChatOut(
-            reply=error_msg,
-            executed=None,
-            campaign_updated=None,
-            collaboration_session=None
-        )
+def _recent_conversation() -> List[str]:
+    """Last 10 STM memories, as conversation history for the autonomy manager"""
+    if not _db:
+        return []
+    try:
+        recent_memories = _db.get_memories('stm', limit=10)
+        return [m.get('content', '') for m in recent_memories if m.get('content')]
+    except Exception:
+        return []
 
-    # Build conversation history for context (last 10 messages)
-    conversation_history = []
-    if _db:
-        try:
-            recent_memories = _db.get_memories('stm', limit=10)
-            conversation_history = [m.get('content', '') for m in recent_memories if m.get('content')]
-        except Exception:
-            pass
+async def _begin_chat(payload: ChatIn) -> Tuple[str, Optional[str], Optional[Dict[str, Any]]]:
+    """Shared start of /chat and /chat/stream: broadcast, autonomy and campaign objective.
+
+    Returns (collaboration session id, updated campaign id, autonomous result).
+    CollaborationOverloaded and ValueError from the broadcast propagate.
+    """
+    msg = payload.message or ""
+    conversation_history = _recent_conversation()
 
     # 1. IMMEDIATELY broadcast to all LLMs and start autonomous processing
-    session_id = await _collab_mgr.broadcast_user_input(msg)
-    
-    # 2. Process autonomous skill request in parallel
+    session_id = await _collab_mgr.broadcast_user_input(msg, topology=payload.topology)
+
+    # 2. Process autonomous skill request
     autonomous_result = None
     if _autonomy_mgr:
         try:
@@ -514,25 +584,20 @@ async def chat(payload: ChatIn):
             campaign_updated = payload.campaign_id
         except Exception:
             pass
+    return session_id, campaign_updated, autonomous_result
 
-    # 4. Get Dexter's response - may include clarifying questions
-    dexter_reply = ""
+def _clarifying_question(autonomous_result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The question Dexter asks instead of answering, when autonomy needs more details"""
     if autonomous_result and autonomous_result.get('needs_clarification'):
-        # Dexter asks clarifying questions
-        dexter_reply = autonomous_result.get('clarifying_question', 'Could you provide more details?')
-    else:
-        # Normal Dexter response
-        try:
-            dexter_reply = await _get_dexter_response(msg)
-        except Exception as e:
-            return ChatOut(
-                reply=f"Error communicating with Dexter: {str(e)}. Please check Dexter's configuration in the Models tab.",
-                executed=None,
-                campaign_updated=campaign_updated,
-                collaboration_session=session_id,
-                skills_results=None
-            )
+        return autonomous_result.get('clarifying_question', 'Could you provide more details?')
+    return None
+
+async def _finish_chat(msg: str, dexter_reply: str, autonomous_result: Optional[Dict[str, Any]],
+                       session_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+    """Shared end of /chat and /chat/stream: run skills, report autonomous actions, remember the exchange.
 
+    Returns (executed, skills_results).
+    """
     # 5. Execute existing skills on the message
     skills_results = None
     if _skills_mgr:
@@ -574,7 +639,50 @@ async def chat(payload: ChatIn):
             )
     except Exception:
         pass
+    return executed, skills_results
+
+# Enhanced chat with autonomous skill generation
+@app.post("/chat", response_model=ChatOut)
+async def chat(payload: ChatIn):
+    """Enhanced chat with autonomous skill generation and execution"""
+    msg = payload.message or ""
+    
+    # Check if Dexter is properly configured
+    dexter_config = _app_cfg.models.get('dexter', {})
+    dexter_errors = validate_model_config('dexter', dexter_config)
+    
+    if dexter_errors:
+        error_msg = f"Dexter is not properly configured: {', '.join(dexter_errors)}"
+        return ChatOut(
+            reply=error_msg,
+            executed=None,
+            campaign_updated=None,
+            collaboration_session=None
+        )
+
+    try:
+        session_id, campaign_updated, autonomous_result = await _begin_chat(payload)
+    except CollaborationOverloaded as e:
+        raise HTTPException(503, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    # 4. Get Dexter's response - may include clarifying questions
+    dexter_reply = _clarifying_question(autonomous_result)
+    if dexter_reply is None:
+        # Normal Dexter response
+        try:
+            dexter_reply = await _get_dexter_response(msg)
+        except Exception as e:
+            return ChatOut(
+                reply=f"Error communicating with Dexter: {str(e)}. Please check Dexter's configuration in the Models tab.",
+                executed=None,
+                campaign_updated=campaign_updated,
+                collaboration_session=session_id,
+                skills_results=None
+            )
 
+    executed, skills_results = await _finish_chat(msg, dexter_reply, autonomous_result, session_id)
     return ChatOut(
         reply=dexter_reply,
         executed=executed,
@@ -583,6 +691,73 @@ async def chat(payload: ChatIn):
         skills_results=skills_results
     )
 
+def _sse(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+
+async def _relay_tokens(chunks: AsyncIterator[str], out: Dict[str, Any]) -> AsyncIterator[str]:
+    """SSE ``token`` frames for ``chunks``; leaves the full text and time-to-first-token in ``out``"""
+    parts: List[str] = []
+    start = time.perf_counter()
+    out['ttft_ms'] = None
+    async for chunk in chunks:
+        if out['ttft_ms'] is None:
+            out['ttft_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        parts.append(chunk)
+        yield _sse({"type": "token", "text": chunk})
+    out['text'] = "".join(parts)
+
+@app.post("/chat/stream")
+async def chat_stream(payload: ChatIn):
+    """Streaming variant of /chat: relays Dexter's reply as server-sent events.
+
+    Emits ``token`` events as text arrives, then a single ``done`` event carrying
+    the same fields as ``ChatOut`` plus the measured time-to-first-token. When
+    Dexter needs clarification, the question is the ``done`` event's reply and
+    no tokens are streamed.
+    """
+    msg = payload.message or ""
+    dexter_errors = validate_model_config('dexter', _app_cfg.models.get('dexter', {}))
+
+    async def events():
+        if dexter_errors:
+            yield _sse({"type": "error", "error": f"Dexter is not properly configured: {', '.join(dexter_errors)}"})
+            return
+
+        try:
+            session_id, campaign_updated, autonomous_result = await _begin_chat(payload)
+        except (CollaborationOverloaded, ValueError) as e:
+            yield _sse({"type": "error", "error": str(e)})
+            return
+        yield _sse({"type": "session", "collaboration_session": session_id})
+
+        dexter_reply = _clarifying_question(autonomous_result)
+        streamed: Dict[str, Any] = {'ttft_ms': None}
+        if dexter_reply is None:
+            try:
+                async for frame in _relay_tokens(stream_slot(_app_cfg, 'dexter', _dexter_prompt(msg)), streamed):
+                    yield frame
+            except Exception as e:
+                yield _sse({"type": "error", "error": f"Error communicating with Dexter: {str(e)}",
+                            "collaboration_session": session_id})
+                return
+            dexter_reply = streamed['text']
+
+        executed, skills_results = await _finish_chat(msg, dexter_reply, autonomous_result, session_id)
+        yield _sse({
+            "type": "done",
+            "reply": dexter_reply,
+            "executed": executed,
+            "campaign_updated": campaign_updated,
+            "collaboration_session": session_id,
+            "skills_results": skills_results,
+            "clarifying_question": (autonomous_result or {}).get('clarifying_question'),
+            "ttft_ms": streamed['ttft_ms']
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
 # Individual LLM Chat Model
 class LLMChatIn(BaseModel):
     message: str
@@ -645,6 +820,36 @@ async def llm_chat(payload: LLMChatIn):
             error=str(e)
         )
 
+@app.get("/llm/rate-limits")
+async def llm_rate_limits():
+    """Current state of each provider endpoint's adaptive rate limiter"""
+    return {"limiters": get_rate_limit_stats()}
+
+@app.post("/llm/chat/stream")
+async def llm_chat_stream(payload: LLMChatIn):
+    """Streaming variant of /llm/chat: relays tokens as server-sent events"""
+    if payload.config:
+        cfg = type('obj', (object,), {'models': {payload.model: payload.config}})()
+    else:
+        cfg = _app_cfg
+
+    async def events():
+        if not payload.config and payload.model not in _app_cfg.models:
+            yield _sse({"type": "error", "model": payload.model,
+                        "error": f"Model '{payload.model}' not found in configuration"})
+            return
+        streamed: Dict[str, Any] = {}
+        try:
+            async for frame in _relay_tokens(stream_slot(cfg, payload.model, payload.message), streamed):
+                yield frame
+        except Exception as e:
+            yield _sse({"type": "error", "model": payload.model, "error": str(e)})
+            return
+        yield _sse({"type": "done", "model": payload.model, "response": streamed['text'],
+                    "success": True, "ttft_ms": streamed['ttft_ms']})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
 # TTS Configuration endpoints
 @app.get("/tts/settings")
 async def get_tts_settings():
@@ -750,10 +955,16 @@ async def update_model_tts_settings(model_name: str, payload: TTSSettingsIn):
     return TTSSettingsOut(settings=current['tts']['per_model_settings'][model_name])
 
 @app.get("/collaboration/files")
-async def get_collaboration_files():
-    """Get all collaboration files for all models with status and errors"""
+async def get_collaboration_files(
+    type: Optional[str] = Query(None, description="Comma-separated artifact types: error,proposal,refinement,vote,unknown"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Get collaboration files for all models with status and errors (paged per model)"""
     response = {}
-    base_collab_dir = _app_cfg.collaboration.get('base_directory', './collaboration')
+    types = [t.strip() for t in type.split(',') if t.strip()] if type else None
+    # Slots added since startup are scanned off the event loop before listing
+    await _collab_mgr.files_index.ensure(list(_app_cfg.models))
     
     for model_name, model_config in _app_cfg.models.items():
         # Get model validation status
@@ -767,46 +978,16 @@ async def get_collaboration_files():
             'collaboration_enabled': model_config.get('collaboration_enabled', True)
         }
         
-        # Get collaboration files
-        model_files = []
-        if model_config.get('collaboration_enabled', True):
-            model_dir = model_config.get('collaboration_directory', f'{base_collab_dir}/{model_name}')
-            if os.path.exists(model_dir):
-                for filename in os.listdir(model_dir):
-                    filepath = os.path.join(model_dir, filename)
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        file_info = {
-                            'name': filename,
-                            'size': stat.st_size,
-                            'modified': stat.st_mtime
-                        }
-                        
-                        # Determine file type and priority (supports JSON and legacy TXT)
-                        fname = filename.lower()
-                        ftype = 'unknown'
-                        priority = 'low'
-                        if fname.endswith('.json') or fname.endswith('.txt'):
-                            if '_error.' in fname:
-                                ftype, priority = 'error', 'high'
-                            elif '_proposal.' in fname:
-                                ftype, priority = 'proposal', 'medium'
-                            elif '_refinement.' in fname:
-                                ftype, priority = 'refinement', 'medium'
-                            elif '_vote.' in fname:
-                                ftype, priority = 'vote', 'low'
-                        file_info['type'] = ftype
-                        file_info['priority'] = priority
-                        
-                        model_files.append(file_info)
-                
-                # Sort files by priority (errors first) and then by modification time
-                priority_order = {'high': 0, 'medium': 1, 'low': 2}
-                model_files.sort(key=lambda x: (priority_order.get(x['priority'], 3), -x['modified']))
+        # Files come from the cached index, sorted by priority (errors first) and then by modification time
+        total, model_files = _collab_mgr.list_collaboration_files(
+            model_name, types=types, offset=offset, limit=limit, order='priority')
         
         response[model_name] = {
             'status': model_status,
-            'files': model_files
+            'files': model_files,
+            'total': total,
+            'offset': offset,
+            'limit': limit
         }
     return response
 
@@ -817,128 +998,30 @@ async def get_collaboration_file_content(model_name: str, filename: str):
     if not model_config:
         raise HTTPException(404, f"Model {model_name} not found")
     
-    base_collab_dir = _app_cfg.collaboration.get('base_directory', './collaboration')
-    model_dir = model_config.get('collaboration_directory', f'{base_collab_dir}/{model_name}')
-    filepath = os.path.join(model_dir, filename)
-    
-    if not os.path.exists(filepath):
-        raise HTTPException(404, f"File {filename} not found for model {model_name}")
-    
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = await asyncio.to_thread(_collab_mgr.read_collaboration_file, model_name, filename)
         return {"content": content}
+    except FileNotFoundError:
+        raise HTTPException(404, f"File {filename} not found for model {model_name}")
     except Exception as e:
         raise HTTPException(500, f"Error reading file: {str(e)}")
 
 @app.get("/api/collaboration/head")
-async def get_collaboration_head(slot: str, n: int = 1):
-    """Get recent collaboration data for a specific LLM slot"""
-    try:
-        # Map slot names to model names  
-        model_name = slot
-        if slot.startswith('slot_'):
-            # Handle slot_1, slot_2, etc.
-            slot_num = slot.split('_')[1]
-            model_name = f"slot_{slot_num}"
-        
-        # Check if model exists in config
-        if model_name not in _app_cfg.models:
-            return {"items": []}
-        
-        model_config = _app_cfg.models[model_name]
-        if not model_config.get('enabled', False):
-            return {"items": []}
-        
-        # Get active sessions and find latest content for this model
-        active_sessions = _collab_mgr.get_active_sessions() if hasattr(_collab_mgr, 'get_active_sessions') else []
-        items = []
-        
-        # Check active session data first
-        for session in active_sessions:
-            slot_results = session.get('results', {}).get(model_name, {})
-            if slot_results:
-                # Get the latest output (refinement > proposal > vote)
-                latest_content = None
-                if 'latest_output' in slot_results:
-                    latest_content = slot_results['latest_output']
-                elif 'proposal' in slot_results:
-                    latest_content = slot_results['proposal']
-                elif 'vote' in slot_results:
-                    latest_content = slot_results['vote']
-                
-                if latest_content:
-                    items.append({
-                        'text': latest_content,
-                        'timestamp': session.get('started_ts', time.time()),
-                        'session_id': session.get('id', ''),
-                        'source': 'active_session'
-                    })
-        
-        # If no active session data, check collaboration files
-        if not items:
-            base_collab_dir = _app_cfg.collaboration.get('base_directory', './collaboration')
-            
-            # Check both main collaboration folder and model-specific folder
-            file_locations = [
-                base_collab_dir,  # Main folder with session_id_model_phase.txt format
-                model_config.get('collaboration_directory', f'{base_collab_dir}/{model_name}')  # Model folder
-            ]
-            
-            for location in file_locations:
-                if os.path.exists(location):
-                    files = []
-                    for filename in os.listdir(location):
-                        if model_name in filename or (location.endswith(model_name) and filename.endswith(('.json', '.txt'))):
-                            filepath = os.path.join(location, filename)
-                            if os.path.isfile(filepath):
-                                files.append((filepath, os.path.getmtime(filepath)))
-                    
-                    # Sort by modification time (newest first) and take top n
-                    files.sort(key=lambda x: x[1], reverse=True)
-                    for filepath, mtime in files[:n]:
-                        try:
-                            with open(filepath, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                            
-                            # Handle both JSON and TXT formats
-                            text_content = content
-                            if filepath.endswith('.json'):
-                                try:
-                                    json_data = json.loads(content)
-                                    text_content = json_data.get('content', content)
-                                except:
-                                    text_content = content
-                            else:
-                                # For .txt files, extract the content after the header
-                                lines = content.split('\n')
-                                content_start = -1
-                                for i, line in enumerate(lines):
-                                    if '=====' in line:
-                                        content_start = i + 1
-                                        break
-                                if content_start > 0:
-                                    text_content = '\n'.join(lines[content_start:])
-                            
-                            items.append({
-                                'text': text_content,
-                                'timestamp': mtime,
-                                'filename': os.path.basename(filepath),
-                                'source': 'file'
-                            })
-                        except Exception as e:
-                            continue
-                    
-                    if items:
-                        break
-        
-        # Limit results to n items
-        items = items[:n]
-        
-        return {"items": items}
-        
-    except Exception as e:
-        return {"items": [], "error": str(e)}
+async def get_collaboration_head(slot: str, request: Request, n: int = 1):
+    """Get recent collaboration data for a specific LLM slot (served from memory, ETag-aware)"""
+    # Map slot names to model names (slot_1, slot_2, ... are model names already)
+    model_name = slot
+    model_config = _app_cfg.models.get(model_name)
+    if not model_config or not model_config.get('enabled', False):
+        return {"items": []}
+
+    items, etag = _collab_mgr.heads.head(model_name, n)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    for item in items:
+        item['source'] = 'buffer'
+    return JSONResponse({"items": items}, headers=headers)
 
 @app.post("/api/collaboration/input/{slot}")
 async def send_input_to_slot(slot: str, message: dict):
@@ -1003,59 +1086,79 @@ async def get_collaboration_overview():
     # Add Dexter status (always slot 0 / main)
     dexter_config = models.get('dexter', {})
     
-    # Add other numbered slots
-    for i in range(1, 6):  # Slots 1-5
-        slot_key = f"slot_{i}"
-        slot_config = models.get(slot_key) or models.get(f"llm_{i}")
+    # Slot name -> the first active session it takes part in
+    working: Dict[str, Dict[str, Any]] = {}
+    for session in active_sessions:
+        for llm_name in session.get('llms', []):
+            working.setdefault(llm_name, session)
+    
+    # Every configured slot but Dexter; legacy llm_N names are reported as slot_N
+    for name, slot_config in models.items():
+        if name == 'dexter' or not slot_config:
+            continue
+        slot_key = f"slot_{name[4:]}" if name.startswith('llm_') and name[4:].isdigit() else name
+        if slot_key != name and slot_key in models:
+            continue  # slot_N wins over llm_N
         
-        if slot_config:
-            error = None
-            if not slot_config.get('enabled'):
-                error = "Slot disabled"
-            elif not slot_config.get('api_key'):
-                error = "Missing API key"
-            elif not slot_config.get('provider'):
-                error = "Missing provider"
-            elif not slot_config.get('model'):
-                error = "Missing model name"
-            
-            # Check if this slot is currently active in any collaboration
-            active = any(slot_key in session.get('participants', []) for session in active_sessions)
-            current_task = None
-            output = None
-            
-            if active:
-                # Get the most recent output for this slot
-                for session in active_sessions:
-                    if slot_key in session.get('participants', []):
-                        current_task = session.get('original_request', 'Working on collaboration...')
-                        # Get latest output from this slot
-                        slot_results = session.get('results', {}).get(slot_key, {})
-                        if slot_results:
-                            output = slot_results.get('latest_output', slot_results.get('proposal', ''))
-                        break
-            
-            slots[slot_key] = {
-                'name': slot_config.get('identity', f'LLM {i}'),
-                'error': error,
-                'active': active,
-                'currentTask': current_task,
-                'output': output,
-                'provider': slot_config.get('provider'),
-                'model': slot_config.get('model'),
-                'enabled': slot_config.get('enabled', False)
-            }
-        # If no config, slot will be None and handled by frontend as "not configured"
+        offline = slot_config.get('local_model') or (slot_config.get('provider') or '').lower() == 'mock'
+        error = None
+        if not slot_config.get('enabled'):
+            error = "Slot disabled"
+        elif not slot_config.get('api_key') and not offline:
+            error = "Missing API key"
+        elif not slot_config.get('provider'):
+            error = "Missing provider"
+        elif not slot_config.get('model'):
+            error = "Missing model name"
+        
+        # Check if this slot is currently active in any collaboration
+        session = working.get(name)
+        active = session is not None
+        current_task = None
+        output = None
+        if session is not None:
+            current_task = session.get('user_input') or 'Working on collaboration...'
+            # Latest output from this slot: refinement, then proposal, then the head buffer
+            output = (session.get('refinements', {}).get(name)
+                      or session.get('proposals', {}).get(name))
+            if not output:
+                items, _ = _collab_mgr.heads.head(name, 1)
+                output = items[0]['text'] if items else None
+        
+        breaker = get_breaker(_app_cfg, name)
+        slots[slot_key] = {
+            'name': slot_config.get('identity') or name,
+            'error': error,
+            'active': active,
+            'currentTask': current_task,
+            'output': output,
+            'provider': slot_config.get('provider'),
+            'model': slot_config.get('model'),
+            'enabled': slot_config.get('enabled', False),
+            'breaker': breaker.stats() if breaker else None
+        }
+    
+    # Circuit breaker state for every enabled model, keyed by model name
+    breakers = {}
+    for name, model_config in models.items():
+        breaker = get_breaker(_app_cfg, name) if model_config.get('enabled') else None
+        if breaker is not None:
+            breakers[name] = breaker.stats()
     
     return {
         'active': len(active_sessions) > 0,
         'sessions': len(active_sessions),
-        'slots': slots
+        'slots': slots,
+        'breakers': breakers,
+        'scheduler': _collab_mgr.scheduler.stats(),
+        'consensus': _collab_mgr.consensus_report(),
+        'cascade': _collab_mgr.cascade_report()
     }
 
 @app.get("/collaboration/{session_id}")
 async def get_collaboration_status(session_id: str):
     """Get status of LLM collaboration session"""
+    await _collab_mgr.active_sessions.load(session_id)  # finished sessions may only be on disk
     results = _collab_mgr.get_collaboration_results(session_id)
     vote_counts = _collab_mgr.count_votes(session_id)
     winning_solution = _collab_mgr.get_winning_solution(session_id)
@@ -1068,7 +1171,26 @@ async def get_collaboration_status(session_id: str):
         "refinements_count": len(results.get("refinements", {})),
         "votes_count": len(results.get("votes", {})),
         "vote_counts": vote_counts,
-        "winning_solution": winning_solution
+        "winning_solution": winning_solution,
+        "usage": results.get("usage"),
+        "budget": results.get("budget"),
+        "prompt_tokens": results.get("prompt_tokens"),
+        "prompt_eval": results.get("prompt_eval"),
+        "consensus": results.get("consensus")
+    }
+
+@app.delete("/collaboration/{session_id}")
+async def cancel_collaboration(session_id: str):
+    """Cancel a running collaboration session and free its workers"""
+    cancelled = await _collab_mgr.cancel(session_id)
+    if cancelled is None:
+        raise HTTPException(404, f"Collaboration session {session_id} not found")
+    session = _collab_mgr.get_collaboration_results(session_id)
+    return {
+        "session_id": session_id,
+        "status": session.get("status", "unknown"),
+        "cancelled_workers": cancelled,
+        "usage": session.get("usage")
     }
 
 @app.post("/models/{model_name}/config")
@@ -1093,7 +1215,7 @@ async def update_model_config(model_name: str, payload: Dict[str, Any]):
     
     # Reload config and managers
     _app_cfg = Config.load(CONFIG_PATH)
-    _collab_mgr = CollaborationManager(_app_cfg)
+    _collab_mgr = _reload_collab_mgr()
     
     return {"message": f"Model {model_name} configuration updated", "config": payload}
 
@@ -1119,7 +1241,7 @@ async def update_model_config_system(model_name: str, payload: Dict[str, Any]):
     
     # Reload config and managers
     _app_cfg = Config.load(CONFIG_PATH)
-    _collab_mgr = CollaborationManager(_app_cfg)
+    _collab_mgr = _reload_collab_mgr()
     
     return {"message": f"Model {model_name} configuration updated", "config": payload}
 
@@ -1160,15 +1282,18 @@ def validate_model_config(name: str, config: Dict[str, Any]) -> List[str]:
     if not config.get("model"):
         errors.append("No model name specified")
     
-    if not config.get("endpoint") and not config.get("local_model"):
+    # The built-in mock provider needs neither an endpoint nor credentials
+    offline = config.get("local_model") or (config.get("provider") or "").lower() == "mock"
+    
+    if not config.get("endpoint") and not offline:
         errors.append("No endpoint URL specified for remote model")
     
-    if not config.get("api_key_env") and not config.get("local_model"):
+    if not config.get("api_key_env") and not offline:
         errors.append("No API key environment variable specified for remote model")
     
     # Check if API key environment variable exists
     api_key_env = config.get("api_key_env")
-    if api_key_env and not config.get("local_model"):
+    if api_key_env and not offline:
         if not os.environ.get(api_key_env):
             errors.append(f"Environment variable '{api_key_env}' not set")
     
@@ -1215,14 +1340,17 @@ def _build_memory_context(user_input: str) -> str:
     except Exception:
         return ""
 
+def _dexter_prompt(user_input: str) -> str:
+    """The user's message with memory context prepended, if any"""
+    mem_ctx = _build_memory_context(user_input)
+    return f"{mem_ctx}\n\nUser: {user_input}" if mem_ctx else user_input
+
 async def _get_dexter_response(user_input: str) -> str:
     """Get Dexter's immediate response"""
     try:
         from .dexter_brain.llm import call_slot
         # Prepend memory context if available
-        mem_ctx = _build_memory_context(user_input)
-        prompt = f"{mem_ctx}\n\nUser: {user_input}" if mem_ctx else user_input
-        response = await call_slot(_app_cfg, 'dexter', prompt)
+        response = await call_slot(_app_cfg, 'dexter', _dexter_prompt(user_input))
         return response
     except Exception as e:
         # If we can't call Dexter, return an error message instead of fake data
@@ -4,16 +4,21 @@ export default function ActivityStream() {
   const [paused, setPaused] = useState(false);
   const [error, setError] = useState('');
   const bottomRef = useRef(null);
+  const lastIdRef = useRef(null);
   useEffect(() => {
-    const es = new EventSource('/api/events');
+    if (paused) return;
+    // Resume after the last event seen; EventSource itself resends Last-Event-ID on reconnect
+    const since = lastIdRef.current;
+    const es = new EventSource(since == null ? '/api/events' : `/api/events?since=${since}`);
     es.onmessage = (m) => {
-      if (paused) return;
       try {
         const e = JSON.parse(m.data);
+        if (m.lastEventId) lastIdRef.current = Number(m.lastEventId);
         setEvents(prev => [...prev.slice(-9999), e]);
         setError('');
       } catch {}
     };
+    es.addEventListener('reset', () => { setError('Some events were missed while disconnected'); });
     es.onerror = () => { setError('Event stream disconnected'); };
     return () => es.close();
   }, [paused]);
@@ -980,10 +980,11 @@ export default function ResizableGrid() {
     let reconnectAttempts = 0
     const maxReconnectAttempts = 5
     const baseReconnectDelay = 1000 // 1 second
+    let lastEventId = null // reconnects resume after it, so no events are lost
     
     const connectSSE = () => {
       console.log('🔌 Connecting to SSE...')
-      es = new EventSource('/events')
+      es = new EventSource(lastEventId == null ? '/events' : `/events?since=${lastEventId}`)
       
       es.onopen = () => {
         console.log('✅ SSE connected')
@@ -991,6 +992,7 @@ export default function ResizableGrid() {
       }
       
       es.onmessage = (m) => {
+        if (m.lastEventId) lastEventId = Number(m.lastEventId)
         if (paused) return
         try {
           const event = JSON.parse(m.data)
@@ -1005,6 +1007,10 @@ export default function ResizableGrid() {
         }
       }
       
+      es.addEventListener('reset', () => {
+        console.warn('⚠️ SSE resumed with a gap: some events were evicted before reconnecting')
+      })
+      
       es.onerror = (e) => {
         console.error('❌ SSE error:', e)
         es.close()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark collaboration topologies with the mock provider.
+
+Runs one full session (proposal, refinement, voting) per slot count and
+topology. It reports wall time, LLM calls, prompt tokens in total and for the
+largest single prompt, prompt processing seconds, and voting rounds. Mock
+slots charge ``--prompt-tps`` tokens per second of prompt processing, so
+larger prompts cost time as they would against a real model. As with a
+prefix-caching server, history sent in a conversation is not charged again;
+``--no-conversation`` sends every phase as a fresh prompt instead.
+Usage: python scripts/bench_collaboration.py [--slots 5 10 25] [--panel-size 4] [--no-conversation]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(script_dir), 'backend'))
+
+from dexter_brain.collab_topology import round_count  # noqa: E402
+from dexter_brain.collaboration import CollaborationManager  # noqa: E402
+from dexter_brain.config import Config  # noqa: E402
+
+REQUEST = "Write a skill that summarises the newest file in the downloads folder."
+
+
+def make_config(tmp: str, slots: int, args) -> Config:
+    models = {
+        f"slot_{i}": {
+            "enabled": True, "provider": "mock", "model": "mock",
+            "collaboration_directory": os.path.join(tmp, f"slot_{i}"),
+            "mock": {"seed": i, "latency": {"mean_ms": args.latency_ms},
+                     "prompt_tokens_per_sec": args.prompt_tps},
+        }
+        for i in range(1, slots + 1)
+    }
+    return Config({
+        "models": models,
+        "runtime": {"db_path": os.path.join(tmp, "bench.db"),
+                    "rate_limit": {"enabled": False},  # each mock slot stands in for its own server
+                    "memory_context": {"enabled": False}},
+        "collaboration": {"base_directory": tmp, "early_decision": "off",
+                          "panel_size": args.panel_size, "session_deadline_sec": 0,
+                          "scheduler": {"enabled": False},
+                          "conversation": {"enabled": not args.no_conversation}},
+    })
+
+
+async def run_session(mgr: CollaborationManager, topology: str) -> dict:
+    start = time.perf_counter()
+    sid = await mgr.broadcast_user_input(REQUEST, topology=topology)
+    await mgr.wait_for_collaboration_complete(sid, timeout=600)
+    wall = time.perf_counter() - start
+    session = mgr.active_sessions[sid]
+    if mgr.log is not None:
+        await mgr.log.aclose()
+    prompts = session["prompt_tokens"].values()
+    return {
+        "wall": wall,
+        "calls": session["usage"]["calls"],
+        "tokens": sum(p["total"] for p in prompts),
+        "max": max((p["max"] for p in prompts), default=0),
+        # providers report prompt processing through the slot's conversation
+        "eval": (sum(p["sec"] for p in session["prompt_eval"].values())
+                 if mgr.config.collaboration["conversation"]["enabled"] else None),
+        "rounds": len(session.get("tournament", {}).get("rounds", [])) or 1,
+        "status": session["status"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--slots', type=int, nargs='+', default=[5, 10, 25])
+    ap.add_argument('--panel-size', type=int, default=4)
+    ap.add_argument('--latency-ms', type=float, default=50)
+    ap.add_argument('--prompt-tps', type=float, default=2000, help='mock prompt processing rate (0 = free)')
+    ap.add_argument('--no-conversation', action='store_true', help='send each phase as a fresh prompt')
+    args = ap.parse_args()
+
+    print(f"panel_size={args.panel_size} latency={args.latency_ms:g} ms prompt_tps={args.prompt_tps:g} "
+          f"conversation={'off' if args.no_conversation else 'on'}")
+    print(f"{'slots':>5} {'topology':<10} {'wall s':>8} {'calls':>6} {'prompt tok':>11} "
+          f"{'max prompt':>11} {'eval s':>7} {'rounds':>6}")
+    for slots in args.slots:
+        for topology in ('all', 'tournament'):
+            with tempfile.TemporaryDirectory() as tmp:
+                mgr = CollaborationManager(make_config(tmp, slots, args))
+                result = asyncio.run(run_session(mgr, topology))
+                mgr.active_sessions.close()
+            print(f"{slots:>5} {topology:<10} {result['wall']:>8.2f} {result['calls']:>6} "
+                  f"{result['tokens']:>11} {result['max']:>11} {'-' if result['eval'] is None else format(result['eval'], '.2f'):>7} {result['rounds']:>6}"
+                  + ("" if result['status'] == 'completed' else f"  ({result['status']})"))
+        print(f"{'':>5} expected tournament rounds: {round_count(slots, args.panel_size)}")
+
+
+if __name__ == '__main__':
+    main()
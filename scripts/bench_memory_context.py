@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-call memory-context overhead paid by call_slot.
+
+Compares the old path (open a BrainDB, run its schema DDL, search, close) with
+the shared read-only MemoryContextProvider.
+Usage: python scripts/bench_memory_context.py [--memories 5000] [--calls 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(script_dir), 'backend'))
+
+from dexter_brain.db import BrainDB  # noqa: E402
+from dexter_brain.memory import MemoryContextProvider, _fts_query  # noqa: E402
+
+TOPICS = ("sandbox skill docker error healing vote proposal refinement python "
+          "desktop poem file network memory campaign objective collaboration").split()
+# Realistic memories are mostly unrelated filler with the odd topical word.
+FILLER = [f"w{i:04d}" for i in range(4000)]
+
+PROMPTS = [
+    "User request: write a poem and save it to my desktop, please.",
+    "Analyze the docker sandbox error and propose a healing fix.",
+    "Vote for the BEST solution. Respond with just: VOTE: <llm_name>",
+    "Create a python skill that lists files in the downloads folder.",
+]
+
+
+def seed(path: str, count: int):
+    rng = random.Random(42)
+    db = BrainDB(db_path=path)
+    for i in range(count):
+        words = rng.sample(FILLER, 20) + [rng.choice(TOPICS)]
+        db.conn.execute(
+            "INSERT INTO memories (type, content, metadata, created_ts, accessed_ts, tags) "
+            "VALUES ('stm', ?, '{}', ?, ?, '[]')",
+            (f"note {i}: " + " ".join(words), time.time(), time.time()),
+        )
+    db.commit()
+    db.close()
+
+
+def legacy_call(path: str, prompt: str) -> str:
+    # What call_slot used to do on every invocation. The raw prompt is made
+    # FTS-safe here so the benchmark measures cost rather than syntax errors.
+    db = BrainDB(db_path=path)
+    try:
+        memories = db.search_memories(_fts_query(prompt), limit=5)
+        return "\n".join(m.get('content', '') for m in memories)
+    finally:
+        db.close()
+
+
+def timed(fn, calls: int):
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(PROMPTS[i % len(PROMPTS)])
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<10} mean={statistics.mean(samples):8.3f} ms  "
+          f"p50={statistics.median(samples):8.3f} ms  p95={p95:8.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--memories', type=int, default=5000)
+    ap.add_argument('--calls', type=int, default=200)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed(path, args.memories)
+        provider = MemoryContextProvider(path)
+        provider.context_for(PROMPTS[0])  # warm: one-time schema check
+
+        print(f"{args.memories} memories, {args.calls} calls")
+        before = timed(lambda p: legacy_call(path, p), args.calls)
+        after = timed(provider.context_for, args.calls)
+        report('before', before)
+        report('after', after)
+        print(f"speedup    x{statistics.mean(before) / statistics.mean(after):.1f}")
+        provider.close()
+
+
+if __name__ == '__main__':
+    main()
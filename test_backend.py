@@ -1,8 +1,10 @@
+import asyncio
 import os
 import pytest
 
 from backend.dexter_brain.config import Config
 from backend.dexter_brain.collaboration import CollaborationManager
+from backend.dexter_brain.events import EventBus, SubscriptionClosed
 from backend.dexter_brain.utils import get_config_path
 from fastapi.testclient import TestClient
 
@@ -57,3 +59,214 @@ def test_auth_and_history(monkeypatch):
     assert hist.status_code == 200
     assert "interactions" in hist.json()
 
+
+
+def test_collaboration_head_serves_buffer_with_etag(monkeypatch):
+    downloads_dir = "/tmp/dexter_downloads"
+    os.makedirs(downloads_dir, exist_ok=True)
+    monkeypatch.setenv("DEXTER_CONFIG_FILE", get_config_path())
+    monkeypatch.setenv("DEXTER_DOWNLOADS_DIR", downloads_dir)
+
+    import backend.main as main
+    slot = next((name for name, m in main._app_cfg.models.items() if m.get("enabled")), None)
+    if slot is None:
+        pytest.skip("no enabled slot configured")
+    client = TestClient(main.app)
+
+    main._collab_mgr.heads.push(slot, {"content": "hello", "session": "s1", "phase": "proposal", "timestamp": 1.0})
+    first = client.get(f"/api/collaboration/head?slot={slot}&n=1")
+    assert first.status_code == 200 and first.json()["items"][0]["text"] == "hello"
+    etag = first.headers["etag"]
+
+    again = client.get(f"/api/collaboration/head?slot={slot}&n=1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    main._collab_mgr.heads.push(slot, {"content": "newer", "session": "s1", "phase": "vote", "timestamp": 2.0})
+    changed = client.get(f"/api/collaboration/head?slot={slot}&n=1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["items"][0]["text"] == "newer"
+
+
+def test_collaboration_status_reports_active_slot_task_and_output(monkeypatch):
+    downloads_dir = "/tmp/dexter_downloads"
+    os.makedirs(downloads_dir, exist_ok=True)
+    monkeypatch.setenv("DEXTER_CONFIG_FILE", get_config_path())
+    monkeypatch.setenv("DEXTER_DOWNLOADS_DIR", downloads_dir)
+
+    import time
+    import backend.main as main
+    slot = next((name for name, m in main._app_cfg.models.items() if m and name != "dexter"), None)
+    if slot is None:
+        pytest.skip("no collaboration slot configured")
+    slot_key = f"slot_{slot[4:]}" if slot.startswith("llm_") and slot[4:].isdigit() else slot
+    session = {"id": "status-test", "user_input": "sort my photos", "started_ts": time.time(),
+               "llms": [slot], "proposals": {slot: "first draft"}, "refinements": {slot: "second draft"}}
+    monkeypatch.setitem(main._collab_mgr.active_sessions, "status-test", session)
+
+    status = TestClient(main.app).get("/collaboration/status").json()
+    entry = status["slots"][slot_key]
+    assert entry["active"] and entry["currentTask"] == "sort my photos"
+    assert entry["output"] == "second draft"
+
+
+def test_chat_stream_asks_clarifying_question_instead_of_calling_dexter(monkeypatch):
+    downloads_dir = "/tmp/dexter_downloads"
+    os.makedirs(downloads_dir, exist_ok=True)
+    monkeypatch.setenv("DEXTER_CONFIG_FILE", get_config_path())
+    monkeypatch.setenv("DEXTER_DOWNLOADS_DIR", downloads_dir)
+
+    import json
+    import backend.main as main
+    if main.validate_model_config("dexter", main._app_cfg.models.get("dexter", {})):
+        pytest.skip("dexter slot not configured")
+
+    class Autonomy:
+        async def process_autonomous_request(self, msg, history):
+            return {"autonomous_action": True, "needs_clarification": True,
+                    "clarifying_question": "Which folder?", "skill_name": "organizer"}
+
+    class Memories:
+        def __init__(self):
+            self.added = []
+
+        def get_memories(self, kind, limit=10):
+            return []
+
+        def add_memory(self, content, **kwargs):
+            self.added.append(content)
+
+    async def broadcast(msg, topology=None):
+        return "s1"
+
+    def no_stream(*args, **kwargs):
+        raise AssertionError("Dexter must not be called while clarification is pending")
+
+    memories = Memories()
+    monkeypatch.setattr(main, "_autonomy_mgr", Autonomy())
+    monkeypatch.setattr(main, "_skills_mgr", None)
+    monkeypatch.setattr(main, "_db", memories)
+    monkeypatch.setattr(main, "stream_slot", no_stream)
+    monkeypatch.setattr(main._collab_mgr, "broadcast_user_input", broadcast)
+
+    resp = TestClient(main.app).post("/chat/stream", json={"message": "tidy my files"})
+    events = [json.loads(line[6:]) for line in resp.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events] == ["session", "done"]
+    assert events[-1]["reply"] == "Which folder?"
+    assert memories.added == ["User: tidy my files\nDexter: Which folder?\nAutonomous Action: organizer"]
+
+
+def test_llm_chat_stream_relays_tokens_with_time_to_first_token(monkeypatch):
+    downloads_dir = "/tmp/dexter_downloads"
+    os.makedirs(downloads_dir, exist_ok=True)
+    monkeypatch.setenv("DEXTER_CONFIG_FILE", get_config_path())
+    monkeypatch.setenv("DEXTER_DOWNLOADS_DIR", downloads_dir)
+
+    import json
+    import backend.main as main
+    slot = {"enabled": True, "provider": "mock", "model": "m",
+            "mock": {"latency": {"mean_ms": 1}, "tokens_per_sec": 1000, "responses": {"chat": "one two three"}}}
+    resp = TestClient(main.app).post("/llm/chat/stream", json={"message": "hi", "model": "probe", "config": slot})
+    events = [json.loads(line[6:]) for line in resp.text.splitlines() if line.startswith("data: ")]
+    assert "".join(e["text"] for e in events if e["type"] == "token") == "one two three"
+    assert events[-1]["type"] == "done" and events[-1]["response"] == "one two three"
+    assert events[-1]["ttft_ms"] is not None
+
+
+def test_event_bus_fans_out_without_blocking_and_applies_overflow_policies():
+    async def run():
+        bus = EventBus({"queue_size": 2})
+        assert bus.publish({"event": "nobody.listening"}) == 0  # no subscribers: nothing queued
+
+        oldest = bus.subscribe("oldest")
+        newest = bus.subscribe("newest", overflow="drop_newest")
+        strict = bus.subscribe("strict", overflow="disconnect")
+        for i in range(3):
+            bus.publish({"event": "tick", "n": i})
+
+        first = await oldest.get()
+        assert [first.event["n"], (await oldest.get()).event["n"]] == [1, 2]
+        assert [(await newest.get()).event["n"], (await newest.get()).event["n"]] == [0, 1]
+        with pytest.raises(SubscriptionClosed):
+            await strict.get()
+        assert first.data.startswith("{") and bus.serialized == 4  # one encoding per event
+
+        stats = bus.stats()
+        assert [s["name"] for s in stats["subscribers"]] == ["oldest", "newest"]
+        assert stats["disconnected_on_overflow"] == 1 and stats["dropped"] == 1 + 1 + 3
+        assert stats["subscribers"][0]["max_lag"] == 2 and stats["subscribers"][0]["lag"] == 0
+
+        waiter = asyncio.create_task(oldest.get())
+        await asyncio.sleep(0)
+        bus.publish({"event": "wake"})
+        assert (await asyncio.wait_for(waiter, 1)).event["event"] == "wake"
+        with pytest.raises(ValueError):
+            bus.subscribe(overflow="block")
+
+    asyncio.run(run())
+
+
+def test_emit_soon_holds_its_task_until_the_event_is_published():
+    from backend.dexter_brain import events
+
+    async def run():
+        sub = events.bus.subscribe("soon")
+        try:
+            task = events.emit_soon({"event": "later"})
+            assert task in events._emit_tasks
+            await task
+            assert task not in events._emit_tasks
+            return (await sub.get()).event["event"]
+        finally:
+            sub.close()
+
+    assert asyncio.run(run()) == "later"
+
+
+def test_event_ids_replay_from_ring_and_catch_up_in_pages():
+    from fastapi import FastAPI
+    from backend.dexter_brain import events, events_api
+
+    bus = EventBus({"replay_max_events": 5})
+    for i in range(8):
+        bus.publish({"event": "tick", "n": i})
+    assert bus.last_id == 8 and bus.oldest_id == 4
+
+    backlog, complete = bus.replay(5)
+    assert [e.id for e in backlog] == [6, 7, 8] and complete
+    assert [e.event["n"] for e in backlog] == [5, 6, 7] and backlog[0].frame.startswith("id: 6\n")
+    backlog, complete = bus.replay(1)  # 2 and 3 were evicted
+    assert [e.id for e in backlog] == [4, 5, 6, 7, 8] and not complete
+    backlog, complete = bus.replay(99)  # ahead of this process: ids restarted
+    assert len(backlog) == 5 and not complete
+    assert bus.replay(8) == ([], True)
+
+    async def resume():
+        sub = bus.subscribe()
+        backlog, _ = bus.replay(6)
+        stream = events_api._stream(sub, backlog)
+        frames = [await stream.__anext__(), await stream.__anext__()]
+        bus.publish({"event": "live"})
+        frames.append(await stream.__anext__())
+        await stream.aclose()
+        return frames
+
+    frames = asyncio.run(resume())
+    assert [f.split("\n")[0] for f in frames] == ["id: 7", "id: 8", "id: 9"]
+
+    app = FastAPI()
+    app.include_router(events_api.router)
+    original, events.bus = events.bus, bus
+    try:
+        client = TestClient(app)
+        first = client.get("/events/catchup?since=0&limit=3").json()
+        assert [e["event_id"] for e in first["events"]] == [5, 6, 7]
+        assert not first["complete"] and first["more"] and first["last_id"] == 7
+        rest = client.get(f"/events/catchup?since={first['last_id']}").json()
+        assert [e["event_id"] for e in rest["events"]] == [8, 9] and rest["complete"] and not rest["more"]
+
+        ring_bytes = bus.stats()["replay"]["bytes"]
+        events.configure_event_bus(type("Cfg", (), {"events": {"replay_max_events": 5}})())
+        assert bus.stats()["replay"]["bytes"] == ring_bytes  # re-applying the bounds counts nothing twice
+        events.configure_event_bus(type("Cfg", (), {"events": {"replay_max_events": 2}})())
+        assert bus.oldest_id == 8 and bus.stats()["replay"]["bytes"] == sum(len(e.frame) for e in bus._ring)
+    finally:
+        events.bus = original
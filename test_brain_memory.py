@@ -24,3 +24,44 @@ def test_knowledge_graph_nodes_and_edges():
     edge = kg.add_edge(n1["id"], n2["id"], "related")
     neighbors = kg.get_neighbors(n1["id"])
     assert edge in neighbors
+
+
+def test_memory_context_provider_reuses_connections(tmp_path):
+    from backend.dexter_brain.memory import MemoryContextProvider
+
+    db_path = str(tmp_path / "brain.db")
+    db = BrainDB(db_path)
+    db.add_memory("the docker sandbox needs a healthcheck")
+    db.add_memory("poems are saved to the desktop")
+    db.close()
+
+    provider = MemoryContextProvider(db_path, pool_size=1)
+    # Punctuation in prompts must not break the FTS query
+    ctx = provider.context_for("Fix the sandbox, please: it's failing?")
+    assert "healthcheck" in ctx
+    assert provider.context_for("Write poems!") == "poems are saved to the desktop"
+    stats = provider.stats()
+    assert stats["open_connections"] == 1
+    assert stats["errors"] == 0
+    provider.close()
+
+
+def test_call_slot_looks_up_memory_context_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    from backend.dexter_brain.config import Config
+    from backend.dexter_brain.llm import call_slot
+
+    class Provider:
+        threads = []
+
+        def context_for(self, prompt):
+            self.threads.append(threading.current_thread())
+            return "remembered"
+
+    cfg = Config({"models": {"m": {"enabled": True, "provider": "mock", "model": "m",
+                                   "mock": {"latency": {"mean_ms": 1}, "responses": {"chat": "ok"}}}}})
+    provider = Provider()
+    assert asyncio.run(call_slot(cfg, "m", "hello", memory=provider, use_cache=False)) == "ok"
+    assert provider.threads and provider.threads[0] is not threading.main_thread()
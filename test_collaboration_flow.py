@@ -0,0 +1,673 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.dexter_brain.circuit_breaker import CircuitBreaker, reset_breakers
+from backend.dexter_brain.mock_provider import reset_attempts
+from backend.dexter_brain.collaboration import CollaborationManager
+from backend.dexter_brain.collab_topology import group_winner, round_count, split_groups
+from backend.dexter_brain.consensus import code_hash, find_clusters
+from backend.dexter_brain.cascade import parse_confidence, slot_tier
+from backend.dexter_brain.config import Config
+
+
+def _mock_slot(**mock):
+    return {"enabled": True, "provider": "mock", "model": "m",
+            "mock": {"latency": {"mean_ms": 1}, **mock}}
+
+
+def _config(tmp_path, **models):
+    return Config({
+        "models": {name: {**slot, "collaboration_directory": str(tmp_path / name)}
+                   for name, slot in models.items()},
+        "runtime": {"db_path": str(tmp_path / "brain.db")},
+        "collaboration": {"base_directory": str(tmp_path)},
+    })
+
+
+def test_circuit_breaker_opens_and_recovers_through_half_open():
+    breaker = CircuitBreaker("slot", {"failure_threshold": 2, "open_sec": 0.05})
+    breaker.record_failure(0.1, "boom")
+    assert breaker.allow()
+    breaker.record_failure(0.1, "boom")
+    assert breaker.current_state() == "open" and not breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()  # the half-open probe
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success(0.01)
+    assert breaker.current_state() == "closed"
+
+
+def test_collaboration_skips_slots_with_open_circuits(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(
+        tmp_path,
+        analyst=_mock_slot(vote_for="analyst"),
+        engineer=_mock_slot(vote_for="analyst"),
+        broken={**_mock_slot(error_rate=1.0), "circuit_breaker": {"failure_threshold": 1}},
+    )
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        first = await mgr.broadcast_user_input("build a thing")
+        assert await mgr.wait_for_collaboration_complete(first, timeout=10)
+        second = await mgr.broadcast_user_input("build another thing")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert "broken" in mgr.active_sessions[first]["errors"]
+    assert mgr.count_votes(first) == {"analyst": 2}
+    assert mgr.active_sessions[second]["llms"] == ["analyst", "engineer"]
+    assert mgr.active_sessions[second]["skipped_llms"] == ["broken"]
+    reset_breakers()
+    reset_attempts()
+
+
+def test_phase_barriers_release_on_quorum_without_waiting_for_stragglers(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(
+        tmp_path,
+        a=_mock_slot(vote_for="a"),
+        b=_mock_slot(vote_for="a"),
+        slow=_mock_slot(vote_for="a", latency={"mean_ms": 400}),
+    )
+    cfg.collaboration.update({"phase_quorum": 0.5, "early_decision": "off",
+                              "phase_deadline_sec": {"proposal": 0.05, "refinement": 0.05}})
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        sid = await mgr.broadcast_user_input("quick one")
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        return sid
+
+    session = mgr.active_sessions[asyncio.run(run())]
+    timings = session["phase_timings"]
+    assert timings["proposal"]["released_by"] == "quorum_deadline"
+    assert timings["proposal"]["arrived"] == ["a", "b"]
+    assert timings["proposal"]["phase_sec"] < 0.4
+    assert set(session["barrier_waits"]["slow"]) == {"proposal", "refinement"}
+    assert mgr.count_votes(session["id"]) == {"a": 3}
+
+
+def test_wait_for_collaboration_wakes_on_last_vote_and_cancels_on_timeout(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(tmp_path, a=_mock_slot(vote_for="a"), b=_mock_slot(vote_for="a"),
+                  stuck=_mock_slot(latency={"mean_ms": 5000}))
+    cfg.collaboration.update({"early_decision": "off",
+                              "phase_deadline_sec": {"proposal": 0.01, "refinement": 0.01}})
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        sid = await mgr.broadcast_user_input("hurry")
+        start = time.monotonic()
+        done = await mgr.wait_for_collaboration_complete(sid, timeout=0.3)
+        waited = time.monotonic() - start
+        tasks = list(mgr._runtime.get(sid, {}).get("tasks", {}).values())
+        await asyncio.sleep(0)
+        return sid, done, waited, tasks
+
+    sid, done, waited, tasks = asyncio.run(run())
+    assert not done and waited < 1.0
+    assert mgr.active_sessions[sid]["status"] == "timed_out"
+    assert set(mgr.active_sessions[sid]["votes"]) == {"a", "b"}
+    assert sid not in mgr._runtime and tasks and all(t.cancelled() for t in tasks)
+
+    cfg.models["stuck"]["enabled"] = False
+
+    async def run_fast():
+        sid = await mgr.broadcast_user_input("again")
+        start = time.monotonic()
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=5)
+        return sid, time.monotonic() - start
+
+    sid, waited = asyncio.run(run_fast())
+    assert mgr.active_sessions[sid]["status"] == "completed" and waited < 0.5
+
+
+def test_sessions_with_the_same_request_share_each_slots_proposal_call(tmp_path):
+    from backend.dexter_brain.llm import get_singleflight_stats
+
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(tmp_path, a=_mock_slot(vote_for="a", latency={"mean_ms": 50}),
+                  b=_mock_slot(vote_for="a", latency={"mean_ms": 50}))
+    mgr = CollaborationManager(cfg)
+    before = get_singleflight_stats()["coalesced"]
+
+    async def run():
+        chat, campaign = await asyncio.gather(mgr.broadcast_user_input("same ask"),
+                                              mgr.broadcast_user_input("same ask", priority="campaign"))
+        for sid in (chat, campaign):
+            assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        return chat, campaign
+
+    chat, campaign = asyncio.run(run())
+    assert get_singleflight_stats()["coalesced"] - before >= 2  # one proposal call per slot, not per session
+    first, second = mgr.active_sessions[chat], mgr.active_sessions[campaign]
+    assert first["proposals"] == second["proposals"]
+
+
+def test_votes_from_dropped_voters_do_not_complete_the_session(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    mgr = CollaborationManager(_config(tmp_path, a=_mock_slot(), b=_mock_slot(), c=_mock_slot()))
+    # a voted, then failed and was dropped; c has not voted yet
+    mgr.active_sessions["s"] = {"id": "s", "status": "active", "llms": ["a", "b", "c"],
+                                "errors": {"a": "boom"}, "votes": {"a": "VOTE: b", "b": "VOTE: b"}}
+    assert mgr.expected_voters("s") == {"b", "c"}
+    assert not mgr._check_complete("s") and mgr.active_sessions["s"]["status"] == "active"
+
+    mgr.active_sessions["s"]["votes"]["c"] = "VOTE: b"
+    assert mgr._check_complete("s") and mgr.active_sessions["s"]["status"] == "completed"
+
+
+def test_majority_completes_voting_early_and_cancels_outstanding_votes(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(tmp_path, a=_mock_slot(vote_for="a"), b=_mock_slot(vote_for="a"), c=_mock_slot(vote_for="b"),
+                  d=_mock_slot(vote_for="a"), slow=_mock_slot(vote_for="c", latency={"mean_ms": 300}))
+    cfg.collaboration.update({"early_decision": "unreachable",
+                              "phase_deadline_sec": {"proposal": 0.01, "refinement": 0.01}})
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        sid = await mgr.broadcast_user_input("decide fast")
+        start = time.monotonic()
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=5)
+        waited = time.monotonic() - start
+        await asyncio.sleep(0.01)
+        return sid, waited
+
+    sid, waited = asyncio.run(run())
+    session = mgr.active_sessions[sid]
+    assert waited < 0.3 and session["status"] == "completed"
+    decision = session["early_decision"]
+    assert decision["leader"] == "a" and "slow" in decision["votes_skipped"]  # c may be skipped too
+    assert "slow" not in session["votes"] and sid not in mgr._runtime
+    assert mgr.count_votes(sid)["a"] == 3 and mgr.get_winning_solution(sid)["winner"] == "a"
+
+
+def test_session_store_spills_finished_sessions_and_reloads_them(tmp_path):
+    from backend.dexter_brain.session_store import SessionStore
+
+    store = SessionStore(str(tmp_path / "sessions.db"), max_sessions=2)
+    for i in range(4):
+        sid = f"s{i}"
+        store[sid] = {"id": sid, "user_input": f"req {i}", "started_ts": time.time(),
+                      "status": "completed", "proposals": {"a": "x" * 1000}}
+        store.mark_done(sid, vote_results={"a": 1})
+    store["running"] = {"id": "running", "status": "active"}
+
+    assert len(store) == 2 and "running" in list(store)
+    assert store.stats()["evictions"] == 3 and store.stats()["spills"] == 4
+    assert "s0" not in store and store.get("s0") is None  # lookups never block on the database
+    reloaded = asyncio.run(store.load("s0"))
+    assert reloaded["proposals"]["a"] == "x" * 1000 and store.stats()["reloads"] == 1
+    assert "s0" in store and asyncio.run(store.load("missing")) is None
+    store.close()
+
+
+def test_collaboration_log_batches_rotates_and_rebuilds_index(tmp_path):
+    from backend.dexter_brain.collab_log import CollaborationLog
+
+    dir_for = lambda slot: str(tmp_path / slot)
+    log = CollaborationLog(dir_for, {"segment_max_bytes": 200, "flush_interval_sec": 0.01})
+
+    async def run():
+        for i in range(6):
+            for phase in ("proposal", "vote"):
+                log.append("a", {"timestamp": time.time(), "llm": "a", "phase": phase,
+                                 "session": f"s{i}", "content": f"{phase} {i} " + "x" * 100})
+        assert log.read_entry("a", "s0_a_proposal.json")["content"].startswith("proposal 0")  # still queued
+        await log.aclose()
+
+    asyncio.run(run())
+    stats = log.stats()
+    assert stats["pending"] == 0 and stats["batches"] >= 1 and stats["rotations"] == 0
+
+    # Appends outside a loop write synchronously and roll over to a new segment
+    log.append("a", {"timestamp": time.time(), "llm": "a", "phase": "refinement", "session": "s0",
+                     "content": "refined"})
+    assert log.stats()["rotations"] == 1
+
+    reopened = CollaborationLog(dir_for, {"segment_max_bytes": 200})
+    lock_free_during_load = []
+    load = reopened._load
+
+    def checked_load(*args):
+        # Another thread can take the index lock while the segment indexes are read
+        probe = threading.Thread(target=lambda: lock_free_during_load.append(
+            reopened._lock.acquire(timeout=1) and (reopened._lock.release() or True)))
+        probe.start()
+        probe.join()
+        return load(*args)
+
+    reopened._load = checked_load
+    reopened.open_slots(["a"])
+    assert lock_free_during_load == [True]
+    names = [e["name"] for e in reopened.list_entries("a")]
+    assert len(names) == 13 and names[0] == "s0_a_refinement.json"
+    assert [r["phase"] for r in reopened.read_session("s0", ["a"])] == ["proposal", "vote", "refinement"]
+    assert reopened.recent("a", 1)[0]["content"] == "refined"
+
+
+def test_collaboration_log_compaction_keeps_latest_records(tmp_path):
+    from backend.dexter_brain.collab_log import CollaborationLog
+
+    dir_for = lambda slot: str(tmp_path / slot)
+    log = CollaborationLog(dir_for, {"segment_max_bytes": 1, "compression": "none"})
+    now = time.time()
+    log.append("a", {"timestamp": now - 40 * 86400, "llm": "a", "phase": "vote", "session": "old", "content": "v"})
+    log.append("a", {"timestamp": now, "llm": "a", "phase": "proposal", "session": "s1", "content": "first"})
+    log.append("a", {"timestamp": now + 1, "llm": "a", "phase": "proposal", "session": "s1", "content": "second"})
+    log.append("a", {"timestamp": now + 2, "llm": "a", "phase": "vote", "session": "s2", "content": "v"})
+
+    assert log.compact("a") == 1  # s1's latest proposal; the active segment is left alone
+    assert log.stats()["records_expired"] == 1
+    assert log.read_entry("a", "s1_a_proposal.json")["content"] == "second"
+    assert log.read_entry("a", "old_a_vote.json") is None
+
+    reopened = CollaborationLog(dir_for, {"compression": "none"})
+    assert {e["name"] for e in reopened.list_entries("a")} == {"s1_a_proposal.json", "s2_a_vote.json"}
+    assert reopened.read_entry("a", "s1_a_proposal.json")["content"] == "second"
+
+
+def test_collaboration_log_reads_while_a_write_or_compaction_is_in_flight(tmp_path):
+    from backend.dexter_brain.collab_log import CollaborationLog
+
+    log = CollaborationLog(lambda slot: str(tmp_path / slot), {"segment_max_bytes": 150, "compression": "none"})
+    for i in range(4):
+        log.append("a", {"timestamp": time.time(), "llm": "a", "phase": "proposal", "session": f"s{i}",
+                         "content": f"draft {i} " + "x" * 100})
+
+    def reads_while_paused(work):
+        entered, gate = threading.Event(), threading.Event()
+        append_block = log._append_block
+
+        def paused(*args):
+            entered.set()
+            gate.wait(5)
+            return append_block(*args)
+
+        log._append_block = paused
+        worker = threading.Thread(target=work)
+        worker.start()
+        try:
+            assert entered.wait(5)
+            start = time.perf_counter()
+            assert log.read_entry("a", "s0_a_proposal.json")["content"].startswith("draft 0")
+            assert len(log.list_entries("a")) >= 4
+            assert time.perf_counter() - start < 1  # the index lock is not held across disk I/O
+        finally:
+            gate.set()
+            worker.join()
+            log._append_block = append_block
+
+    reads_while_paused(lambda: log._write_batch([("a", {"timestamp": time.time(), "llm": "a", "phase": "vote",
+                                                         "session": "s4", "content": "VOTE: a"})]))
+    reads_while_paused(lambda: log.compact("a"))
+    assert log.stats()["compactions"] == 1
+    assert [log.read_entry("a", f"s{i}_a_proposal.json")["content"][:7] for i in range(4)] == \
+        [f"draft {i}" for i in range(4)]
+
+
+def test_collaboration_files_are_served_from_the_log(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(tmp_path, a=_mock_slot(vote_for="a"), b=_mock_slot(vote_for="a"))
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        sid = await mgr.broadcast_user_input("log it")
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        await mgr.log.aclose()
+        return sid
+
+    sid = asyncio.run(run())
+    names = {f["name"] for f in mgr.get_model_collaboration_files("a")}
+    assert {f"{sid}_a_proposal.json", f"{sid}_a_refinement.json", f"{sid}_a_vote.json"} <= names
+    assert not list((tmp_path / "a").glob("*.json"))
+    assert '"phase": "vote"' in mgr.read_collaboration_file("a", f"{sid}_a_vote.json")
+
+
+def test_slot_heads_keep_newest_outputs_and_warm_behind_them():
+    from backend.dexter_brain.slot_heads import SlotHeads
+
+    heads = SlotHeads(size=3)
+    heads.push("a", {"content": "live", "session": "s9", "phase": "proposal"})
+    heads.warm("a", [{"content": f"old {i}", "session": f"s{i}"} for i in range(5)])
+    items, etag = heads.head("a", n=5)
+    assert [i["text"] for i in items] == ["live", "old 0", "old 1"]
+    assert heads.head("a", n=5)[1] == etag
+    heads.push("a", {"content": "newer"})
+    assert heads.head("a", n=1)[0][0]["text"] == "newer" and heads.head("a", n=5)[1] != etag
+    assert heads.head("missing")[0] == []
+
+
+def test_collaboration_index_pages_filters_and_tracks_writes(tmp_path):
+    from backend.dexter_brain.collab_index import CollaborationIndex
+
+    slot_dir = tmp_path / "a"
+    slot_dir.mkdir()
+    for i, phase in enumerate(["proposal", "vote", "error", "refinement", "proposal"]):
+        (slot_dir / f"s{i}_a_{phase}.json").write_text("{}")
+    index = CollaborationIndex(lambda slot: str(tmp_path / slot))
+    asyncio.run(index.ensure(["a"]))
+    assert index.counters["scans"] == 1 and index.stats()["slots"] == {"a": 5}
+
+    total, page = index.files("a", order="priority", limit=2)
+    assert total == 5 and page[0]["type"] == "error" and page[0]["priority"] == "high"
+    assert index.files("a", types=["proposal"])[0] == 2
+    assert [f["name"] for f in index.files("a", order="priority", offset=4)[1]] == ["s1_a_vote.json"]
+
+    index.record("a", "s9_a_vote.json", 10, time.time() + 60, logged=True)
+    assert index.files("a", limit=1)[1][0]["name"] == "s9_a_vote.json"
+
+    index.refresh(["a"])
+    assert index.counters["scans_skipped"] == 1  # directory unchanged
+    (slot_dir / "s0_a_proposal.json").unlink()
+    index.scan("a", force=True)
+    assert index.files("a")[0] == 5 and index.files("a", types=["error", "vote"])[0] == 3
+
+
+def test_jsonl_tail_reads_backwards_and_only_new_bytes(tmp_path):
+    import json
+
+    from backend.dexter_brain.io import JsonlTail, append_jsonl
+
+    path = str(tmp_path / "dev_seed.jsonl")
+    for i in range(500):
+        append_jsonl(path, {"i": i, "text": "y" * 50})
+    tails = JsonlTail(block_size=256)
+
+    assert [r["i"] for r in tails.tail(path, 3)] == [497, 498, 499]
+    assert tails.tail(path, 3)[-1]["i"] == 499 and tails.stats()["hits"] == 1
+
+    append_jsonl(path, {"i": 500})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"i": 501}))  # no newline yet
+    assert [r["i"] for r in tails.tail(path, 2)] == [500, 501]
+    assert tails.stats()["appends"] == 1
+
+    assert [r["i"] for r in tails.tail(path, 5)] == [497, 498, 499, 500, 501]  # wider window rebuilds
+    assert tails.stats()["rebuilds"] == 2
+
+
+def test_sessions_cancel_on_request_deadline_and_token_budget(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(tmp_path, a=_mock_slot(latency={"mean_ms": 2000}), b=_mock_slot(latency={"mean_ms": 2000}),
+                  fast=_mock_slot(vote_for="fast"))
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        cancelled = await mgr.broadcast_user_input("stop me")
+        await asyncio.sleep(0.05)
+        assert await mgr.cancel(cancelled) == 3
+        assert await mgr.cancel("nope") is None
+
+        late = await mgr.broadcast_user_input("too slow", deadline_sec=0.1)
+        assert not await mgr.wait_for_collaboration_complete(late, timeout=5)
+
+        cfg.models["a"]["enabled"] = cfg.models["b"]["enabled"] = False
+        spendy = await mgr.broadcast_user_input("cheap please", max_tokens=50)
+        assert not await mgr.wait_for_collaboration_complete(spendy, timeout=5)
+        await asyncio.sleep(0.01)
+        return cancelled, late, spendy
+
+    cancelled, late, spendy = asyncio.run(run())
+    assert mgr.active_sessions[cancelled]["status"] == "cancelled"
+    assert mgr.active_sessions[late]["status"] == "deadline_exceeded"
+    session = mgr.active_sessions[spendy]
+    assert session["status"] == "budget_exceeded" and session["usage"]["tokens"] > 50
+    assert not session["votes"] and not mgr._runtime
+
+
+def test_scheduler_admits_by_priority_caps_slots_and_sheds_low_priority():
+    from backend.dexter_brain.collab_scheduler import CollaborationOverloaded, CollaborationScheduler
+
+    sched = CollaborationScheduler({"max_concurrent_sessions": 2, "max_inflight_per_slot": 1,
+                                    "max_queued": {"healing": 1}, "max_queued_total": 3})
+    order = []
+
+    async def run():
+        first = await sched.admit("interactive", ["a"])
+        second = await sched.admit("healing", ["b"])
+
+        async def queued(priority, slots):
+            ticket = await sched.admit(priority, slots)
+            order.append(priority)
+            return ticket
+
+        heal = asyncio.create_task(queued("healing", ["a"]))
+        skill = asyncio.create_task(queued("skill_generation", ["a"]))
+        await asyncio.sleep(0)
+        try:
+            await sched.admit("healing", ["c"])  # healing queue already full
+        except CollaborationOverloaded as e:
+            assert e.reason == "queue full"
+        chat = asyncio.create_task(queued("interactive", ["a"]))
+        camp = asyncio.create_task(queued("campaign", ["c"]))
+        await asyncio.sleep(0)
+        assert sched.stats()["queued"] == 3  # the queued healing request was displaced
+
+        first.release()  # frees a session and slot a: chat goes first
+        await asyncio.sleep(0)
+        (await chat).release()
+        await asyncio.sleep(0)
+        second.release()
+        for task in (camp, skill):
+            (await task).release()
+        return heal
+
+    heal = asyncio.run(run())
+    assert isinstance(heal.exception(), CollaborationOverloaded)
+    assert order == ["interactive", "campaign", "skill_generation"]
+    stats = sched.stats()
+    assert stats["running"] == 0 and stats["inflight"] == {}
+    assert stats["classes"]["healing"]["shed"] == 2 and stats["classes"]["interactive"]["admitted"] == 2
+
+
+def test_peer_outputs_are_digested_to_fit_small_context_windows(tmp_path):
+    from backend.dexter_brain.prompt_budget import digest
+
+    text = "## Analysis\n" + "word " * 400 + "\n```python\n" + "x = 1\n" * 200 + "```\nConfidence: HIGH\n"
+    short, truncated = digest(text, 150)
+    assert truncated and len(short) // 4 <= 150
+    assert "## Analysis" in short and "```python" in short and "Confidence: HIGH" in short
+
+    items = "\n".join(f"Item {chr(65 + i // 26)}{chr(97 + i % 26)}: value {i}" for i in range(52))
+    short, truncated = digest(items, 64)
+    assert truncated and len(short) // 4 <= 64
+    assert short.startswith("Item Aa: value 0") and "Item Ab: value 1" in short
+
+    reset_breakers()
+    reset_attempts()
+    long_answer = {"proposal": "## Plan\n" + "detail " * 600, "refinement": "## Plan\n" + "better " * 600}
+    slots = {name: {**_mock_slot(vote_for="a", responses=long_answer), "params": {"num_ctx": 2048}}
+             for name in ("a", "b", "c", "d")}
+    cfg = _config(tmp_path, **slots)
+    cfg.collaboration["early_decision"] = "off"
+    cfg.collaboration["consensus"]["enabled"] = False  # identical proposals would skip refinement
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        sid = await mgr.broadcast_user_input("big answers")
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        await asyncio.sleep(0.01)
+        return sid
+
+    session = mgr.active_sessions[asyncio.run(run())]
+    stats = session["prompt_tokens"]
+    assert set(stats) == {"proposal", "refinement", "vote"} and stats["vote"]["calls"] == 4
+    assert stats["refinement"]["max"] < 2048 and stats["refinement"]["truncated_peers"] == 12
+    assert session["digest_cache"]["hits"] > 0
+
+
+def test_tournament_topology_votes_in_panels_whose_winners_advance(tmp_path):
+    assert split_groups(list("abcdefg"), 3) == [["a", "b", "c"], ["d", "e"], ["f", "g"]]
+    assert [round_count(n, 4) for n in (4, 5, 16, 17, 25)] == [1, 2, 2, 3, 3]
+    assert group_winner(["x", "y"], {"v1": "y", "v2": "x", "v3": None}) == "x"
+
+    reset_breakers()
+    reset_attempts()
+    cfg = _config(tmp_path, **{name: _mock_slot(vote_for="a") for name in "abcdef"})
+    cfg.collaboration.update({"early_decision": "off", "panel_size": 3})
+    mgr = CollaborationManager(cfg)
+
+    async def run():
+        sid = await mgr.broadcast_user_input("bracket", topology="tournament")
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        return sid
+
+    session = mgr.active_sessions[asyncio.run(run())]
+    rounds = session["tournament"]["rounds"]
+    assert session["tournament"]["panels"] == [["a", "b", "c"], ["d", "e", "f"]]
+    assert [r["groups"] for r in rounds] == [[["a", "b", "c"], ["d", "e", "f"]], [["a", "d"]]]
+    assert rounds[0]["winners"] == ["a", "d"]  # nobody in d's panel could vote for a
+    assert set(session["votes"]) == set("abcdef")
+    assert mgr.get_winning_solution(session["id"])["winner"] == "a"
+    assert session["prompt_tokens"]["vote"]["calls"] == 12  # a panel vote and the final vote each
+    assert "r1_vote" not in session  # panel ballots live in the bracket only
+
+    with pytest.raises(ValueError):
+        asyncio.run(mgr.broadcast_user_input("nope", topology="mesh"))
+
+
+def test_converged_proposals_skip_refinement_or_finish_with_representative(tmp_path):
+    assert code_hash("```python\nx  =  1   # one\n\ny = 2\n```") == code_hash("Same:\n```py\nx = 1\ny = 2\n```")
+    code = "```python\ndef run(message):\n    return [message.strip()]\n```"
+    clusters = find_clusters({
+        "a": "Analysis: list the files then return them.\n" + code,
+        "b": "Approach: we list the files and return them.\n" + code,
+        "c": "Write a poem about autumn leaves falling over the quiet river at dusk.",
+    })
+    assert [sorted(c["members"]) for c in clusters] == [["a", "b"], ["c"]]
+
+    same = {"proposal": "Approach: reuse the list skill.\n" + code}
+    for action in ("vote", "finish"):
+        reset_breakers()
+        cfg = _config(tmp_path / action, **{name: _mock_slot(vote_for="b", responses=same) for name in "abc"})
+        cfg.collaboration.update({"early_decision": "off", "consensus": {"action": action}})
+        mgr = CollaborationManager(cfg)
+
+        async def run():
+            sid = await mgr.broadcast_user_input("list files")
+            assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+            await asyncio.sleep(0.01)
+            return sid
+
+        session = mgr.active_sessions[asyncio.run(run())]
+        consensus = session["consensus"]
+        assert consensus["action"] == action and consensus["share"] == 1.0 and "est_sec_saved" in consensus
+        assert not session.get("refinements") and "refinement" not in session["prompt_tokens"]
+        winner = mgr.get_winning_solution(session["id"])
+        if action == "vote":
+            assert set(session["votes"]) == set("abc") and winner["winner"] == "b"
+        else:
+            assert not session["votes"] and session["status"] == "completed"
+            assert winner["consensus"] and winner["winner"] == consensus["representative"]
+        assert mgr.consensus_report()["skip_rate"] == 1.0
+
+
+def test_cascade_starts_cheapest_tier_and_escalates_on_weak_results(tmp_path):
+    assert [parse_confidence(t) for t in ("Confidence: 0.4", "**Confidence:** HIGH", "confidence = 85%", "")] \
+        == [0.4, 0.9, 0.85, None]
+    assert [slot_tier(m) for m in ({"provider": "ollama"}, {"provider": "openai"},
+                                   {"provider": "openai", "cost_per_1k_tokens": 0.01}, {"tier": 5})] == [1, 2, 3, 5]
+
+    broken = "```python\ndef run(message:\n```"
+    local = {"tier": 1}
+
+    async def run(mgr, **kwargs):
+        sid = await mgr.broadcast_user_input("do the thing", **kwargs)
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        await asyncio.sleep(0.01)
+        return mgr.active_sessions[sid]
+
+    def manager(path, **models):
+        reset_breakers()
+        cfg = _config(tmp_path / path, **models)
+        cfg.collaboration.update({"early_decision": "off"})
+        cfg.collaboration["consensus"]["enabled"] = False
+        cfg.collaboration["cascade"]["enabled"] = True
+        return CollaborationManager(cfg)
+
+    # The local tier agrees: remote slots never run
+    mgr = manager("agree", l1={**_mock_slot(vote_for="l1"), **local}, l2={**_mock_slot(vote_for="l1"), **local},
+                  r1=_mock_slot(vote_for="r1"))
+    session = asyncio.run(run(mgr))
+    assert session["cascade"]["tier"] == 1 and session["cascade"]["settled"]
+    assert set(session["usage"]["by_llm"]) == {"l1", "l2"}
+    assert mgr.get_winning_solution(session["id"])["winner"] == "l1"
+
+    # A split vote escalates to the next tier, which settles the session
+    mgr = manager("split", l1={**_mock_slot(vote_for="l1"), **local}, l2={**_mock_slot(vote_for="l2"), **local},
+                  r1=_mock_slot(vote_for="r1"), r2=_mock_slot(vote_for="r1"))
+    session = asyncio.run(run(mgr))
+    history = session["cascade"]["history"]
+    assert [h["tier"] for h in history] == [1, 2] and history[0]["failed"] == ["agreement"]
+    assert set(history[0]["votes"]) == {"l1", "l2"} and set(session["votes"]) == {"r1", "r2"}
+    assert session["status"] == "completed" and mgr.get_winning_solution(session["id"])["winner"] == "r1"
+    assert mgr.cascade_report()["interactive"]["escalations"] == 1
+
+    # Skill generation also checks the winner's code
+    bad_code = {"proposal": broken, "refinement": broken}
+    mgr = manager("code", l1={**_mock_slot(vote_for="l1", responses=bad_code), **local},
+                  r1=_mock_slot(vote_for="r1"))
+    session = asyncio.run(run(mgr, priority="skill_generation"))
+    assert session["cascade"]["history"][0]["failed"] == ["sandbox"]
+    assert mgr.get_winning_solution(session["id"])["winner"] == "r1"
+    assert mgr.cascade_report()["skill_generation"]["reasons"] == {"sandbox": 1}
+
+    # A sandbox hook that raises fails the tier once; the last tier then settles
+    calls = []
+
+    async def broken_hook(code, request):
+        calls.append(code)
+        raise RuntimeError("sandbox down")
+
+    good = "```python\ndef run(message):\n    return message\n```"
+    mgr = manager("hook", l1={**_mock_slot(vote_for="l1", responses={"proposal": good}), **local},
+                  r1=_mock_slot(vote_for="r1", responses={"proposal": good}))
+    mgr.sandbox_check = broken_hook
+    session = asyncio.run(run(mgr, priority="skill_generation"))
+    assert [h["failed"] for h in session["cascade"]["history"]] == [["check_error"], ["check_error"]]
+    assert session["status"] == "completed" and session["cascade"]["settled"] and len(calls) == 2
+
+
+def test_slots_continue_one_conversation_across_phases(tmp_path):
+    reset_breakers()
+    reset_attempts()
+    slots = {name: _mock_slot(vote_for="a", prompt_tokens_per_sec=100000) for name in ("a", "b", "c")}
+    cfg = _config(tmp_path, **slots)
+    cfg.collaboration["early_decision"] = "off"
+    cfg.collaboration["consensus"]["enabled"] = False
+    mgr = CollaborationManager(cfg)
+    conversations = {}
+
+    async def run():
+        sid = await mgr.broadcast_user_input("add two numbers")
+        conversations.update(sid=mgr._runtime[sid]["conversations"])
+        assert await mgr.wait_for_collaboration_complete(sid, timeout=10)
+        await asyncio.sleep(0.01)
+        return sid
+
+    session = mgr.active_sessions[asyncio.run(run())]
+    evals = session["prompt_eval"]
+    assert set(evals) == {"proposal", "refinement", "vote"}
+    assert all(stats["calls"] == 3 and stats["sec"] > 0 for stats in evals.values())
+    assert evals["proposal"]["cached_tokens"] == 0
+    # Later phases send only their new turn; the history before it is the cached prefix
+    assert 0 < evals["refinement"]["cached_tokens"] < evals["vote"]["cached_tokens"]
+    assert evals["refinement"]["prompt_tokens"] == session["prompt_tokens"]["refinement"]["total"]
+    proposal, refinement, vote = [m["content"] for m in conversations["sid"]["a"].messages if m["role"] == "user"]
+    assert "add two numbers" in proposal
+    assert refinement.startswith("Peer proposals:") and "User request" not in refinement
+    assert "VOTE:" in vote
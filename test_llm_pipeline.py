@@ -0,0 +1,392 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.dexter_brain.http_clients import ProviderClientRegistry, endpoint_key
+from backend.dexter_brain.conversation import Conversation
+from backend.dexter_brain.llm import call_slot, get_stream_stats, stream_slot
+
+
+def test_endpoint_key_normalizes_urls():
+    assert endpoint_key("https://api.openai.com/v1") == "https://api.openai.com:443"
+    assert endpoint_key("http://localhost:11434/api/generate") == "http://localhost:11434"
+    assert endpoint_key("LOCALHOST:11434") == "http://localhost:11434"
+
+
+def test_registry_pools_one_client_per_endpoint():
+    async def run():
+        registry = ProviderClientRegistry({"max_connections": 4})
+        a = registry.get("https://api.example.com/v1/chat/completions")
+        b = registry.get("https://api.example.com/v1/messages")
+        c = registry.get("http://localhost:11434")
+        assert a is b
+        assert a is not c
+        assert registry.stats()["open_clients"] == 2
+        await registry.aclose()
+        assert registry.stats()["open_clients"] == 0
+
+    asyncio.run(run())
+
+    # A client left behind by a finished loop is closed with the registry, not dropped
+    registry = ProviderClientRegistry()
+    async def get():
+        return registry.get("http://localhost:11434")
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+    assert first is not second and not first.is_closed
+    asyncio.run(registry.aclose())
+    assert first.is_closed and second.is_closed
+
+
+class _StreamingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        if self.path.endswith("/chat/completions"):
+            lines = [f"data: {json.dumps({'choices': [{'delta': {'content': t}}]})}\n\n" for t in ("Hel", "lo")]
+            body = "".join(lines) + "data: [DONE]\n\n"
+        else:  # Ollama /api/generate
+            body = "".join(json.dumps({"response": t, "done": False}) + "\n" for t in ("Hi", " there"))
+            body += json.dumps({"response": "", "done": True}) + "\n"
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def llm_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _config(**models):
+    return type("Cfg", (), {"models": models, "runtime": {}})()
+
+
+def test_stream_slot_relays_openai_and_ollama_chunks(llm_server):
+    cfg = _config(
+        oa={"enabled": True, "provider": "openai", "model": "m", "api_key": "k", "endpoint": f"{llm_server}/v1"},
+        ol={"enabled": True, "provider": "ollama", "model": "m", "endpoint": llm_server},
+    )
+
+    async def collect(name):
+        return [c async for c in stream_slot(cfg, name, "hello")]
+
+    assert asyncio.run(collect("oa")) == ["Hel", "lo"]
+    assert asyncio.run(collect("ol")) == ["Hi", " there"]
+    stats = get_stream_stats()
+    assert stats["oa"]["streams"] == 1 and stats["oa"]["ttft_ms_avg"] is not None
+
+    async def leave_early():
+        stream = stream_slot(cfg, "oa", "hello")
+        assert await stream.__anext__() == "Hel"
+        await stream.aclose()  # the SSE client disconnected
+
+    asyncio.run(leave_early())
+    stats = get_stream_stats()["oa"]
+    assert stats["streams"] == 2 and stats["cancelled"] == 1 and stats["errors"] == 0
+
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    bodies = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+        self.bodies.append(body)
+        if self.path.endswith("/messages"):
+            reply = {"content": [{"type": "text", "text": "ok"}],
+                     "usage": {"input_tokens": 7, "cache_read_input_tokens": 30}}
+        else:  # Ollama /api/generate: the context grows with every turn
+            turn = len(self.bodies)
+            reply = {"response": f"turn {turn}", "done": True, "context": list(range(10 * turn)),
+                     "prompt_eval_count": 5, "prompt_eval_duration": 2_000_000}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_conversations_reuse_ollama_context_and_mark_anthropic_cache_prefix():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RecordingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    cfg = _config(
+        ol={"enabled": True, "provider": "ollama", "model": "m", "endpoint": url},
+        an={"enabled": True, "provider": "anthropic", "model": "m", "api_key": "k", "endpoint": url,
+            "prompt_cache": True},
+    )
+    try:
+        conv = Conversation("You are a planner.", "s1:ol", keep_alive="10m")
+        assert asyncio.run(call_slot(cfg, "ol", "propose", conversation=conv)) == "turn 1"
+        assert asyncio.run(call_slot(cfg, "ol", "refine", conversation=conv)) == "turn 2"
+        first, second = _RecordingHandler.bodies
+        assert first["prompt"] == "You are a planner.\n\npropose" and "context" not in first
+        assert second["prompt"] == "refine" and second["context"] == list(range(10))
+        assert second["keep_alive"] == "10m" and conv.turns == 2
+        assert conv.last_usage == {"prompt_tokens": 15, "cached_tokens": 10, "prompt_eval_sec": 0.002}
+
+        _RecordingHandler.bodies.clear()
+        conv = Conversation("You are a critic.", "s1:an")
+        asyncio.run(call_slot(cfg, "an", "propose", conversation=conv))
+        asyncio.run(call_slot(cfg, "an", "vote", conversation=conv))
+        body = _RecordingHandler.bodies[-1]
+        assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert [m["role"] for m in body["messages"]] == ["user", "assistant", "user"]
+        assert body["messages"][1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        assert conv.last_usage["prompt_tokens"] == 37 and conv.last_usage["cached_tokens"] == 30
+    finally:
+        server.shutdown()
+
+
+def test_response_cache_coalesces_concurrent_misses(tmp_path):
+    from backend.dexter_brain.llm_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"), memory_max_entries=2)
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_call("k", "slot", upstream) for _ in range(5)))
+
+    disk_threads = []
+    for name in ("_disk_get", "_disk_put"):
+        method = getattr(cache, name)
+        setattr(cache, name, lambda *a, _m=method: disk_threads.append(threading.current_thread()) or _m(*a))
+
+    assert asyncio.run(run()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+    assert disk_threads and threading.main_thread() not in disk_threads  # SQLite stays off the event loop
+
+    # Evicted from memory but still served from the SQLite tier
+    cache.put("a", "slot", "1")
+    cache.put("b", "slot", "2")
+    assert cache.get("k") == "answer"
+    assert cache.stats()["disk_hits"] == 1
+
+    cache.put("old", "slot", "stale", ttl_sec=-1)
+    assert cache.get("old") is None
+
+    # A failed call hands the key's lock to its waiter; a newcomer must queue on the same lock
+    calls.clear()
+
+    async def flaky():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("upstream down")
+        return "retry"
+
+    async def handoff():
+        late = []
+        first = asyncio.create_task(cache.get_or_call("f", "slot", flaky))
+        first.add_done_callback(lambda _: late.append(asyncio.ensure_future(cache.get_or_call("f", "slot", flaky))))
+        second = asyncio.create_task(cache.get_or_call("f", "slot", flaky))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        return results[1], await late[0]
+
+    assert asyncio.run(handoff()) == ("retry", "retry")
+    assert len(calls) == 2 and cache._locks == {}
+    cache.close()
+
+
+def test_singleflight_shares_result_and_survives_waiter_cancellation():
+    from backend.dexter_brain.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        quitter = asyncio.create_task(flight.do("k", upstream))
+        stayers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        quitter.cancel()
+        results = await asyncio.gather(*stayers)
+        assert quitter.cancelled()
+        return results
+
+    assert asyncio.run(run()) == ["shared"] * 3
+    assert len(calls) == 1
+    stats = flight.stats()
+    assert stats["coalesced"] == 3 and stats["waiter_cancellations"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_singleflight_cancels_upstream_when_all_waiters_leave():
+    from backend.dexter_brain.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    started = []
+
+    async def upstream():
+        started.append(1)
+        await asyncio.sleep(10)
+
+    async def run():
+        waiter = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(run())
+    assert started and flight.stats()["abandoned"] == 1
+    assert flight.in_flight() == 0
+
+
+def test_mock_provider_is_deterministic_and_scriptable():
+    from backend.dexter_brain.llm import call_slot
+    from backend.dexter_brain.mock_provider import MockProviderError
+
+    cfg = _config(
+        a={"enabled": True, "provider": "mock", "mock": {"latency": {"mean_ms": 1}}},
+        b={"enabled": True, "provider": "mock", "mock": {"latency": {"mean_ms": 1}, "vote_for": "a"}},
+        bad={"enabled": True, "provider": "mock", "mock": {"latency": {"mean_ms": 1}, "error_rate": 1.0}},
+        js={"enabled": True, "provider": "mock",
+            "mock": {"latency": {"mean_ms": 1}, "responses": {"chat": '{} {"from": "{slot}"} {0} {request}'}}},
+    )
+    vote_prompt = "=== a ===\nx\n\n=== b ===\ny\n\nRespond with just: VOTE: <llm_name>"
+
+    async def run():
+        first = await call_slot(cfg, "a", "User request: hi\n\nCollaboration Session ID: s")
+        again = await call_slot(cfg, "a", "User request: hi\n\nCollaboration Session ID: s", use_cache=False)
+        votes = [await call_slot(cfg, name, vote_prompt) for name in ("a", "b")]
+        streamed = "".join([c async for c in stream_slot(cfg, "a", "User request: hi\n\nCollaboration Session ID: s")])
+        with pytest.raises(MockProviderError):
+            await call_slot(cfg, "bad", "hello")
+        literal = await call_slot(cfg, "js", "hello")
+        return first, again, votes, streamed, literal
+
+    first, again, votes, streamed, literal = asyncio.run(run())
+    assert literal == '{} {"from": "js"} {0} hello'
+    assert first == again == streamed
+    assert "def run(message: str) -> dict" in first
+    assert votes[0] in ("VOTE: a", "VOTE: b") and votes[1] == "VOTE: a"
+
+
+def test_mock_throttling_replays_the_same_way_after_reset():
+    from backend.dexter_brain.mock_provider import call_mock, reset_attempts
+    from backend.dexter_brain.rate_limit import ProviderHTTPError
+
+    flaky = {"mock": {"latency": {"mean_ms": 0}, "throttle_rate": 0.5}}
+
+    async def outcomes(interleave):
+        seen = []
+        for _ in range(8):
+            if interleave:
+                await asyncio.gather(call_mock(flaky, "b", "other"), return_exceptions=True)
+            try:
+                await call_mock(flaky, "a", "same prompt")
+                seen.append("ok")
+            except ProviderHTTPError:
+                seen.append("429")
+        return seen
+
+    reset_attempts()
+    first = asyncio.run(outcomes(False))
+    reset_attempts()
+    assert asyncio.run(outcomes(True)) == first  # other slots' calls do not shift the sequence
+    assert "ok" in first and "429" in first
+
+    from backend.dexter_brain import mock_provider
+
+    async def many_prompts():
+        for i in range(mock_provider.MAX_TRACKED_PROMPTS + 10):
+            await asyncio.gather(call_mock(flaky, "a", f"prompt {i}"), return_exceptions=True)
+
+    asyncio.run(many_prompts())
+    assert len(mock_provider._attempts) == mock_provider.MAX_TRACKED_PROMPTS  # bounded under load
+    reset_attempts()
+
+
+def test_rate_limiter_retries_throttled_calls_and_backs_off_concurrency():
+    from backend.dexter_brain.rate_limit import ProviderHTTPError, ProviderRateLimiter, parse_retry_after
+
+    limiter = ProviderRateLimiter("test", {"max_concurrency": 4, "backoff_base_sec": 0.01})
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ProviderHTTPError("slow down", 429, retry_after=0.01 if len(attempts) == 1 else None)
+        return "ok"
+
+    async def not_throttled():
+        raise ProviderHTTPError("bad request", 400)
+
+    async def run():
+        assert await limiter.run(flaky) == "ok"
+        with pytest.raises(ProviderHTTPError):
+            await limiter.run(not_throttled)
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert len(attempts) == 3 and stats["retries"] == 2 and stats["throttled"] == 2
+    assert stats["concurrency_limit"] < 4 and stats["in_flight"] == 0
+    assert parse_retry_after("7") == 7.0 and parse_retry_after("soon") is None
+
+
+def test_rate_limiter_cancelled_calls_leave_concurrency_unchanged():
+    from backend.dexter_brain.rate_limit import ProviderRateLimiter
+
+    limiter = ProviderRateLimiter("test", {"max_concurrency": 8})
+    limiter.concurrency = 2.0
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(limiter.run(hang))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["concurrency_limit"] == 2.0 and stats["in_flight"] == 0
+    assert stats["cancelled"] == 1 and stats["throttled"] == 0
+
+
+def test_rate_limiter_request_bucket_spaces_out_calls():
+    from backend.dexter_brain.rate_limit import ProviderRateLimiter
+
+    limiter = ProviderRateLimiter("test", {"requests_per_min": 600})  # 10/s, burst of 600
+    limiter.requests.level = 0
+
+    async def call():
+        return "x"
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(limiter.run(call), limiter.run(call))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.15
+    assert limiter.stats()["delayed"] == 2